@@ -10,6 +10,9 @@ from forgery_detection.config import setup_logging
 from forgery_detection.config_loader import get_config
 from forgery_detection.parsers.parsers import InputParser
 from forgery_detection.modes.evaluation_mode import EvaluationMode, prepare_context
+from forgery_detection.modes.prediction_mode import PredictionMode
+from forgery_detection.modes.serving_mode import ServingMode
+from forgery_detection.modes.tuning_mode import TuningMode
 from forgery_detection.utils.console import print_banner
 
 
@@ -38,12 +41,47 @@ def main():
     print_banner("FORGERY DETECTION", "Image Analysis for Car Insurance Fraud")
     logger.info("Starting forgery detection application")
 
-    if not args.authentic_dir:
-        parser.error("--authentic_dir is required")
+    if args.tune:
+        # Tuning mode: search weights/thresholds over stored detector scores
+        TuningMode().run_tuning(prepare_context(args))
+        logger.info("Application completed successfully")
+        return
 
-    # Run evaluation mode
-    evaluation_mode = EvaluationMode()
-    evaluation_mode.run_evaluation(prepare_context(args))
+    if args.serve:
+        # Serving mode: long-running HTTP service with warm detectors
+        serving_mode = ServingMode(
+            workers=args.workers,
+            detector_threads=args.detector_threads,
+            cache_path=args.cache,
+            config_path=args.config,
+            log_level=args.log_level,
+        )
+        serving_mode.run_serving(prepare_context(args))
+        logger.info("Application completed successfully")
+        return
+
+    if args.predict:
+        # Prediction mode: unlabeled images, streaming JSONL output
+        prediction_mode = PredictionMode(
+            detector_threads=args.detector_threads, cache_path=args.cache
+        )
+        prediction_mode.run_prediction(prepare_context(args))
+        logger.info("Application completed successfully")
+        return
+
+    evaluation_mode = EvaluationMode(detector_threads=args.detector_threads, cache_path=args.cache)
+
+    if args.replay:
+        # Replay mode: recompute from stored detector scores
+        evaluation_mode.run_replay(prepare_context(args))
+    else:
+        if not args.forged_dir:
+            parser.error("--forged_dir is required")
+        if not args.authentic_dir:
+            parser.error("--authentic_dir is required")
+
+        # Run evaluation mode
+        evaluation_mode.run_evaluation(prepare_context(args))
 
     logger.info("Application completed successfully")
 
@@ -2,12 +2,13 @@ import argparse
 import logging
 from datetime import datetime
 from pathlib import Path
-from forgery_detection.modes.file_type_recipes import FileTypeRecipes
-from forgery_detection.services.format_detector import FormatDetector
+from typing import Iterable, Iterator, Optional
+from forgery_detection.modes.image_scorer import ImageScorer, iter_scored_images
 from forgery_detection.services.image_loader import ImageLoader
 from forgery_detection.services.classifier import Classifier
-from forgery_detection.services.report_generator import ReportGenerator
-from forgery_detection.services.score_aggregator import ScoreAggregator
+from forgery_detection.services.duplicate_clusterer import DuplicateClusterer
+from forgery_detection.services.metrics import MetricsEngine
+from forgery_detection.services.score_store import ScoreStore
 from forgery_detection.utils.console import (
     print_section,
     print_table_row,
@@ -31,30 +32,56 @@ def prepare_context(args: argparse.Namespace) -> dict:
         "authentic_dir": args.authentic_dir,
         "criteria": args.criteria,
         "report": report_name,
-        "config_file": args.config if hasattr(args, "config") and args.config else "config.yml (default)",
+        "config_file": (
+            args.config if hasattr(args, "config") and args.config else "config.yml (default)"
+        ),
+        "config_path": getattr(args, "config", None),
+        "recursive": getattr(args, "recursive", False),
+        "workers": getattr(args, "workers", 1),
+        "detector_threads": getattr(args, "detector_threads", 1),
+        "cache": getattr(args, "cache", None),
+        "save_scores": getattr(args, "save_scores", None),
+        "replay": getattr(args, "replay", None),
+        "tune": getattr(args, "tune", None),
+        "predict": getattr(args, "predict", None),
+        "output": getattr(args, "output", "predictions.jsonl"),
+        "serve": getattr(args, "serve", False),
+        "host": getattr(args, "host", None),
+        "port": getattr(args, "port", None),
+        "log_level": getattr(args, "log_level", "INFO"),
     }
 
     return context
 
 
+def extract_criteria(criteria: str) -> list:
+    """Helper method: expand a --criteria value into a list of criteria names."""
+    if criteria == "all":
+        return ["strict", "balanced", "aggressive"]  # Refactor this!
+    else:
+        return [m.strip() for m in criteria.split(",")]
+
+
 class EvaluationMode:
-    "Evaluation mode for testing detector performance on labeled datasets. Enables a future 'prediction mode' for unlabeled images."
+    "Evaluation mode for testing detector performance on labeled datasets (see PredictionMode"
 
-    def __init__(self):
-        self.recipes = FileTypeRecipes()
+    "for unlabeled images)."
+
+    def __init__(self, detector_threads: int = 1, cache_path: Optional[str] = None):
+        self.scorer = ImageScorer(detector_threads=detector_threads, cache_path=cache_path)
         self.image_loader = ImageLoader()
         self.classifier = Classifier()
-        self.format_detector = FormatDetector()
-        self.score_aggregator = ScoreAggregator()
-        self.report_generator = ReportGenerator()
-
-    def _load_images(self, context: dict) -> list:
-        # Load labeled images
-        images = self.image_loader.load_labeled_images(
-            context["forged_dir"], context["authentic_dir"]
+        self.score_aggregator = self.scorer.score_aggregator
+        self.report_generator = self.scorer.report_generator
+        self.score_store = ScoreStore()
+        self.metrics_engine = MetricsEngine()
+        self.duplicate_clusterer = DuplicateClusterer()
+
+    def _load_images(self, context: dict) -> Iterator[tuple[str, bytes, str]]:
+        # Stream labeled images lazily (bounded memory, starts immediately)
+        return self.image_loader.iter_labeled_images(
+            context["forged_dir"], context["authentic_dir"], context.get("recursive", False)
         )
-        logger.info(f"Loaded {len(images)} images")
-        return images
 
     def _adjust_recipes(self, context: dict):
         # Adjust recipes based on criteria
@@ -66,67 +93,58 @@ class EvaluationMode:
 
     def _extract_criteria(self, context: dict) -> list:
         # Load & Configure execution criteria
-        if context["criteria"] == "all":
-            return ["strict", "balanced", "aggressive"] # Refactor this!
-        else:
-            return [m.strip() for m in context["criteria"].split(",")]
-
-    def _run_detectors(self, image_bytes, format_type):
-        # Initialize detectors
-        detectors = self.recipes.get_detectors_by_format(format_type)
-
-        technique_scores = {}
-
-        # Run each detector
-        for name in detectors.keys():
-            technique_scores[name] = detectors[name].analyze(image_bytes)
-
-        return technique_scores
+        return extract_criteria(context["criteria"])
 
     def _generate_report(
-        self, context: dict, criteria: list, image_details: list, results_by_mode: dict
+        self,
+        context: dict,
+        criteria: list,
+        image_details: list,
+        metrics: dict,
+        duplicate_clusters: list,
     ):
         # Generate evaluation report
         logger.info("Generating report")
         report_content = self.report_generator.generate_evaluation_report(
-            results_by_mode=results_by_mode,
+            metrics=metrics,
             modes=criteria,
             thresholds=self.classifier.thresholds,
             weights=self.score_aggregator.weights,
             image_details=image_details,
+            duplicate_clusters=duplicate_clusters,
         )
         # Save report to file
         with open(context["report"], "w") as f:
             f.write(report_content)
         logger.info(f"Report saved to: {context['report']}")
 
-    def _print_results_summary(self, criteria: list, results_by_criteria: dict):
+    def _print_results_summary(self, criteria: list, metrics: dict, duplicate_clusters: list):
         """Print evaluation results summary with metrics for each criteria."""
         print_section("RESULTS BY CRITERIA")
 
         for c in criteria:
-            results = results_by_criteria[c]
-            tp = sum(1 for _, pred, truth in results if pred == "forged" and truth == "forged")
-            fp = sum(1 for _, pred, truth in results if pred == "forged" and truth == "authentic")
-            fn = sum(1 for _, pred, truth in results if pred == "authentic" and truth == "forged")
-            tn = sum(
-                1 for _, pred, truth in results if pred == "authentic" and truth == "authentic"
-            )
+            m = metrics["modes"][c]
+            print(f"\nMODE: {c.upper()} (threshold={m['threshold']})")
+            print_table_row("Total:", str(m["total"]))
+            print_table_row("TP:", format_metric("TP", m["tp"]))
+            print_table_row("FP:", format_metric("FP", m["fp"]))
+            print_table_row("FN:", format_metric("FN", m["fn"]))
+            print_table_row("TN:", format_metric("TN", m["tn"]))
+            print_table_row("Precision:", format_percentage(m["precision"]))
+            print_table_row("Recall:", format_percentage(m["recall"]))
+            print_table_row("Accuracy:", format_percentage(m["accuracy"]))
+
+        roc_auc, average_precision = metrics["roc"]["auc"], metrics["pr"]["auc"]
+        print("\nALL THRESHOLDS")
+        print_table_row("ROC AUC:", f"{roc_auc:.3f}" if roc_auc is not None else "n/a")
+        print_table_row(
+            "Avg prec.:", f"{average_precision:.3f}" if average_precision is not None else "n/a"
+        )
 
-            total = len(results)
-            precision = tp / (tp + fp) if (tp + fp) > 0 else 0.0
-            recall = tp / (tp + fn) if (tp + fn) > 0 else 0.0
-            accuracy = (tp + tn) / total if total > 0 else 0.0
-
-            print(f"\nMODE: {c.upper()} (threshold={self.classifier.get_threshold(c)})")
-            print_table_row("Total:", str(total))
-            print_table_row("TP:", format_metric("TP", tp))
-            print_table_row("FP:", format_metric("FP", fp))
-            print_table_row("FN:", format_metric("FN", fn))
-            print_table_row("TN:", format_metric("TN", tn))
-            print_table_row("Precision:", format_percentage(precision))
-            print_table_row("Recall:", format_percentage(recall))
-            print_table_row("Accuracy:", format_percentage(accuracy))
+        if duplicate_clusters:
+            print("\nNEAR-DUPLICATES")
+            print_table_row("Clusters:", str(len(duplicate_clusters)))
+            print_table_row("Images:", str(sum(c["size"] for c in duplicate_clusters)))
 
     def run_evaluation(self, context: dict):
         print_section("EVALUATION: Testing Detector")
@@ -134,55 +152,106 @@ class EvaluationMode:
         print_table_row("Forged:", context["forged_dir"])
         print_table_row("Authentic:", context["authentic_dir"])
         print_table_row("Config:", context["config_file"])
+        if context.get("workers", 1) > 1:
+            print_table_row("Workers:", str(context["workers"]))
+        if context.get("cache"):
+            print_table_row("Cache:", context["cache"])
 
         # Adjust recipes if needed
         self._adjust_recipes(context)
 
-        # Load images
+        # Stream images
         images = self._load_images(context)
+
+        # Score each image as it is loaded (in-process or on a worker pool)
+        scored_images = iter_scored_images(
+            images,
+            self.scorer,
+            workers=context.get("workers", 1),
+            config_path=context.get("config_path"),
+            log_level=context.get("log_level", "INFO"),
+        )
+
+        try:
+            self._evaluate(context, scored_images)
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        """Release the scorer's thread pools, detector resources and score cache."""
+        self.scorer.close()
+
+    def run_replay(self, context: dict):
+        """Re-run aggregation, classification, metrics and report from stored detector scores."""
+        print_section("REPLAY: Re-scoring Stored Detector Scores")
+        print_table_row("Scores:", context["replay"])
+        print_table_row("Config:", context["config_file"])
+
+        # Adjust recipes if needed
+        self._adjust_recipes(context)
+
+        # Only the cheap aggregation step is recomputed; no image is decoded
+        records = self.score_store.read(context["replay"])
+        scored_images = (
+            (
+                record["ground_truth"],
+                dict(
+                    record,
+                    final_score=self.score_aggregator.aggregate(
+                        record["detector_scores"], record["format"]
+                    ),
+                ),
+            )
+            for record in records
+        )
+
+        self._evaluate(context, scored_images)
+
+    def _evaluate(self, context: dict, scored_images: Iterable[tuple[str, Optional[dict]]]):
+        # Classify scored images, print metrics and write outputs
         criteria = self._extract_criteria(context)
-        results_by_criteria = {c: [] for c in criteria}
         image_details = []
 
-        # Process each image
-        for image_path, image_bytes, true_label in images:
-            # Detect format
-            format_type = self.format_detector.detect(image_bytes)
-            if not format_type:
-                logger.warning(f"Skipping {image_path}: Unknown format")
+        loaded_count = 0
+        for true_label, record in scored_images:
+            loaded_count += 1
+            if record is None:
                 continue
 
-            # Run detectors
-            scores = self._run_detectors(image_bytes, format_type)
-
-            # Aggregate scores
-            final_score = self.score_aggregator.aggregate(scores, format_type)
-
-            # EXIF analysis for report
-            exif_analysis = self.report_generator.analyze_exif(image_bytes)
+            image_path = record["filename"]
+            final_score = record["final_score"]
 
             # Classify with requested criteria
             image_classifications = {}
             for c in criteria:
-                classification = self.classifier.classify(final_score, c)
-                results_by_criteria[c].append((image_path, classification, true_label))
-                image_classifications[c] = classification
+                image_classifications[c] = self.classifier.classify(final_score, c)
 
             # Store image details for report
             image_details.append(
                 {
                     "filename": image_path,
                     "ground_truth": true_label,
-                    "format": format_type,
+                    "format": record["format"],
                     "final_score": final_score,
-                    "detector_scores": scores.copy(),
+                    "detector_scores": record["detector_scores"],
                     "predictions": image_classifications,
-                    "exif_analysis": exif_analysis,
+                    "exif_analysis": record["exif_analysis"],
+                    "phash": record.get("phash"),
                 }
             )
 
-        # Calculate and print metrics
-        self._print_results_summary(criteria, results_by_criteria)
+        logger.info(f"Loaded {loaded_count} images")
+
+        # Persist the detector score matrix for replay/tuning
+        if context.get("save_scores"):
+            self.score_store.write(context["save_scores"], image_details)
+
+        # Calculate all metrics in one pass and print them
+        thresholds = {c: self.classifier.get_threshold(c) for c in criteria}
+        metrics = self.metrics_engine.compute(image_details, thresholds, criteria)
+        # Same photo submitted several times (recompressed or slightly cropped)
+        duplicate_clusters = self.duplicate_clusterer.find_clusters(image_details)
+        self._print_results_summary(criteria, metrics, duplicate_clusters)
 
         # Generate evaluation report
         if context.get("report"):
@@ -190,5 +259,6 @@ class EvaluationMode:
                 context=context,
                 criteria=criteria,
                 image_details=image_details,
-                results_by_mode=results_by_criteria,
+                metrics=metrics,
+                duplicate_clusters=duplicate_clusters,
             )
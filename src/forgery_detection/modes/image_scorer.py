@@ -0,0 +1,389 @@
+import logging
+import os
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Iterable, Iterator, Optional
+
+from forgery_detection.config import setup_logging
+from forgery_detection.config_loader import get_config
+from forgery_detection.modes.file_type_recipes import FileTypeRecipes
+from forgery_detection.services.format_detector import FormatDetector
+from forgery_detection.services.image_context import ImageContext
+from forgery_detection.services.report_generator import ReportGenerator
+from forgery_detection.services.score_aggregator import ScoreAggregator
+from forgery_detection.services.score_cache import ScoreCache, config_fingerprint
+
+logger = logging.getLogger(__name__)
+
+
+class ImageScorer:
+    "Scores a single image: format detection, detector recipe, aggregation and EXIF summary."
+
+    def __init__(
+        self, detector_threads: int = 1, cache_path: Optional[str] = None, workers: int = 1
+    ):
+        """
+        Initialize scorer.
+
+        Args:
+            detector_threads: Threads running the detectors of one image concurrently
+                (1 = sequential). Detectors spend most of their time in OpenCV/NumPy
+                calls that release the GIL, so threads cut single-image latency.
+            cache_path: Optional SQLite file caching raw detector scores by image
+                content and detector config
+            workers: Worker processes each running a scorer like this one. Detectors
+                with internal thread pools get the CPUs left per detector thread.
+        """
+        self.recipes = FileTypeRecipes()
+        self.format_detector = FormatDetector()
+        self.score_aggregator = ScoreAggregator()
+        self.report_generator = ReportGenerator()
+        self.detector_threads = detector_threads
+        # Max pixels of the images decoded together within a batch (0 = no cap)
+        self.batch_max_pixels = get_config().get_int("image_scorer.batch_max_pixels", 24_000_000)
+        self._detector_pool: Optional[ThreadPoolExecutor] = None
+        self.cache_path = cache_path
+        self.score_cache = ScoreCache(cache_path) if cache_path else None
+        # Each detector is invalidated only by changes to its own config section
+        self.fingerprints = {
+            name: config_fingerprint(f"{name}_detector") for name in self.recipes.detectors
+        }
+        # Internal detector threads must not stack on top of workers x detector threads
+        self.thread_budget = max(
+            1, (os.cpu_count() or 1) // (max(1, workers) * max(1, detector_threads))
+        )
+        for detector in self.recipes.detectors.values():
+            detector.set_thread_budget(self.thread_budget)
+
+    def _get_detector_pool(self) -> ThreadPoolExecutor:
+        # Created lazily so sequential scorers never own threads
+        if self._detector_pool is None:
+            self._detector_pool = ThreadPoolExecutor(
+                max_workers=self.detector_threads, thread_name_prefix="detector"
+            )
+        return self._detector_pool
+
+    def _run_detectors(
+        self, image_contexts: list[ImageContext], format_types: list[str]
+    ) -> list[dict[str, float]]:
+        # Detector recipe per image
+        recipes = [self.recipes.get_detectors_by_format(f) for f in format_types]
+
+        # Reuse cached scores; run only detectors without a matching entry
+        cached: list[dict[str, float]] = [{} for _ in image_contexts]
+        if self.score_cache is not None:
+            cached = [
+                self.score_cache.get_scores(ctx.sha256, self._cacheable_fingerprints(recipe))
+                for ctx, recipe in zip(image_contexts, recipes)
+            ]
+
+        # Images still needing each detector, so every detector runs once per batch
+        pending: dict[str, list[int]] = {}
+        for i, recipe in enumerate(recipes):
+            for name in recipe:
+                if name not in cached[i]:
+                    pending.setdefault(name, []).append(i)
+        # Decode each image once at the largest resolution its pending detectors declare
+        for i, (ctx, recipe) in enumerate(zip(image_contexts, recipes)):
+            ctx.plan_resolutions(
+                detector.max_resolution
+                for name, detector in recipe.items()
+                if name not in cached[i] and detector.reads_pixels
+            )
+        computed = self._analyze(image_contexts, pending)
+
+        results = []
+        for i, (ctx, recipe) in enumerate(zip(image_contexts, recipes)):
+            new_scores = {name: computed[name][i] for name in recipe if name not in cached[i]}
+            if self.score_cache is not None:
+                fingerprints = self._cacheable_fingerprints(recipe)
+                self.score_cache.put_scores(
+                    ctx.sha256,
+                    {name: score for name, score in new_scores.items() if name in fingerprints},
+                    fingerprints,
+                )
+            # Keep recipe order regardless of cache hits
+            results.append(
+                {
+                    name: cached[i][name] if name in cached[i] else new_scores[name]
+                    for name in recipe
+                }
+            )
+        return results
+
+    def _cacheable_fingerprints(self, recipe: dict) -> dict[str, str]:
+        # Detectors whose score depends on external state (e.g. the pHash index) are never cached
+        return {
+            name: self.fingerprints[name] for name, detector in recipe.items() if detector.cacheable
+        }
+
+    def _analyze(
+        self, image_contexts: list[ImageContext], pending: dict[str, list[int]]
+    ) -> dict[str, dict[int, float]]:
+        def run(name: str, indices: list[int]) -> dict[int, float]:
+            detector = self.recipes.detectors[name]
+            scores = detector.analyze_batch([image_contexts[i] for i in indices])
+            return dict(zip(indices, scores))
+
+        if self.detector_threads <= 1 or len(pending) <= 1:
+            # Run each detector's batch on the shared contexts (images decoded once)
+            return {name: run(name, indices) for name, indices in pending.items()}
+
+        # Run detectors concurrently; the contexts memoize shared products thread-safely
+        pool = self._get_detector_pool()
+        futures = {name: pool.submit(run, name, indices) for name, indices in pending.items()}
+        return {name: future.result() for name, future in futures.items()}
+
+    def _phash(self, reverse_search, image_context: ImageContext) -> Optional[str]:
+        # Cached hashes need no decode; otherwise reuses the detector's memoized hash.
+        # None if the image cannot be hashed
+        fingerprint = self.fingerprints["reverse_search"]
+        if self.score_cache is not None:
+            cached = self.score_cache.get_phash(image_context.sha256, fingerprint)
+            if cached is not None:
+                return cached
+        try:
+            phash = reverse_search.compute_phash(image_context)
+        except Exception as e:
+            logger.warning(f"Could not hash {image_context.path}: {type(e).__name__}: {e}")
+            return None
+        if self.score_cache is not None:
+            self.score_cache.put_phash(image_context.sha256, phash, fingerprint)
+        return phash
+
+    def close(self) -> None:
+        """Release the detector thread pools, detector resources and score cache, if any."""
+        for detector in self.recipes.detectors.values():
+            detector.close()
+        if self._detector_pool is not None:
+            self._detector_pool.shutdown()
+            self._detector_pool = None
+        if self.score_cache is not None:
+            self.score_cache.close()
+            self.score_cache = None
+
+    def _pixel_chunks(self, image_contexts: list[ImageContext]) -> Iterator[tuple[int, int]]:
+        """
+        Split contexts into runs of at most batch_max_pixels (from header sizes, no decode).
+
+        Args:
+            image_contexts: Contexts of one batch
+
+        Yields:
+            (start, end) index ranges; an image above the cap forms its own run
+        """
+        start, pixels = 0, 0
+        for i, ctx in enumerate(image_contexts):
+            try:
+                width, height = ctx.size
+            except Exception:
+                # Unreadable header: detectors fall back to their default scores
+                width = height = 0
+            if (
+                i > start
+                and self.batch_max_pixels
+                and pixels + width * height > self.batch_max_pixels
+            ):
+                yield start, i
+                start, pixels = i, 0
+            pixels += width * height
+        if start < len(image_contexts):
+            yield start, len(image_contexts)
+
+    def _score_contexts(
+        self, image_contexts: list[ImageContext], format_types: list[str]
+    ) -> list[dict]:
+        """Run the detectors on decode contexts and build their records (see score())."""
+        batch_scores = self._run_detectors(image_contexts, format_types)
+        reverse_search = self.recipes.detectors["reverse_search"]
+
+        records = []
+        for ctx, format_type, scores in zip(image_contexts, format_types, batch_scores):
+            # Aggregate scores
+            final_score = self.score_aggregator.aggregate(scores, format_type)
+
+            # EXIF analysis for report
+            exif_analysis = self.report_generator.analyze_exif(ctx.image_bytes, ctx)
+
+            records.append(
+                {
+                    "filename": ctx.path,
+                    "format": format_type,
+                    "final_score": final_score,
+                    "detector_scores": scores,
+                    "exif_analysis": exif_analysis,
+                    # Perceptual hash for near-duplicate clustering across the run
+                    "phash": self._phash(reverse_search, ctx),
+                }
+            )
+            # Image done: drop its decoded pixels and intermediate features
+            ctx.release()
+        return records
+
+    def score(self, image_path: str, image_bytes: bytes) -> Optional[dict]:
+        """
+        Score one image.
+
+        Args:
+            image_path: Source path (used for logging and the record)
+            image_bytes: Raw image data
+
+        Returns:
+            Record with filename, format, final_score, detector_scores,
+            exif_analysis and phash, or None if the format is not supported
+        """
+        return self.score_batch([(image_path, image_bytes)])[0]
+
+    def score_batch(self, images: list[tuple[str, bytes]]) -> list[Optional[dict]]:
+        """
+        Score several images, running each detector once over the whole batch.
+
+        Args:
+            images: List of (image_path, image_bytes)
+
+        Returns:
+            One record (see score()) or None per image, in input order
+        """
+        records: list[Optional[dict]] = [None] * len(images)
+
+        # Detect formats; unsupported images are skipped
+        supported, format_types = [], []
+        for i, (image_path, image_bytes) in enumerate(images):
+            format_type = self.format_detector.detect(image_bytes)
+            if not format_type:
+                logger.warning(f"Skipping {image_path}: Unknown format")
+                continue
+            supported.append(i)
+            format_types.append(format_type)
+
+        # Shared decode context per image for all detectors
+        image_contexts = [ImageContext(images[i][1], path=images[i][0]) for i in supported]
+
+        # Images decoded together are capped by pixel count, so a batch of large
+        # images does not hold all of their decoded products at once
+        for start, end in self._pixel_chunks(image_contexts):
+            chunk_records = self._score_contexts(image_contexts[start:end], format_types[start:end])
+            for i, record in zip(supported[start:end], chunk_records):
+                records[i] = record
+        return records
+
+
+# Per-process scorer, built once by the pool initializer
+_worker_scorer: Optional[ImageScorer] = None
+
+
+def init_worker(
+    config_path: Optional[str],
+    log_level: str,
+    detector_threads: int,
+    cache_path: Optional[str],
+    workers: int = 1,
+) -> None:
+    """Process pool initializer: load config and build detectors once per worker."""
+    global _worker_scorer
+    get_config(config_path)
+    setup_logging(log_level)
+    _worker_scorer = ImageScorer(
+        detector_threads=detector_threads, cache_path=cache_path, workers=workers
+    )
+
+
+def score_batch_in_worker(images: list[tuple[str, bytes]]) -> list[Optional[dict]]:
+    """Score a batch of images with the worker's scorer."""
+    return _worker_scorer.score_batch(images)
+
+
+def warm_up_worker(barrier=None, timeout: Optional[float] = None) -> int:
+    """
+    Task forcing a worker process (and its detectors) to start.
+
+    Args:
+        barrier: Optional shared barrier (e.g. a multiprocessing Manager Barrier)
+            with one party per worker. Waiting on it keeps this worker busy, so
+            the pool must start a new process for every other warm-up task
+        timeout: Max seconds to wait on the barrier
+
+    Returns:
+        PID of the worker process
+    """
+    if barrier is not None:
+        barrier.wait(timeout)
+    return os.getpid()
+
+
+def _iter_batches(
+    images: Iterable[tuple[str, bytes, str]], batch_size: int
+) -> Iterator[list[tuple[str, bytes, str]]]:
+    """Group a stream of images into lists of at most batch_size."""
+    batch = []
+    for image in images:
+        batch.append(image)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def iter_scored_images(
+    images: Iterable[tuple[str, bytes, str]],
+    scorer: ImageScorer,
+    workers: int = 1,
+    config_path: Optional[str] = None,
+    log_level: str = "INFO",
+    batch_size: Optional[int] = None,
+) -> Iterator[tuple[str, Optional[dict]]]:
+    """
+    Score images in batches, serially or on a process pool, yielding in input order.
+
+    Images are grouped into batches of batch_size so detectors can share setup
+    work across images (see Detector.analyze_batch).
+    With workers > 1, each worker process builds its own detectors once (with
+    the scorer's detector_threads and cache settings) and scores batches handed
+    to it.
+    At most 2 x workers batches are in flight, so memory stays bounded, and
+    results are yielded in the order the images were read so reports and
+    metrics match the serial run exactly.
+
+    Args:
+        images: Iterable of (image_path, image_bytes, label)
+        scorer: Scorer used for the serial path
+        workers: Number of worker processes (1 = serial, in-process)
+        config_path: Custom config path, re-loaded in each worker
+        log_level: Logging level for worker processes
+        batch_size: Images per batch (optional, uses config if None)
+
+    Yields:
+        Tuples: (label, record) where record is None for skipped images
+    """
+    if batch_size is None:
+        batch_size = get_config().get_int("image_scorer.batch_size", 8)
+    batches = _iter_batches(images, max(1, batch_size))
+
+    if workers <= 1:
+        for batch in batches:
+            records = scorer.score_batch([(path, image_bytes) for path, image_bytes, _ in batch])
+            for (_, _, label), record in zip(batch, records):
+                yield label, record
+        return
+
+    window = 2 * workers
+    pending: deque[tuple[list[str], Future]] = deque()
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=init_worker,
+        initargs=(config_path, log_level, scorer.detector_threads, scorer.cache_path, workers),
+    ) as executor:
+        for batch in batches:
+            labels = [label for _, _, label in batch]
+            future = executor.submit(
+                score_batch_in_worker, [(path, image_bytes) for path, image_bytes, _ in batch]
+            )
+            pending.append((labels, future))
+            if len(pending) >= window:
+                labels, future = pending.popleft()
+                yield from zip(labels, future.result())
+
+        while pending:
+            labels, future = pending.popleft()
+            yield from zip(labels, future.result())
@@ -0,0 +1,127 @@
+import json
+import logging
+from pathlib import Path
+from typing import Iterable, Optional, TextIO
+from forgery_detection.modes.evaluation_mode import extract_criteria
+from forgery_detection.modes.image_scorer import ImageScorer, iter_scored_images
+from forgery_detection.services.image_loader import ImageLoader
+from forgery_detection.services.classifier import Classifier
+from forgery_detection.services.duplicate_clusterer import DuplicateClusterer
+from forgery_detection.utils.console import (
+    print_section,
+    print_table_row,
+    print_info,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class PredictionMode:
+    "Prediction mode for unlabeled images: score each image and stream decisions to JSONL."
+
+    def __init__(self, detector_threads: int = 1, cache_path: Optional[str] = None):
+        self.scorer = ImageScorer(detector_threads=detector_threads, cache_path=cache_path)
+        self.image_loader = ImageLoader()
+        self.classifier = Classifier()
+        self.duplicate_clusterer = DuplicateClusterer()
+
+    def run_prediction(self, context: dict) -> dict[str, int]:
+        print_section("PREDICTION: Scoring Unlabeled Images")
+        print_info("Loading images from:")
+        for entry in context["predict"]:
+            print_table_row("Input:", entry)
+        print_table_row("Output:", context["output"])
+        print_table_row("Config:", context["config_file"])
+        if context.get("workers", 1) > 1:
+            print_table_row("Workers:", str(context["workers"]))
+
+        criteria = extract_criteria(context["criteria"])
+
+        # Stream images and score each one as it is loaded
+        images = self.image_loader.iter_unlabeled_images(
+            context["predict"], context.get("recursive", False)
+        )
+        # Tag each image with its path so skipped images can still be reported
+        images = ((path, image_bytes, path) for path, image_bytes, _ in images)
+        scored_images = iter_scored_images(
+            images,
+            self.scorer,
+            workers=context.get("workers", 1),
+            config_path=context.get("config_path"),
+            log_level=context.get("log_level", "INFO"),
+        )
+
+        Path(context["output"]).parent.mkdir(parents=True, exist_ok=True)
+        hashed: list[dict] = []
+        try:
+            with open(context["output"], "w") as output:
+                counts = self._write_predictions(output, criteria, scored_images, hashed)
+        finally:
+            self.close()
+        logger.info(f"Predictions saved to: {context['output']}")
+
+        # Near-duplicates are only known once every image is hashed: written next to the output
+        duplicate_clusters = self.duplicate_clusterer.find_clusters(hashed)
+        counts["duplicate_clusters"] = len(duplicate_clusters)
+        if duplicate_clusters:
+            clusters_path = self._clusters_path(context["output"])
+            with open(clusters_path, "w") as f:
+                json.dump(duplicate_clusters, f, indent=2)
+            logger.info(f"Duplicate clusters saved to: {clusters_path}")
+
+        print_section("PREDICTIONS BY CRITERIA")
+        print_table_row("Scored:", str(counts["scored"]))
+        print_table_row("Skipped:", str(counts["skipped"]))
+        for c in criteria:
+            print_table_row(f"{c.title()}:", f"{counts[c]} flagged as forged")
+        if duplicate_clusters:
+            print_table_row("Duplicates:", f"{len(duplicate_clusters)} near-duplicate clusters")
+
+        return counts
+
+    def close(self) -> None:
+        """Release the scorer's thread pools, detector resources and score cache."""
+        self.scorer.close()
+
+    @staticmethod
+    def _clusters_path(output: str) -> str:
+        # predictions.jsonl -> predictions.duplicates.json
+        path = Path(output)
+        return str(path.with_name(f"{path.stem}.duplicates.json"))
+
+    def _write_predictions(
+        self,
+        output: TextIO,
+        criteria: list,
+        scored_images: Iterable[tuple[str, Optional[dict]]],
+        hashed: Optional[list[dict]] = None,
+    ) -> dict[str, int]:
+        # One JSON line per image, flushed immediately so the file can be tailed
+        counts = {"scored": 0, "skipped": 0, **{c: 0 for c in criteria}}
+        for image_path, record in scored_images:
+            if record is None:
+                line = {"path": image_path, "error": "unsupported format"}
+                counts["skipped"] += 1
+            else:
+                decisions = {
+                    c: self.classifier.classify(record["final_score"], c) for c in criteria
+                }
+                line = {
+                    "path": record["filename"],
+                    "format": record["format"],
+                    "final_score": record["final_score"],
+                    "detector_scores": record["detector_scores"],
+                    "predictions": decisions,
+                    "phash": record.get("phash"),
+                }
+                # Kept (path and hash only) for duplicate clustering after the run
+                if hashed is not None:
+                    hashed.append({"filename": record["filename"], "phash": record.get("phash")})
+                counts["scored"] += 1
+                for c, decision in decisions.items():
+                    counts[c] += decision == "forged"
+
+            output.write(json.dumps(line) + "\n")
+            output.flush()
+
+        return counts
@@ -0,0 +1,338 @@
+import json
+import logging
+import multiprocessing
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+from forgery_detection.config_loader import get_config
+from forgery_detection.modes.evaluation_mode import extract_criteria
+from forgery_detection.modes.image_scorer import init_worker, score_batch_in_worker, warm_up_worker
+from forgery_detection.services.classifier import Classifier
+from forgery_detection.utils.console import print_section, print_table_row, print_info
+
+logger = logging.getLogger(__name__)
+
+
+class ServiceMetrics:
+    """Thread-safe request counters, queue depth and latency window of the scoring service."""
+
+    def __init__(self, latency_window: int):
+        """
+        Initialize counters.
+
+        Args:
+            latency_window: Number of most recent request latencies kept for percentiles
+        """
+        self._lock = threading.Lock()
+        self.started = time.time()
+        self.requests = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.latencies: deque[float] = deque(maxlen=latency_window)
+
+    def request_started(self) -> None:
+        """Count a request entering the queue."""
+        with self._lock:
+            self.in_flight += 1
+
+    def request_finished(self, latency: float, error: bool = False) -> None:
+        """Count a finished request and record its latency (seconds)."""
+        with self._lock:
+            self.in_flight -= 1
+            self.requests += 1
+            self.errors += int(error)
+            self.latencies.append(latency)
+
+    def snapshot(self) -> dict:
+        """Current counters plus latency percentiles (ms) over the recent window."""
+        with self._lock:
+            latencies = np.array(self.latencies, dtype=np.float64) * 1000.0
+            snapshot = {
+                "uptime_seconds": round(time.time() - self.started, 1),
+                "requests_total": self.requests,
+                "errors_total": self.errors,
+                "queue_depth": self.in_flight,
+            }
+
+        if len(latencies):
+            p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+            snapshot["latency_ms"] = {
+                "window": len(latencies),
+                "mean": round(float(latencies.mean()), 2),
+                "p50": round(float(p50), 2),
+                "p95": round(float(p95), 2),
+                "p99": round(float(p99), 2),
+                "max": round(float(latencies.max()), 2),
+            }
+        return snapshot
+
+
+class _ScoringRequestHandler(BaseHTTPRequestHandler):
+    """Routes HTTP requests to the ServingMode attached to the server."""
+
+    server_version = "ForgeryDetection/1.0"
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        if path == "/health":
+            self._send_json(200, {"status": "ok"})
+        elif path == "/metrics":
+            self._send_json(200, self.server.serving_mode.metrics.snapshot())
+        else:
+            self._send_json(404, {"error": f"Unknown endpoint: {path}"})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        if url.path != "/score":
+            self._send_json(404, {"error": f"Unknown endpoint: {url.path}"})
+            return
+
+        serving_mode = self.server.serving_mode
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+        except ValueError:
+            self._send_json(400, {"error": "Invalid Content-Length header"})
+            return
+        if length <= 0:
+            self._send_json(400, {"error": "Request body must contain the image bytes"})
+            return
+        if length > serving_mode.max_request_bytes:
+            self._send_json(
+                413, {"error": f"Image larger than {serving_mode.max_request_bytes} bytes"}
+            )
+            return
+
+        query = parse_qs(url.query)
+        image_bytes = self.rfile.read(length)
+        status, payload = serving_mode.score(
+            image_bytes,
+            filename=query.get("filename", ["upload"])[0],
+            criteria=query.get("criteria", ["all"])[0],
+        )
+        self._send_json(status, payload)
+
+    def _send_json(self, status: int, payload: dict):
+        body = json.dumps(payload, default=str).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Route access logs through logging instead of stderr
+        logger.debug(f"{self.address_string()} - {format % args}")
+
+
+class ServingMode:
+    "Serving mode: long-running HTTP service scoring uploaded images with warm detectors."
+
+    def __init__(
+        self,
+        workers: int = 1,
+        detector_threads: int = 1,
+        cache_path: Optional[str] = None,
+        config_path: Optional[str] = None,
+        log_level: str = "INFO",
+    ):
+        """
+        Initialize the service (detectors are built when the worker pool starts).
+
+        Args:
+            workers: Worker processes scoring images (each keeps its own detectors warm)
+            detector_threads: Threads running one image's detectors concurrently
+            cache_path: Optional SQLite detector score cache
+            config_path: Custom config path, re-loaded in each worker
+            log_level: Logging level for worker processes
+        """
+        config = get_config()
+        self.workers = max(1, workers)
+        self.detector_threads = detector_threads
+        self.cache_path = cache_path
+        self.config_path = config_path
+        self.log_level = log_level
+        self.max_request_bytes = config.get_int("serving.max_request_bytes", 50 * 1024 * 1024)
+        self.metrics = ServiceMetrics(config.get_int("serving.latency_window", 1000))
+        # Micro-batching: concurrent requests are scored together on one worker
+        self.batch_size = max(1, config.get_int("serving.batch_size", 8))
+        self.batch_wait = config.get_float("serving.batch_wait_ms", 5.0) / 1000.0
+        self.warm_up_timeout = config.get_float("serving.warm_up_timeout_seconds", 120.0)
+        self.classifier = Classifier()
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._requests: queue.Queue = queue.Queue()
+        self._dispatcher: Optional[threading.Thread] = None
+        # PIDs of the started worker processes
+        self.worker_pids: set[int] = set()
+
+    def start(self, host: str, port: int) -> ThreadingHTTPServer:
+        """
+        Start the worker pool and bind the HTTP server (does not block).
+
+        Args:
+            host: Interface to bind
+            port: Port to bind (0 picks a free port)
+
+        Returns:
+            The bound server; call serve_forever() on it
+        """
+        # CPU-bound scoring runs in processes; HTTP threads only wait on futures
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=init_worker,
+            initargs=(
+                self.config_path,
+                self.log_level,
+                self.detector_threads,
+                self.cache_path,
+                self.workers,
+            ),
+        )
+        # Start every worker now so the first requests don't pay for imports and detector setup.
+        # Each warm-up blocks on a shared barrier until all workers reached it, so no
+        # idle worker can take two of them and every process is spawned
+        with multiprocessing.Manager() as manager:
+            barrier = manager.Barrier(self.workers)
+            warm_ups = [
+                self._executor.submit(warm_up_worker, barrier, self.warm_up_timeout)
+                for _ in range(self.workers)
+            ]
+            self.worker_pids = {future.result() for future in warm_ups}
+        logger.info(f"Started {len(self.worker_pids)} scoring worker(s)")
+
+        self._dispatcher = threading.Thread(
+            target=self._dispatch, name="batch-dispatcher", daemon=True
+        )
+        self._dispatcher.start()
+
+        self._server = ThreadingHTTPServer((host, port), _ScoringRequestHandler)
+        self._server.daemon_threads = True
+        self._server.serving_mode = self
+        return self._server
+
+    def score(
+        self, image_bytes: bytes, filename: str = "upload", criteria: str = "all"
+    ) -> tuple[int, dict]:
+        """
+        Score one uploaded image on the worker pool.
+
+        The request joins the current micro-batch; batches run through the
+        detectors' batch path (Detector.analyze_batch) on one worker.
+
+        Args:
+            image_bytes: Raw image data
+            filename: Name echoed back in the response
+            criteria: Criteria to decide on (e.g. "balanced", "strict,aggressive" or "all")
+
+        Returns:
+            Tuple (HTTP status, JSON payload) with the same per-detector breakdown
+            as evaluation mode's image details
+        """
+        self.metrics.request_started()
+        start = time.perf_counter()
+        error = True
+        try:
+            future: Future = Future()
+            self._requests.put((filename, image_bytes, future))
+            record = future.result()
+            if record is None:
+                return 415, {"error": "Unsupported image format"}
+
+            record["predictions"] = {
+                c: self.classifier.classify(record["final_score"], c)
+                for c in extract_criteria(criteria)
+            }
+            error = False
+            return 200, record
+        except Exception as e:
+            logger.error(f"Scoring {filename} failed: {type(e).__name__}: {e}")
+            return 500, {"error": f"{type(e).__name__}: {e}"}
+        finally:
+            self.metrics.request_finished(time.perf_counter() - start, error=error)
+
+    def _dispatch(self) -> None:
+        """Group queued requests into batches and hand them to the worker pool."""
+        while True:
+            item = self._requests.get()
+            if item is None:
+                return
+
+            # Wait briefly for concurrent requests to share the batch
+            batch = [item]
+            deadline = time.monotonic() + self.batch_wait
+            stopping = False
+            while len(batch) < self.batch_size:
+                try:
+                    item = self._requests.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            try:
+                future = self._executor.submit(
+                    score_batch_in_worker,
+                    [(filename, image_bytes) for filename, image_bytes, _ in batch],
+                )
+                future.add_done_callback(lambda f, batch=batch: self._resolve(batch, f))
+            except Exception as e:
+                for _, _, request in batch:
+                    request.set_exception(e)
+
+            if stopping:
+                return
+
+    def _resolve(self, batch: list[tuple[str, bytes, Future]], future: Future) -> None:
+        """Hand each request of a finished batch its record (or the batch's error)."""
+        error = future.exception()
+        for i, (_, _, request) in enumerate(batch):
+            if error is not None:
+                request.set_exception(error)
+            else:
+                request.set_result(future.result()[i])
+
+    def close(self) -> None:
+        """Stop the HTTP server, the batch dispatcher and the worker pool."""
+        if self._server is not None:
+            self._server.server_close()
+            self._server = None
+        if self._dispatcher is not None:
+            self._requests.put(None)
+            self._dispatcher.join()
+            self._dispatcher = None
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def run_serving(self, context: dict):
+        """Serve until interrupted (Ctrl+C)."""
+        config = get_config()
+        host = context.get("host") or config.get("serving.host", "127.0.0.1")
+        port = context.get("port")
+        server = self.start(
+            host, port if port is not None else config.get_int("serving.port", 8080)
+        )
+        host, port = server.server_address[:2]
+
+        print_section("SERVING: HTTP Scoring Service")
+        print_table_row("Listening:", f"http://{host}:{port}")
+        print_table_row("Workers:", str(self.workers))
+        print_table_row("Config:", context["config_file"])
+        print_info("\nEndpoints: POST /score (image bytes), GET /metrics, GET /health")
+
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            logger.info("Shutting down scoring service")
+        finally:
+            self.close()
@@ -0,0 +1,74 @@
+import logging
+from forgery_detection.services.classifier import Classifier
+from forgery_detection.services.score_aggregator import ScoreAggregator
+from forgery_detection.services.score_store import ScoreStore
+from forgery_detection.services.weight_tuner import WeightTuner
+from forgery_detection.utils.console import (
+    print_section,
+    print_table_row,
+    format_percentage,
+    print_info,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class TuningMode:
+    "Tuning mode: search aggregation weights and per-mode thresholds over stored detector scores."
+
+    def __init__(self):
+        self.score_store = ScoreStore()
+        self.score_aggregator = ScoreAggregator()
+        self.classifier = Classifier()
+        self.weight_tuner = WeightTuner()
+
+    def run_tuning(self, context: dict) -> dict:
+        print_section("TUNING: Searching Weights and Thresholds")
+        print_table_row("Scores:", context["tune"])
+        print_table_row("Config:", context["config_file"])
+        print_table_row("Samples:", str(self.weight_tuner.n_samples))
+
+        records = self.score_store.read(context["tune"])
+        result = self.weight_tuner.tune(records, self.score_aggregator.weights)
+
+        print_info(
+            f"\nEvaluated {result['evaluated']:,} weight/threshold settings "
+            f"in {result['elapsed']:.2f}s"
+        )
+
+        print_section("BEST SETTINGS BY CRITERIA")
+        for mode, metrics in result["metrics"].items():
+            target = self.weight_tuner.targets[mode]
+            status = "" if metrics["feasible"] else "  (targets not met)"
+            print(
+                f"\nMODE: {mode.upper()} (threshold={result['thresholds'][mode]}, "
+                f"current={self.classifier.get_threshold(mode)}){status}"
+            )
+            print_table_row("Targets:", ", ".join(f"{k}={v}" for k, v in target.items()))
+            print_table_row("Precision:", format_percentage(metrics["precision"]))
+            print_table_row("Recall:", format_percentage(metrics["recall"]))
+            print_table_row("FPR:", format_percentage(metrics["fpr"]))
+            print_table_row("F1:", format_percentage(metrics["f1"]))
+
+        print_section("PARETO FRONT (precision vs recall)")
+        for point in result["pareto"]:
+            weights = ", ".join(f"{k}={v:.2f}" for k, v in point["weights"].items())
+            print(
+                f"  P={format_percentage(point['precision']):>6}  "
+                f"R={format_percentage(point['recall']):>6}  "
+                f"t={point['threshold']:.2f}  [{weights}]"
+            )
+
+        print_section("SUGGESTED CONFIG")
+        print(self._format_config(result))
+        return result
+
+    def _format_config(self, result: dict) -> str:
+        # YAML snippet ready to paste into config.yml
+        lines = ["classifier:", "  modes:"]
+        for mode, threshold in result["thresholds"].items():
+            lines += [f"    {mode}:", f"      threshold: {threshold}"]
+        lines += ["score_aggregator:", "  default_weights:"]
+        for name, weight in result["weights"].items():
+            lines.append(f"    {name}: {weight:.3f}")
+        return "\n".join(lines)
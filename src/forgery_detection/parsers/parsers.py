@@ -10,14 +10,64 @@ class InputParser:
 
         parser.add_argument(
             "--forged_dir",
-            required=True,
-            help="Directory with forged images",
+            default=None,
+            help=(
+                "Directory with forged images (required unless --predict, --serve, --replay or "
+                "--tune is given)"
+            ),
         )
 
         parser.add_argument(
             "--authentic_dir",
-            required=True,
-            help="Directory with authentic images",
+            default=None,
+            help=(
+                "Directory with authentic images (required unless --predict, --serve, --replay "
+                "or --tune is given)"
+            ),
+        )
+
+        parser.add_argument(
+            "--recursive",
+            action="store_true",
+            help="Also load images from subdirectories of --forged_dir and --authentic_dir",
+        )
+
+        parser.add_argument(
+            "--predict",
+            nargs="+",
+            default=None,
+            help=(
+                "Score unlabeled images: directories, image files and/or .txt files listing "
+                "image paths"
+            ),
+        )
+
+        parser.add_argument(
+            "--output",
+            default="predictions.jsonl",
+            help=(
+                "JSONL file receiving one prediction per image with --predict (default: "
+                "predictions.jsonl)"
+            ),
+        )
+
+        parser.add_argument(
+            "--serve",
+            action="store_true",
+            help="Run a long-lived HTTP scoring service (POST /score, GET /metrics, GET /health)",
+        )
+
+        parser.add_argument(
+            "--host",
+            default=None,
+            help="Interface the --serve service binds (default: serving.host in config)",
+        )
+
+        parser.add_argument(
+            "--port",
+            type=int,
+            default=None,
+            help="Port the --serve service binds (default: serving.port in config)",
         )
 
         parser.add_argument(
@@ -29,7 +79,54 @@ class InputParser:
         parser.add_argument(
             "--report",
             default="report.md",
-            help="Output markdown report filename (default: report.md, timestamp will be added automatically)",
+            help=(
+                "Output markdown report filename (default: report.md, timestamp will be added "
+                "automatically)"
+            ),
+        )
+
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="Number of worker processes scoring images in parallel (default: 1, serial)",
+        )
+
+        parser.add_argument(
+            "--detector-threads",
+            type=int,
+            default=1,
+            help="Threads running the detectors of one image concurrently (default: 1, sequential)",
+        )
+
+        parser.add_argument(
+            "--cache",
+            default=None,
+            help=(
+                "SQLite file caching detector scores by image content and detector config "
+                "(default: disabled)"
+            ),
+        )
+
+        parser.add_argument(
+            "--save-scores",
+            default=None,
+            help="Write per-image detector scores (JSONL) for later --replay or tuning",
+        )
+
+        parser.add_argument(
+            "--replay",
+            default=None,
+            help=(
+                "Skip image analysis; recompute scores, metrics and report from a --save-scores "
+                "file"
+            ),
+        )
+
+        parser.add_argument(
+            "--tune",
+            default=None,
+            help="Search score weights and per-criteria thresholds over a --save-scores file",
         )
 
         parser.add_argument(
@@ -42,7 +139,10 @@ class InputParser:
         parser.add_argument(
             "--config",
             default=None,
-            help="Path to custom config file. Can be absolute path or filename in project root (default: config.yml)",
+            help=(
+                "Path to custom config file. Can be absolute path or filename in project root "
+                "(default: config.yml)"
+            ),
         )
 
         return parser.parse_args()
@@ -0,0 +1,235 @@
+"""Overlapping-block DCT matching for copy-move detection in flat regions."""
+
+import cv2
+import numpy as np
+
+from forgery_detection.utils.regional_stats import RegionalStats
+
+# Low-frequency DCT coefficients (u, v) in zigzag order
+ZIGZAG = [
+    (0, 0),
+    (0, 1),
+    (1, 0),
+    (2, 0),
+    (1, 1),
+    (0, 2),
+    (0, 3),
+    (1, 2),
+    (2, 1),
+    (3, 0),
+    (4, 0),
+    (3, 1),
+]
+
+# FNV-1a style mixing of quantized coefficients into one 64-bit key
+_HASH_PRIME = np.uint64(0x100000001B3)
+_HASH_OFFSET = np.uint64(0xCBF29CE484222325)
+
+# Low key bits addressing the membership table that prefilters lookups
+_FILTER_BITS = 24
+_FILTER_MASK = np.uint64((1 << _FILTER_BITS) - 1)
+
+
+def dct_basis(size: int, frequencies: int) -> np.ndarray:
+    """
+    Rows of the orthonormal DCT-II matrix.
+
+    Args:
+        size: Block side in pixels
+        frequencies: Number of lowest frequencies returned
+
+    Returns:
+        frequencies x size float32 array
+    """
+    n = np.arange(size)
+    basis = np.array([np.cos(np.pi * (2 * n + 1) * u / (2 * size)) for u in range(frequencies)])
+    basis *= np.sqrt(2.0 / size)
+    basis[0] /= np.sqrt(2.0)
+    return basis.astype(np.float32)
+
+
+class BlockMatcher:
+    """
+    Finds duplicated blocks within an image from quantized block DCT features.
+
+    Keypoint detectors find no corners in flat areas (painted panels, walls,
+    sky), which is exactly where clone-stamp retouching hides damage. This
+    engine describes every overlapping block_size x block_size block by its
+    lowest DCT coefficients instead:
+
+    1. Coefficients are separable correlations, so each one is a vertical and
+       a horizontal 1D filter pass over the image (no per-block transform)
+    2. Quantized coefficients are hashed to one 64-bit key per block
+    3. Blocks on a sparse grid (every index_step pixels) are sorted by key;
+       the blocks at every pixel position then look their key up in it, so a
+       copy at any offset meets the grid block it was copied from, while only
+       the sparse grid is held in memory
+    4. Matches are grouped by shift vector: a cloned region yields many block
+       pairs with the same shift, random collisions do not
+
+    Images are processed in horizontal tiles of tile_rows block rows, so the
+    float working set stays bounded on 12 MP images. Blocks whose pixel
+    standard deviation is below min_block_std (saturated or synthetic flat
+    areas, which match everywhere) are ignored.
+    """
+
+    def __init__(
+        self,
+        block_size: int = 16,
+        coefficients: int = 12,
+        quantization: float = 1.0,
+        index_step: int = 4,
+        min_block_std: float = 1.0,
+        max_candidates: int = 4,
+        min_shift_pairs: int = 16,
+        min_distance: int = 50,
+        tile_rows: int = 256,
+    ):
+        """
+        Initialize matcher.
+
+        Args:
+            block_size: Block side in pixels
+            coefficients: Low-frequency DCT coefficients per block (zigzag order, max 12)
+            quantization: Quantization step of the orthonormal DCT coefficients
+            index_step: Grid spacing of the indexed blocks in pixels
+            min_block_std: Blocks with a lower pixel standard deviation are ignored
+            max_candidates: Indexed blocks compared per queried key
+            min_shift_pairs: Block pairs sharing a shift vector needed to accept it
+            min_distance: Minimum shift length in pixels (overlapping blocks match trivially)
+            tile_rows: Block rows processed per tile
+        """
+        self.block_size = block_size
+        self.frequencies = ZIGZAG[: min(coefficients, len(ZIGZAG))]
+        self.quantization = quantization
+        self.index_step = index_step
+        self.min_block_std = min_block_std
+        self.max_candidates = max_candidates
+        self.min_shift_pairs = min_shift_pairs
+        self.min_distance = min_distance
+        self.tile_rows = max(tile_rows, index_step)
+        self._basis = dct_basis(block_size, 1 + max(max(u, v) for u, v in self.frequencies))
+
+    def find_clones(self, gray: np.ndarray) -> dict:
+        """
+        Detect duplicated regions.
+
+        Args:
+            gray: Grayscale image (H x W)
+
+        Returns:
+            Dict with shifts (accepted (dy, dx) vectors with their pair counts,
+            most supported first) and matched_fraction (share of indexed blocks
+            belonging to an accepted shift, roughly the cloned area fraction)
+        """
+        height, width = gray.shape[:2]
+        rows, cols = height - self.block_size + 1, width - self.block_size + 1
+        result = {"shifts": [], "matched_fraction": 0.0}
+        if rows <= 0 or cols <= 0:
+            return result
+
+        # Pass 1: sorted keys of the sparse grid of indexed blocks
+        step = self.index_step
+        tile_rows = self.tile_rows - self.tile_rows % step
+        index_keys, index_positions = [], []
+        for r0 in range(0, rows, tile_rows):
+            r1 = min(r0 + tile_rows, rows)
+            keys = self._tile_keys(gray, r0, r1, cols, step)
+            # Flat blocks share keys with every other flat block of the same tone
+            _, stds = RegionalStats(gray[r0 : r1 + self.block_size - 1]).windows(
+                self.block_size, step
+            )
+            y, x = np.nonzero(stds >= self.min_block_std)
+            index_keys.append(keys[y, x])
+            index_positions.append(np.stack([r0 + y * step, x * step], axis=1))
+        index_keys = np.concatenate(index_keys)
+        index_positions = np.concatenate(index_positions)
+        total = len(index_keys)
+        if total == 0:
+            return result
+        order = np.argsort(index_keys, kind="stable")
+        index_keys, index_positions = index_keys[order], index_positions[order]
+        # Membership table on the low key bits: most queried keys are in no
+        # indexed block and are dropped before the (cache-unfriendly) binary search
+        indexed = np.zeros(1 << _FILTER_BITS, dtype=bool)
+        indexed[index_keys & _FILTER_MASK] = True
+
+        # Pass 2: every block position looks up its key among the indexed blocks
+        # (flat blocks need no check here: their keys match no indexed block)
+        shifts, sources = [], []
+        for r0 in range(0, rows, self.tile_rows):
+            keys = self._tile_keys(gray, r0, min(r0 + self.tile_rows, rows), cols)
+            y, x = np.nonzero(indexed[keys & _FILTER_MASK])
+            keys = keys[y, x]
+            left = np.searchsorted(index_keys, keys, side="left")
+            right = np.searchsorted(index_keys, keys, side="right")
+            for j in range(self.max_candidates):
+                hit = left + j < right
+                candidates = left[hit] + j
+                shift = np.stack([r0 + y[hit], x[hit]], axis=1) - index_positions[candidates]
+                shifts.append(shift)
+                sources.append(candidates)
+        shifts = np.concatenate(shifts)
+        sources = np.concatenate(sources)
+
+        # A clone matches in both directions: fold (dy, dx) and (-dy, -dx) together
+        flip = (shifts[:, 0] < 0) | ((shifts[:, 0] == 0) & (shifts[:, 1] < 0))
+        shifts[flip] *= -1
+        far = np.hypot(shifts[:, 0], shifts[:, 1]) >= self.min_distance
+        shifts, sources = shifts[far], sources[far]
+        if len(shifts) == 0:
+            return result
+
+        # Group by shift vector (packed into one int64 for a 1D sort); only
+        # well-supported shifts are clones
+        packed = shifts[:, 0] * (2 * width + 1) + (shifts[:, 1] + width)
+        unique, inverse, counts = np.unique(packed, return_inverse=True, return_counts=True)
+        accepted = counts >= self.min_shift_pairs
+        if not accepted.any():
+            return result
+
+        matched = np.unique(sources[accepted[inverse]])
+        ranked = np.argsort(-counts[accepted], kind="stable")
+        dy, dx = np.divmod(unique[accepted][ranked], 2 * width + 1)
+        result["shifts"] = [
+            {"dy": int(y), "dx": int(x - width), "pairs": int(n)}
+            for y, x, n in zip(dy, dx, counts[accepted][ranked])
+        ]
+        result["matched_fraction"] = len(matched) / total
+        return result
+
+    def _tile_keys(
+        self, gray: np.ndarray, r0: int, r1: int, cols: int, step: int = 1
+    ) -> np.ndarray:
+        """
+        Keys of the blocks with top-left corner in rows [r0, r1), every step pixels.
+
+        Args:
+            gray: Grayscale image
+            r0, r1: Block rows of the tile
+            cols: Block columns of the image
+            step: Spacing of the returned blocks along both axes
+
+        Returns:
+            uint64 block keys indexed by sampled block row and column
+        """
+        tile = gray[r0 : r1 + self.block_size - 1].astype(np.float32)
+
+        # Vertical passes, one per vertical frequency, anchored at the block's top row;
+        # only the sampled rows go through the horizontal passes
+        vertical = {
+            u: cv2.filter2D(tile, -1, self._basis[u].reshape(-1, 1), anchor=(0, 0))[
+                : r1 - r0 : step
+            ]
+            for u in sorted({u for u, _ in self.frequencies})
+        }
+
+        keys = np.full(vertical[0][:, :cols:step].shape, _HASH_OFFSET, dtype=np.uint64)
+        for u, v in self.frequencies:
+            coefficient = cv2.filter2D(
+                vertical[u], -1, self._basis[v].reshape(1, -1), anchor=(0, 0)
+            )
+            quantized = np.rint(coefficient[:, :cols:step] / self.quantization).astype(np.int64)
+            keys ^= quantized.view(np.uint64)
+            keys *= _HASH_PRIME
+        return keys
@@ -0,0 +1,110 @@
+"""Nearest-neighbour self-matching of binary keypoint descriptors."""
+
+import cv2
+import numpy as np
+
+# FLANN algorithm id for locality-sensitive hashing of binary descriptors
+FLANN_INDEX_LSH = 6
+
+BACKENDS = ("bruteforce", "flann_lsh", "auto")
+
+
+class DescriptorMatcher:
+    """
+    Finds, for every descriptor of an image, its nearest other descriptors.
+
+    Backends:
+    - bruteforce: exact Hamming k-NN (cv2.BFMatcher), quadratic in keypoints
+    - flann_lsh: approximate k-NN with multi-probe LSH over the binary
+      descriptors (cv2.FlannBasedMatcher), near-linear in keypoints
+    - auto: bruteforce up to auto_threshold descriptors, flann_lsh above
+
+    Matching an image against itself returns each descriptor as its own
+    nearest neighbour. Three neighbours are requested and the self-match is
+    removed by index, so the two remaining ones are the true nearest and
+    second-nearest other descriptors (exact duplicates at distance 0 are kept).
+    """
+
+    def __init__(
+        self,
+        backend: str = "auto",
+        auto_threshold: int = 2000,
+        lsh_table_number: int = 6,
+        lsh_key_size: int = 12,
+        lsh_multi_probe_level: int = 1,
+    ):
+        """
+        Initialize matcher.
+
+        Args:
+            backend: bruteforce, flann_lsh or auto
+            auto_threshold: Descriptor count above which auto switches to flann_lsh
+            lsh_table_number: Number of LSH hash tables
+            lsh_key_size: Bits per LSH key
+            lsh_multi_probe_level: Neighbouring buckets probed per table (0 = classic LSH)
+        """
+        if backend not in BACKENDS:
+            raise ValueError(
+                f"Unknown matcher backend: {backend} (expected one of {', '.join(BACKENDS)})"
+            )
+        self.backend = backend
+        self.auto_threshold = auto_threshold
+        self.index_params = {
+            "algorithm": FLANN_INDEX_LSH,
+            "table_number": lsh_table_number,
+            "key_size": lsh_key_size,
+            "multi_probe_level": lsh_multi_probe_level,
+        }
+        # Built once and shared by every image (and thread): knnMatch against an
+        # explicit train set works on an internal copy and leaves the matcher untouched
+        self._matchers = {
+            "bruteforce": cv2.BFMatcher(cv2.NORM_HAMMING, crossCheck=False),
+            "flann_lsh": cv2.FlannBasedMatcher(self.index_params, {"checks": 50}),
+        }
+
+    def backend_for(self, n_descriptors: int) -> str:
+        """Backend used for an image with n_descriptors descriptors."""
+        if self.backend == "auto":
+            return "flann_lsh" if n_descriptors > self.auto_threshold else "bruteforce"
+        return self.backend
+
+    def match_self(self, descriptors: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Two nearest other descriptors of every descriptor.
+
+        Args:
+            descriptors: Binary descriptors (N x bytes, uint8)
+
+        Returns:
+            Tuple (indices, distances), each N x 2: nearest and second-nearest
+            other descriptor. Missing neighbours have index -1 and distance inf.
+        """
+        n = len(descriptors)
+        indices = np.full((n, 2), -1, dtype=np.int64)
+        distances = np.full((n, 2), np.inf)
+        if n < 2:
+            return indices, distances
+
+        k = min(3, n)
+        knn = self._matchers[self.backend_for(n)].knnMatch(descriptors, descriptors, k=k)
+
+        # Flatten the neighbour lists (LSH may return fewer than k) into arrays
+        counts = np.fromiter(map(len, knn), dtype=np.int64, count=n)
+        flat = [match for neighbours in knn for match in neighbours]
+        train_idx = np.fromiter((m.trainIdx for m in flat), dtype=np.int64, count=len(flat))
+        match_distances = np.fromiter((m.distance for m in flat), dtype=np.float64, count=len(flat))
+        query_idx = np.repeat(np.arange(n), counts)
+
+        # Skip the trivial self-match by index, then keep each row's first two neighbours
+        other = train_idx != query_idx
+        query_idx, train_idx, match_distances = (
+            query_idx[other],
+            train_idx[other],
+            match_distances[other],
+        )
+        row_starts = np.searchsorted(query_idx, np.arange(n))
+        rank = np.arange(len(query_idx)) - row_starts[query_idx]
+        kept = rank < 2
+        indices[query_idx[kept], rank[kept]] = train_idx[kept]
+        distances[query_idx[kept], rank[kept]] = match_distances[kept]
+        return indices, distances
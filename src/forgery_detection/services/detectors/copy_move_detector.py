@@ -1,16 +1,28 @@
 """Copy-Move detection detector (TIER 2)."""
 
-import io
 import logging
+import math
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
 import numpy as np
 from PIL import Image
 import cv2
 
+from forgery_detection.services.block_matcher import BlockMatcher
+from forgery_detection.services.descriptor_matcher import DescriptorMatcher
 from forgery_detection.services.detectors.detector import Detector
+from forgery_detection.services.format_detector import FormatDetector
+from forgery_detection.services.image_context import ImageContext
 from forgery_detection.config_loader import get_config
+from forgery_detection.utils.regional_stats import grid_edges
 
 logger = logging.getLogger(__name__)
 
+# Context kept around each tile so keypoints at tile borders get full
+# descriptors (ORB's default edgeThreshold/patchSize is 31)
+TILE_MARGIN = 32
+
 
 class CopyMoveDetector(Detector):
     """
@@ -19,9 +31,27 @@ class CopyMoveDetector(Detector):
     Algorithm:
     1. Convert to grayscale
     2. Detect keypoints using ORB (Oriented FAST and Rotated BRIEF)
-    3. Match similar keypoints
+    3. Match similar keypoints (exact brute force, or approximate LSH for
+       thousands of keypoints; see DescriptorMatcher)
     4. Filter for spatially separated matches (copy-move)
-    5. Score based on number of suspicious matches
+    5. Cluster matches by displacement vector: a cloned region moves all of
+       its keypoints by the same shift, while chance matches (repetitive
+       textures, noise) scatter; only matches in clusters of at least
+       min_cluster_size count
+    6. Score based on number of suspicious matches
+
+    Engines (copy_move_detector.engine, overridable per format with
+    engine_by_format):
+    - orb: the keypoint algorithm above
+    - block_dct: overlapping-block DCT matching (see BlockMatcher), which
+      also finds clones in flat regions without keypoints; scored by the
+      cloned area fraction
+    - both: the higher of the two scores
+
+    Large images (longest side above tiling.tile_size) are split into tiles,
+    each detecting its share of the n_features keypoints, so keypoints cover
+    the whole photo instead of piling up on its most textured areas.
+    Descriptors of all tiles are matched globally.
 
     Advantages:
     - Works BETTER on uncompressed formats (TIFF/BMP)
@@ -42,153 +72,380 @@ class CopyMoveDetector(Detector):
             min_distance: Minimum pixel distance for copy-move (optional, uses config if None)
         """
         config = get_config()
-        self.n_features = n_features if n_features is not None else config.get_int("copy_move_detector.n_features", 500)
-        self.match_threshold = match_threshold if match_threshold is not None else config.get_float("copy_move_detector.match_threshold", 0.75)
-        self.min_distance = min_distance if min_distance is not None else config.get_int("copy_move_detector.min_distance", 50)
-        self.suspicious_matches_divisor = config.get_float("copy_move_detector.suspicious_matches_divisor", 20.0)
-        self.max_visualized_matches = config.get_int("copy_move_detector.max_visualized_matches", 20)
+        self.n_features = (
+            n_features
+            if n_features is not None
+            else config.get_int("copy_move_detector.n_features", 500)
+        )
+        self.match_threshold = (
+            match_threshold
+            if match_threshold is not None
+            else config.get_float("copy_move_detector.match_threshold", 0.75)
+        )
+        self.min_distance = (
+            min_distance
+            if min_distance is not None
+            else config.get_int("copy_move_detector.min_distance", 50)
+        )
+        self.suspicious_matches_divisor = config.get_float(
+            "copy_move_detector.suspicious_matches_divisor", 20.0
+        )
+        self.max_visualized_matches = config.get_int(
+            "copy_move_detector.max_visualized_matches", 20
+        )
         self.error_default_score = config.get_float("copy_move_detector.error_default_score", 0.0)
-
-    def analyze(self, image_bytes: bytes) -> float:
+        # Descriptor matching backend (bruteforce | flann_lsh | auto)
+        self.matcher = DescriptorMatcher(
+            backend=config.get("copy_move_detector.matcher.backend", "auto"),
+            auto_threshold=config.get_int("copy_move_detector.matcher.auto_threshold", 2000),
+            lsh_table_number=config.get_int("copy_move_detector.matcher.lsh_table_number", 6),
+            lsh_key_size=config.get_int("copy_move_detector.matcher.lsh_key_size", 12),
+            lsh_multi_probe_level=config.get_int(
+                "copy_move_detector.matcher.lsh_multi_probe_level", 1
+            ),
+        )
+        # Engine per format recipe (orb | block_dct | both)
+        self.engine = config.get("copy_move_detector.engine", "orb")
+        self.engine_by_format = config.get_dict("copy_move_detector.engine_by_format", {})
+        self.format_detector = FormatDetector()
+        self.block_matcher = BlockMatcher(
+            block_size=config.get_int("copy_move_detector.block_dct.block_size", 16),
+            coefficients=config.get_int("copy_move_detector.block_dct.coefficients", 12),
+            quantization=config.get_float("copy_move_detector.block_dct.quantization", 1.0),
+            index_step=config.get_int("copy_move_detector.block_dct.index_step", 4),
+            min_block_std=config.get_float("copy_move_detector.block_dct.min_block_std", 1.0),
+            max_candidates=config.get_int("copy_move_detector.block_dct.max_candidates", 4),
+            min_shift_pairs=config.get_int("copy_move_detector.block_dct.min_shift_pairs", 16),
+            min_distance=self.min_distance,
+            tile_rows=config.get_int("copy_move_detector.block_dct.tile_rows", 256),
+        )
+        self.block_area_divisor = config.get_float(
+            "copy_move_detector.block_dct.area_divisor", 0.05
+        )
+        # Displacement clustering of matches
+        self.cluster_bin_size = config.get_float("copy_move_detector.clustering.bin_size", 10.0)
+        self.min_cluster_size = config.get_int("copy_move_detector.clustering.min_cluster_size", 3)
+        # Tiled keypoint detection for large images (tile_size 0 = whole image)
+        self.tile_size = config.get_int("copy_move_detector.tiling.tile_size", 1024)
+        self.min_tile_features = config.get_int("copy_move_detector.tiling.min_tile_features", 16)
+        self.tile_threads = config.get_int("copy_move_detector.tiling.threads", 1)
+        self._tile_pool: Optional[ThreadPoolExecutor] = None
+        self._tile_pool_lock = threading.Lock()
+
+    def analyze(self, image_bytes: bytes, image_context: Optional[ImageContext] = None) -> float:
         """
         Analyze image for copy-move forgery.
 
         Args:
             image_bytes: Raw image data
+            image_context: Optional shared decode context for image_bytes
 
         Returns:
             Suspicion score 0.0-1.0
         """
         try:
-            img = Image.open(io.BytesIO(image_bytes))
+            return self._score(self._get_context(image_bytes, image_context))
+
+        except Exception as e:
+            # Unable to perform copy-move detection
+            logger.warning(
+                f"CopyMoveDetector failed to analyze image: {type(e).__name__}: {e}. "
+                f"Returning default score {self.error_default_score}"
+            )
+            return self.error_default_score
 
-            # Convert to RGB if needed
-            if img.mode != "RGB":
-                img = img.convert("RGB")
+    def analyze_batch(self, image_contexts: list[ImageContext]) -> list[float]:
+        """
+        Analyze several images, sharing one ORB detector (the descriptor matchers
+        are built once per detector and shared by every image).
 
-            # Convert to numpy array
-            img_array = np.array(img)
+        Args:
+            image_contexts: Shared decode contexts, one per image
+
+        Returns:
+            Suspicion scores 0.0-1.0, in input order
+        """
+        orb = cv2.ORB_create(nfeatures=self.n_features)
+
+        scores = []
+        for ctx in image_contexts:
+            try:
+                scores.append(self._score(ctx, orb))
+            except Exception as e:
+                logger.warning(
+                    f"CopyMoveDetector failed to analyze image: {type(e).__name__}: {e}. "
+                    f"Returning default score {self.error_default_score}"
+                )
+                scores.append(self.error_default_score)
+        return scores
+
+    def _score(self, ctx: ImageContext, orb: Optional[cv2.ORB] = None) -> float:
+        """
+        Suspicion score of one image with the engine of its format.
 
-            # Convert to grayscale for feature detection
-            gray = cv2.cvtColor(img_array, cv2.COLOR_RGB2GRAY)
+        Args:
+            ctx: Shared decode context
+            orb: Optional ORB detector to reuse (created if None)
 
-            # Detect copy-move regions
-            suspicious_matches = self._detect_copy_move(gray)
+        Returns:
+            Suspicion score 0.0-1.0
+        """
+        engine = self.engine_for(ctx.image_bytes)
+        score = 0.0
 
-            # Calculate suspicion score
+        if engine in ("orb", "both"):
             # More matches = higher suspicion
             # Normalize: 0 matches = 0.0, divisor+ matches = 1.0
-            suspicion_score = min(suspicious_matches / self.suspicious_matches_divisor, 1.0)
+            _, query_idx, _ = self.find_matches(ctx, orb)
+            suspicious_matches = len(query_idx)
+            score = min(suspicious_matches / self.suspicious_matches_divisor, 1.0)
 
-            return suspicion_score
+        if engine in ("block_dct", "both"):
+            # Cloned area fraction: area_divisor+ of the image = 1.0
+            clones = self.find_block_clones(ctx)
+            score = max(score, min(clones["matched_fraction"] / self.block_area_divisor, 1.0))
 
-        except Exception as e:
-            # Unable to perform copy-move detection
-            logger.warning(
-                f"CopyMoveDetector failed to analyze image: {type(e).__name__}: {e}. "
-                f"Returning default score {self.error_default_score}"
-            )
-            return self.error_default_score
+        return score
+
+    def engine_for(self, image_bytes: bytes) -> str:
+        """Copy-move engine for an image (engine_by_format entry of its format, else engine)."""
+        format_type = self.format_detector.detect(image_bytes)
+        return self.engine_by_format.get(format_type, self.engine)
 
-    def _detect_copy_move(self, gray: np.ndarray) -> int:
+    def find_block_clones(self, ctx: ImageContext) -> dict:
         """
-        Detect copy-move regions using ORB feature matching.
+        Duplicated blocks found by the block DCT engine (memoized per image).
+
+        Args:
+            ctx: Shared decode context
+
+        Returns:
+            BlockMatcher.find_clones() result: accepted shift vectors and matched_fraction
+        """
+        return ctx.get_or_compute("block_clones", lambda: self.block_matcher.find_clones(ctx.gray))
+
+    def detect_features(
+        self, ctx: ImageContext, orb: Optional[cv2.ORB] = None
+    ) -> tuple[list, Optional[np.ndarray]]:
+        """
+        ORB keypoints and descriptors of an image (memoized per image).
+
+        Args:
+            ctx: Shared decode context
+            orb: Optional ORB detector to reuse for untiled images (created if None)
+
+        Returns:
+            Tuple (keypoints, descriptors); descriptors is None without keypoints
+        """
+        return ctx.get_or_compute(
+            f"orb@{self.n_features}", lambda: self._detect_features(ctx.gray, orb)
+        )
+
+    def find_matches(
+        self, ctx: ImageContext, orb: Optional[cv2.ORB] = None
+    ) -> tuple[list, np.ndarray, np.ndarray]:
+        """
+        Keypoints and suspicious (copy-move) matches of an image (memoized per image).
+
+        Args:
+            ctx: Shared decode context
+            orb: Optional ORB detector to reuse for untiled images (created if None)
+
+        Returns:
+            Tuple (keypoints, query indices, train indices) of the matches
+        """
+
+        def compute():
+            keypoints, descriptors = self.detect_features(ctx, orb)
+            return (keypoints, *self._match_features(keypoints, descriptors))
+
+        return ctx.get_or_compute(f"orb_matches@{self.n_features}", compute)
+
+    def _detect_features(
+        self, gray: np.ndarray, orb: Optional[cv2.ORB] = None
+    ) -> tuple[list, Optional[np.ndarray]]:
+        """
+        Detect ORB keypoints, per tile on large images.
 
         Args:
             gray: Grayscale image array
+            orb: Optional ORB detector to reuse for untiled images (created if None)
 
         Returns:
-            Number of suspicious copy-move matches
+            Tuple (keypoints, descriptors); descriptors is None without keypoints
         """
-        # Initialize ORB detector
-        orb = cv2.ORB_create(nfeatures=self.n_features)
+        height, width = gray.shape[:2]
+        if not self.tile_size or max(height, width) <= self.tile_size:
+            if orb is None:
+                orb = cv2.ORB_create(nfeatures=self.n_features)
+            return orb.detectAndCompute(gray, None)
+
+        # Nearly equal tiles, each with an equal share of the keypoint budget
+        y_edges = grid_edges(height, math.ceil(height / self.tile_size))
+        x_edges = grid_edges(width, math.ceil(width / self.tile_size))
+        tiles = [
+            (int(y0), int(y1), int(x0), int(x1))
+            for y0, y1 in zip(y_edges[:-1], y_edges[1:])
+            for x0, x1 in zip(x_edges[:-1], x_edges[1:])
+        ]
+        quota = max(math.ceil(self.n_features / len(tiles)), self.min_tile_features)
+
+        if self.tile_threads > 1:
+            results = list(
+                self._get_tile_pool().map(lambda t: self._detect_tile(gray, t, quota), tiles)
+            )
+        else:
+            results = [self._detect_tile(gray, tile, quota) for tile in tiles]
+
+        # Merge for global matching
+        keypoints = [kp for tile_keypoints, _ in results for kp in tile_keypoints]
+        descriptors = [d for _, d in results if d is not None]
+        return keypoints, np.vstack(descriptors) if descriptors else None
+
+    def _detect_tile(
+        self, gray: np.ndarray, tile: tuple[int, int, int, int], quota: int
+    ) -> tuple[list, Optional[np.ndarray]]:
+        """Keypoints (in image coordinates) and descriptors of one tile."""
+        y0, y1, x0, x1 = tile
+        height, width = gray.shape[:2]
+        py0, py1 = max(0, y0 - TILE_MARGIN), min(height, y1 + TILE_MARGIN)
+        px0, px1 = max(0, x0 - TILE_MARGIN), min(width, x1 + TILE_MARGIN)
+
+        # One ORB per call: detectors are not shared between threads
+        orb = cv2.ORB_create(nfeatures=quota)
+        keypoints, descriptors = orb.detectAndCompute(gray[py0:py1, px0:px1], None)
+        if descriptors is None:
+            return [], None
+
+        # Keep keypoints inside the tile (the margin only feeds the descriptors;
+        # filtering afterwards is cheaper than a detection mask)
+        kept = []
+        for i, kp in enumerate(keypoints):
+            x, y = kp.pt[0] + px0, kp.pt[1] + py0
+            if x0 <= x < x1 and y0 <= y < y1:
+                kp.pt = (x, y)
+                kept.append(i)
+        return [keypoints[i] for i in kept], descriptors[kept]
+
+    def close(self) -> None:
+        """Shut down the tile detection thread pool, if started."""
+        with self._tile_pool_lock:
+            if self._tile_pool is not None:
+                self._tile_pool.shutdown()
+                self._tile_pool = None
+
+    def _get_tile_pool(self) -> ThreadPoolExecutor:
+        # Created lazily (per process); ORB detection releases the GIL
+        with self._tile_pool_lock:
+            if self._tile_pool is None:
+                self._tile_pool = ThreadPoolExecutor(
+                    max_workers=self.tile_threads, thread_name_prefix="copy-move-tile"
+                )
+            return self._tile_pool
+
+    def _match_features(
+        self, keypoints: list, descriptors: Optional[np.ndarray]
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Suspicious (copy-move) matches between keypoints.
 
-        # Detect keypoints and compute descriptors
-        keypoints, descriptors = orb.detectAndCompute(gray, None)
+        Args:
+            keypoints: ORB keypoints
+            descriptors: Their descriptors (None without keypoints)
 
-        if descriptors is None or len(keypoints) < 2:
-            return 0
+        Returns:
+            Tuple (query indices, train indices) of the matches
+        """
+        none = np.zeros(0, dtype=np.int64)
 
-        # Match descriptors with itself using BFMatcher
-        bf = cv2.BFMatcher(cv2.NORM_HAMMING, crossCheck=False)
+        if descriptors is None or len(keypoints) < 2:
+            return none, none
 
-        # Find matches
+        # Nearest and second-nearest other descriptor of every keypoint
         try:
-            matches = bf.knnMatch(descriptors, descriptors, k=2)
+            neighbours, distances = self.matcher.match_self(descriptors)
         except Exception:
-            return 0
+            return none, none
 
         # Apply ratio test (Lowe's ratio test)
-        good_matches = []
-        for match_pair in matches:
-            if len(match_pair) == 2:
-                m, n = match_pair
-                # Skip self-matches (distance = 0)
-                if m.distance > 0 and m.distance < self.match_threshold * n.distance:
-                    good_matches.append(m)
+        good = (neighbours[:, 1] >= 0) & (distances[:, 0] < self.match_threshold * distances[:, 1])
+        query_idx = np.flatnonzero(good)
+        train_idx = neighbours[good, 0]
 
         # Filter for spatially separated matches (copy-move, not repetitive pattern)
-        suspicious_matches = 0
-        for match in good_matches:
-            pt1 = keypoints[match.queryIdx].pt
-            pt2 = keypoints[match.trainIdx].pt
-
-            # Calculate Euclidean distance
-            distance = np.sqrt((pt1[0] - pt2[0]) ** 2 + (pt1[1] - pt2[1]) ** 2)
+        # If points are far apart, it's suspicious (copy-move)
+        # If points are very close, it might be natural repetitive pattern
+        points = cv2.KeyPoint_convert(keypoints).astype(np.float64)
+        shifts = points[train_idx] - points[query_idx]
+        far = np.hypot(shifts[:, 0], shifts[:, 1]) > self.min_distance
+        query_idx, train_idx, shifts = query_idx[far], train_idx[far], shifts[far]
+
+        # Keep only matches whose displacement is shared by a clone group
+        coherent = self._coherent_shifts(shifts)
+        return query_idx[coherent], train_idx[coherent]
+
+    def _coherent_shifts(self, shifts: np.ndarray) -> np.ndarray:
+        """
+        Mask of displacement vectors belonging to a cluster of min_cluster_size.
 
-            # If points are far apart, it's suspicious (copy-move)
-            # If points are very close, it might be natural repetitive pattern
-            if distance > self.min_distance:
-                suspicious_matches += 1
+        Shifts are binned on a bin_size grid; a shift's cluster is its bin plus
+        the 8 neighbouring bins, so groups straddling a bin edge still count.
 
-        return suspicious_matches
+        Args:
+            shifts: Match displacement vectors (N x 2, dx/dy in pixels)
 
-    def visualize_matches(self, image_bytes: bytes) -> Image.Image:
+        Returns:
+            Boolean mask (N)
+        """
+        if self.min_cluster_size <= 1 or len(shifts) == 0:
+            return np.ones(len(shifts), dtype=bool)
+
+        # A clone matches in both directions: fold (dx, dy) and (-dx, -dy) together
+        flip = (shifts[:, 1] < 0) | ((shifts[:, 1] == 0) & (shifts[:, 0] < 0))
+        shifts = np.where(flip[:, None], -shifts, shifts)
+        bins = np.floor(shifts / self.cluster_bin_size).astype(np.int64)
+
+        # Pack bin coordinates into one int64 (padded so neighbour offsets stay unique)
+        width = int(np.abs(bins[:, 0]).max()) * 2 + 3
+        packed = bins[:, 1] * width + bins[:, 0]
+        unique, inverse, counts = np.unique(packed, return_inverse=True, return_counts=True)
+
+        # Support of each bin: matches in the 3 x 3 bin neighbourhood
+        support = np.zeros(len(unique), dtype=np.int64)
+        for dy in (-1, 0, 1):
+            for dx in (-1, 0, 1):
+                neighbour = unique + dy * width + dx
+                pos = np.minimum(np.searchsorted(unique, neighbour), len(unique) - 1)
+                support += np.where(unique[pos] == neighbour, counts[pos], 0)
+
+        return support[inverse.ravel()] >= self.min_cluster_size
+
+    def visualize_matches(
+        self, image_bytes: bytes, image_context: Optional[ImageContext] = None
+    ) -> Image.Image:
         """
         Generate visualization of copy-move matches (for debugging).
 
         Args:
             image_bytes: Raw image data
+            image_context: Optional shared decode context for image_bytes
 
         Returns:
             PIL Image with matches drawn
         """
         try:
-            img = Image.open(io.BytesIO(image_bytes))
-
-            if img.mode != "RGB":
-                img = img.convert("RGB")
-
-            img_array = np.array(img)
-            gray = cv2.cvtColor(img_array, cv2.COLOR_RGB2GRAY)
-
-            # Detect features and matches
-            orb = cv2.ORB_create(nfeatures=self.n_features)
-            keypoints, descriptors = orb.detectAndCompute(gray, None)
-
-            if descriptors is None:
-                return img
-
-            bf = cv2.BFMatcher(cv2.NORM_HAMMING, crossCheck=False)
-            matches = bf.knnMatch(descriptors, descriptors, k=2)
+            ctx = self._get_context(image_bytes, image_context)
 
-            # Filter matches
-            good_matches = []
-            for match_pair in matches:
-                if len(match_pair) == 2:
-                    m, n = match_pair
-                    if m.distance > 0 and m.distance < self.match_threshold * n.distance:
-                        pt1 = keypoints[m.queryIdx].pt
-                        pt2 = keypoints[m.trainIdx].pt
-                        distance = np.sqrt((pt1[0] - pt2[0]) ** 2 + (pt1[1] - pt2[1]) ** 2)
-                        if distance > self.min_distance:
-                            good_matches.append(m)
+            # Same keypoints and matches as analyze() (memoized in the context)
+            keypoints, query_idx, train_idx = self.find_matches(ctx)
 
             # Draw matches on image
-            result = img_array.copy()
-            for match in good_matches[:self.max_visualized_matches]:  # Limit for visibility
-                pt1 = tuple(map(int, keypoints[match.queryIdx].pt))
-                pt2 = tuple(map(int, keypoints[match.trainIdx].pt))
+            result = ctx.rgb.copy()
+            for q, t in list(zip(query_idx, train_idx))[
+                : self.max_visualized_matches
+            ]:  # Limit for visibility
+                pt1 = tuple(map(int, keypoints[q].pt))
+                pt2 = tuple(map(int, keypoints[t].pt))
                 cv2.line(result, pt1, pt2, (255, 0, 0), 2)
                 cv2.circle(result, pt1, 5, (0, 255, 0), -1)
                 cv2.circle(result, pt2, 5, (0, 0, 255), -1)
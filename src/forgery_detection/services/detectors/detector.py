@@ -1,16 +1,70 @@
+from typing import Optional
+
+from forgery_detection.services.image_context import ImageContext
+
+
 class Detector:
     """
     Base class for all detectors.
     """
 
-    def analyze(self, image_bytes: bytes) -> float:
+    # Longest image side the detector needs; None analyzes at full resolution.
+    # Detectors read reduced views through ImageContext.rgb_at(max_resolution),
+    # and the scorer plans each image's decodes from these declarations.
+    max_resolution: Optional[int] = None
+
+    # Whether the detector decodes pixels (False: header or raw bytes only)
+    reads_pixels: bool = True
+
+    # Whether scores depend only on the image and config (safe for the score cache)
+    cacheable: bool = True
+
+    def analyze(self, image_bytes: bytes, image_context: Optional[ImageContext] = None) -> float:
         """
         Analyze the image and return a score indicating likelihood of forgery.
 
         Args:
             image_bytes: Raw image data
+            image_context: Optional shared decode context for image_bytes. When omitted,
+                a private context is created for this call.
 
         Returns:
             Suspicion score 0.0-1.0 (0.0=authentic, 1.0=highly suspicious)
         """
         raise NotImplementedError("Subclasses must implement this method.")
+
+    def analyze_batch(self, image_contexts: list[ImageContext]) -> list[float]:
+        """
+        Analyze several images at once.
+
+        The default implementation calls analyze() per image. Detectors override
+        it when setup work (matchers, histogram buffers, ...) can be shared across
+        the batch or images can be processed together.
+
+        Args:
+            image_contexts: Shared decode contexts, one per image
+
+        Returns:
+            Suspicion scores 0.0-1.0, in input order
+        """
+        return [self.analyze(ctx.image_bytes, ctx) for ctx in image_contexts]
+
+    def set_thread_budget(self, threads: int) -> None:
+        """
+        Cap the threads the detector may use internally for one image.
+
+        The scorer calls this with the CPUs left per detector call once worker
+        processes and detector threads are accounted for. Detectors without
+        internal thread pools ignore it.
+
+        Args:
+            threads: Max concurrent threads (at least 1)
+        """
+
+    def close(self) -> None:
+        """Release thread pools and other resources held by the detector."""
+
+    @staticmethod
+    def _get_context(image_bytes: bytes, image_context: Optional[ImageContext]) -> ImageContext:
+        """Return the shared context, or a fresh one for standalone calls."""
+        return image_context if image_context is not None else ImageContext(image_bytes)
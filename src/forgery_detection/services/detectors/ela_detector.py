@@ -1,12 +1,18 @@
 """ELA (Error Level Analysis) detector (TIER 1)."""
 
-import io
 import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+import cv2
 import numpy as np
 from PIL import Image
 
 from forgery_detection.services.detectors.detector import Detector
+from forgery_detection.services.image_context import ImageContext
 from forgery_detection.config_loader import get_config
+from forgery_detection.utils.regional_stats import RegionalStats
 
 logger = logging.getLogger(__name__)
 
@@ -20,6 +26,16 @@ class ELADetector(Detector):
     2. Compute pixel-level differences between original and resaved
     3. Manipulated areas show different compression levels than authentic areas
 
+    The difference map is computed in uint8 (OpenCV encode/decode and absdiff)
+    and memoized on the image context, so scoring and visualization share it.
+
+    JPEG ghosts (mode: ghost): a region previously compressed at quality q0
+    differs least from its resave at q0. The decoded image is resaved at every
+    quality of ghost.qualities on a thread pool, each difference map is reduced
+    to per-block mean squared errors, and each block's error curve is compared
+    with the image-wide curve. Blocks with a deep dip at one quality are ghosts;
+    many ghosts agreeing on one quality suggest a double-compressed region.
+
     Known Limitations:
     - False positives in homogeneous areas (sky, walls)
     - False positives at high-contrast edges
@@ -39,13 +55,33 @@ class ELADetector(Detector):
         # Normalization divisors
         self.mean_divisor = config.get_float("ela_detector.normalization.mean_divisor", 50.0)
         self.std_divisor = config.get_float("ela_detector.normalization.std_divisor", 40.0)
-        self.variance_divisor = config.get_float("ela_detector.normalization.variance_divisor", 100.0)
+        self.variance_divisor = config.get_float(
+            "ela_detector.normalization.variance_divisor", 100.0
+        )
         # Grid size
         self.grid_size = config.get_int("ela_detector.grid_size", 4)
         # Error handling
         self.error_default_score = config.get_float("ela_detector.error_default_score", 0.0)
-
-    def analyze(self, image_bytes: bytes) -> float:
+        # Multi-quality JPEG ghost sweep
+        self.mode = config.get("ela_detector.mode", "single")
+        self.ghost_qualities = [
+            int(q)
+            for q in config.get_list(
+                "ela_detector.ghost.qualities", [50, 55, 60, 65, 70, 75, 80, 85, 90]
+            )
+        ]
+        self.ghost_block_size = config.get_int("ela_detector.ghost.block_size", 16)
+        # 0 = take the thread budget set by the scorer (all CPUs when used standalone)
+        self.configured_ghost_threads = config.get_int("ela_detector.ghost.threads", 0)
+        self.ghost_threads = self.configured_ghost_threads or (os.cpu_count() or 1)
+        self.ghost_min_depth = config.get_float("ela_detector.ghost.min_depth", 0.4)
+        self.ghost_min_block_error = config.get_float("ela_detector.ghost.min_block_error", 0.5)
+        self.ghost_area_divisor = config.get_float("ela_detector.ghost.area_divisor", 0.05)
+        self.ghost_weight = config.get_float("ela_detector.ghost.weight", 0.5)
+        self._ghost_pool: Optional[ThreadPoolExecutor] = None
+        self._ghost_pool_lock = threading.Lock()
+
+    def analyze(self, image_bytes: bytes, image_context: Optional[ImageContext] = None) -> float:
         """
         Perform Error Level Analysis on JPEG image.
 
@@ -53,36 +89,24 @@ class ELADetector(Detector):
 
         Args:
             image_bytes: Raw image data
+            image_context: Optional shared decode context for image_bytes
 
         Returns:
             Suspicion score 0.0-1.0
         """
         try:
-            # Open original image
-            original = Image.open(io.BytesIO(image_bytes))
-
-            # Convert to RGB if needed
-            if original.mode != "RGB":
-                original = original.convert("RGB")
-
-            # Resave at known quality
-            buffer = io.BytesIO()
-            original.save(buffer, format="JPEG", quality=self.default_quality)
-            buffer.seek(0)
-
-            # Open resaved image
-            resaved = Image.open(buffer)
-
-            # Convert to numpy arrays
-            original_array = np.array(original, dtype=np.float32)
-            resaved_array = np.array(resaved, dtype=np.float32)
-
-            # Compute absolute difference
-            diff = np.abs(original_array - resaved_array)
+            # Difference between the original and its resaved copy
+            ctx = self._get_context(image_bytes, image_context)
+            diff = self._ela_diff(ctx)
 
             # Calculate ELA score based on difference patterns
             score = self._calculate_ela_score(diff)
 
+            if self.mode == "ghost":
+                # Blend in the double-compression evidence of the quality sweep
+                ghost_score = self.analyze_ghosts(image_bytes, ctx)["score"]
+                score = (1.0 - self.ghost_weight) * score + self.ghost_weight * ghost_score
+
             return score
 
         except Exception as e:
@@ -93,6 +117,140 @@ class ELADetector(Detector):
             )
             return self.error_default_score
 
+    def _ela_diff(self, image_context: ImageContext) -> np.ndarray:
+        """
+        Absolute difference between the image and its JPEG resave (memoized).
+
+        Args:
+            image_context: Shared decode context
+
+        Returns:
+            uint8 difference map (H x W x 3, RGB)
+        """
+        return image_context.get_or_compute(
+            f"ela_diff@{self.default_quality}", lambda: self._compute_ela_diff(image_context.rgb)
+        )
+
+    def _compute_ela_diff(self, rgb: np.ndarray) -> np.ndarray:
+        # Resave at known quality (libjpeg, same output as a PIL save/open round trip)
+        bgr = cv2.cvtColor(rgb, cv2.COLOR_RGB2BGR)
+        ok, encoded = cv2.imencode(".jpg", bgr, [cv2.IMWRITE_JPEG_QUALITY, self.default_quality])
+        if not ok:
+            raise ValueError("JPEG re-encoding failed")
+        del bgr
+        # Decode the resave, then swap to RGB in place
+        resaved = cv2.imdecode(encoded, cv2.IMREAD_COLOR)
+        cv2.cvtColor(resaved, cv2.COLOR_BGR2RGB, dst=resaved)
+        # |original - resaved| in uint8 (no float copies)
+        return cv2.absdiff(rgb, resaved, dst=resaved)
+
+    def analyze_ghosts(
+        self, image_bytes: bytes, image_context: Optional[ImageContext] = None
+    ) -> dict:
+        """
+        Multi-quality JPEG ghost analysis (memoized on the context).
+
+        Args:
+            image_bytes: Raw image data
+            image_context: Optional shared decode context for image_bytes
+
+        Returns:
+            Dict with qualities, block_size, ghost_quality (per-block quality of
+            minimum relative error, 0 where no ghost), depth (per-block dip
+            0.0-1.0), dominant_quality (most common ghost quality or None) and
+            score (0.0-1.0)
+        """
+        ctx = self._get_context(image_bytes, image_context)
+        return ctx.get_or_compute("ela_ghosts", lambda: self._compute_ghosts(ctx.rgb))
+
+    def set_thread_budget(self, threads: int) -> None:
+        """Use the scorer's thread budget for the ghost sweep, unless ghost.threads is set."""
+        if not self.configured_ghost_threads:
+            self.ghost_threads = max(1, threads)
+
+    def close(self) -> None:
+        """Shut down the ghost sweep thread pool, if started."""
+        with self._ghost_pool_lock:
+            if self._ghost_pool is not None:
+                self._ghost_pool.shutdown()
+                self._ghost_pool = None
+
+    def _get_ghost_pool(self) -> ThreadPoolExecutor:
+        # Created lazily (per process); encoders release the GIL
+        with self._ghost_pool_lock:
+            if self._ghost_pool is None:
+                self._ghost_pool = ThreadPoolExecutor(
+                    max_workers=max(1, self.ghost_threads), thread_name_prefix="ela-ghost"
+                )
+            return self._ghost_pool
+
+    def _compute_ghosts(self, rgb: np.ndarray) -> dict:
+        block = self.ghost_block_size
+        blocks_y, blocks_x = rgb.shape[0] // block, rgb.shape[1] // block
+        qualities = np.array(self.ghost_qualities)
+        if blocks_y == 0 or blocks_x == 0 or len(qualities) < 2:
+            return {
+                "qualities": qualities.tolist(),
+                "block_size": block,
+                "ghost_quality": np.zeros((blocks_y, blocks_x), dtype=int),
+                "depth": np.zeros((blocks_y, blocks_x)),
+                "dominant_quality": None,
+                "score": 0.0,
+            }
+
+        # Decoded once; every quality resaves the same BGR pixels concurrently
+        bgr = cv2.cvtColor(rgb, cv2.COLOR_RGB2BGR)
+        if self.ghost_threads > 1:
+            pool = self._get_ghost_pool()
+            errors = np.stack(list(pool.map(lambda q: self._block_errors(bgr, int(q)), qualities)))
+        else:
+            errors = np.stack([self._block_errors(bgr, int(q)) for q in qualities])
+
+        # Error curve of each block relative to the image-wide curve (removes the
+        # overall decrease with quality), then to the block's own mean level
+        relative = errors / (np.median(errors, axis=(1, 2), keepdims=True) + 1e-6)
+        shape = relative / (relative.mean(axis=0, keepdims=True) + 1e-6)
+        depth = np.clip(1.0 - shape.min(axis=0), 0.0, 1.0)
+        # Flat blocks have no compression error to compare
+        depth[errors.mean(axis=0) < self.ghost_min_block_error] = 0.0
+
+        ghosts = depth >= self.ghost_min_depth
+        ghost_quality = np.where(ghosts, qualities[shape.argmin(axis=0)], 0)
+
+        dominant_quality, score = None, 0.0
+        if ghosts.any():
+            values, counts = np.unique(ghost_quality[ghosts], return_counts=True)
+            dominant_quality = int(values[counts.argmax()])
+            # Share of the image whose ghosts agree on one earlier quality
+            score = min(counts.max() / ghosts.size / self.ghost_area_divisor, 1.0)
+
+        return {
+            "qualities": qualities.tolist(),
+            "block_size": block,
+            "ghost_quality": ghost_quality,
+            "depth": depth,
+            "dominant_quality": dominant_quality,
+            "score": float(score),
+        }
+
+    def _block_errors(self, bgr: np.ndarray, quality: int) -> np.ndarray:
+        """Mean squared resave error per block (over pixels and channels) at one quality."""
+        ok, encoded = cv2.imencode(".jpg", bgr, [cv2.IMWRITE_JPEG_QUALITY, quality])
+        if not ok:
+            raise ValueError(f"JPEG re-encoding at quality {quality} failed")
+        diff = cv2.absdiff(bgr, cv2.imdecode(encoded, cv2.IMREAD_COLOR))
+        squared = cv2.multiply(diff, diff, dtype=cv2.CV_16U)
+
+        block = self.ghost_block_size
+        blocks_y, blocks_x = bgr.shape[0] // block, bgr.shape[1] // block
+        # Sum rows within each block band (contiguous), then columns x channels within each block;
+        # integer sums cannot overflow uint32 (block² x 3 x 255² < 2³² for blocks up to 128)
+        bands = (
+            squared[: blocks_y * block].reshape(blocks_y, block, -1).sum(axis=1, dtype=np.uint32)
+        )
+        sums = bands[:, : blocks_x * block * 3].reshape(blocks_y, blocks_x, block * 3).sum(axis=2)
+        return sums / float(block * block * 3)
+
     def _calculate_ela_score(self, diff: np.ndarray) -> float:
         """
         Calculate suspicion score from ELA difference map.
@@ -101,32 +259,26 @@ class ELADetector(Detector):
         Manipulated areas have different compression levels.
 
         Args:
-            diff: Pixel-wise difference array (H x W x 3)
+            diff: Pixel-wise difference array (H x W x 3, uint8 or float)
 
         Returns:
             Suspicion score 0.0-1.0
         """
-        # Compute statistics of differences
-        mean_diff = np.mean(diff)
-        std_diff = np.std(diff)
-        max_diff = np.max(diff)
+        # Compute statistics of differences (per-channel moments, no temporaries)
+        channel_means, channel_stds = cv2.meanStdDev(np.ascontiguousarray(diff))
+        mean_diff = float(np.mean(channel_means))
+        # Pooled over channels of equal size: E[x²] - E[x]²
+        std_diff = float(
+            np.sqrt(max(np.mean(channel_stds**2 + channel_means**2) - mean_diff**2, 0.0))
+        )
 
         # Calculate variance across image regions
         # High variance suggests inconsistent compression (potential manipulation)
-        height, width = diff.shape[:2]
-
-        # Divide into grid of regions
-        region_h = height // self.grid_size
-        region_w = width // self.grid_size
-
-        region_means = []
-        for i in range(self.grid_size):
-            for j in range(self.grid_size):
-                region = diff[i * region_h : (i + 1) * region_h, j * region_w : (j + 1) * region_w]
-                region_means.append(np.mean(region))
+        # Grid of regions covering every pixel, from one integral image
+        region_means, _ = RegionalStats(diff, squares=False).grid(self.grid_size)
 
         # Calculate variance across regions
-        region_variance = np.var(region_means) if region_means else 0.0
+        region_variance = float(np.var(region_means))
 
         # Scoring heuristics (based on ELA research):
         # 1. High overall mean difference suggests editing
@@ -141,19 +293,24 @@ class ELADetector(Detector):
         # Weighted combination
         # Mean is less reliable (can be high in natural images)
         # Variance is more indicative of manipulation
-        suspicion_score = (self.weight_mean * mean_score +
-                          self.weight_std * std_score +
-                          self.weight_variance * variance_score)
+        suspicion_score = (
+            self.weight_mean * mean_score
+            + self.weight_std * std_score
+            + self.weight_variance * variance_score
+        )
 
         return min(max(suspicion_score, 0.0), 1.0)
 
-    def generate_ela_image(self, image_bytes: bytes, format_type: str) -> Image.Image:
+    def generate_ela_image(
+        self, image_bytes: bytes, format_type: str, image_context: Optional[ImageContext] = None
+    ) -> Image.Image:
         """
         Generate ELA visualization image (for debugging/analysis).
 
         Args:
             image_bytes: Raw image data
             format_type: Image format
+            image_context: Optional shared decode context for image_bytes
 
         Returns:
             PIL Image showing ELA differences (scaled for visibility)
@@ -163,24 +320,11 @@ class ELADetector(Detector):
             return Image.new("RGB", (100, 100), color=(0, 0, 0))
 
         try:
-            original = Image.open(io.BytesIO(image_bytes))
-
-            if original.mode != "RGB":
-                original = original.convert("RGB")
-
-            buffer = io.BytesIO()
-            original.save(buffer, format="JPEG", quality=self.default_quality)
-            buffer.seek(0)
-            resaved = Image.open(buffer)
-
-            original_array = np.array(original, dtype=np.float32)
-            resaved_array = np.array(resaved, dtype=np.float32)
-
-            # Compute difference and scale for visibility
-            diff = np.abs(original_array - resaved_array) * self.scale_factor
-            diff = np.clip(diff, 0, 255).astype(np.uint8)
+            # Same difference map as analyze() (computed once per context)
+            diff = self._ela_diff(self._get_context(image_bytes, image_context))
 
-            return Image.fromarray(diff)
+            # Scale for visibility (saturating to uint8)
+            return Image.fromarray(cv2.convertScaleAbs(diff, alpha=self.scale_factor))
 
         except Exception as e:
             logger.warning(
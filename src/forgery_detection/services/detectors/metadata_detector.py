@@ -1,9 +1,14 @@
 """Metadata analysis detector (TIER 1)."""
 
-import io
 import logging
-from PIL import Image
+from typing import Optional
 from forgery_detection.services.detectors.detector import Detector
+from forgery_detection.services.image_context import ImageContext
+from forgery_detection.services.metadata_extractor import (
+    DEFAULT_EDITING_SOFTWARE,
+    TAG_SOFTWARE,
+    match_editing_software,
+)
 from forgery_detection.config_loader import get_config
 
 logger = logging.getLogger(__name__)
@@ -18,33 +23,39 @@ class MetadataDetector(Detector):
     - GPS coordinate impossibilities
     """
 
+    # Metadata comes from the header segments; no pixels are decoded
+    reads_pixels = False
+
     def __init__(self):
         """Initialize with config parameters."""
         config = get_config()
         # Load editing software list from config
-        self.editing_software = set(config.get_list("metadata_detector.editing_software", [
-            "photoshop", "gimp", "paint.net", "affinity", "pixelmator", "acorn", "photoscape"
-        ]))
+        self.editing_software = set(
+            config.get_list("metadata_detector.editing_software", DEFAULT_EDITING_SOFTWARE)
+        )
         # Load score thresholds
         self.no_exif_score = config.get_float("metadata_detector.no_exif_score", 0.4)
-        self.editing_software_score = config.get_float("metadata_detector.editing_software_score", 0.6)
+        self.editing_software_score = config.get_float(
+            "metadata_detector.editing_software_score", 0.6
+        )
         self.few_tags_score = config.get_float("metadata_detector.few_tags_score", 0.3)
         self.error_default_score = config.get_float("metadata_detector.error_default_score", 0.3)
         self.few_tags_threshold = config.get_int("metadata_detector.few_tags_threshold", 5)
 
-    def analyze(self, image_bytes: bytes) -> float:
+    def analyze(self, image_bytes: bytes, image_context: Optional[ImageContext] = None) -> float:
         """
         Analyze image metadata for suspicion indicators.
 
         Args:
             image_bytes: Raw image data
+            image_context: Optional shared decode context for image_bytes
 
         Returns:
             Suspicion score 0.0-1.0 (0.0=authentic, 1.0=highly suspicious)
         """
         try:
-            img = Image.open(io.BytesIO(image_bytes))
-            exif_data = img.getexif()
+            # EXIF tags parsed from the header segments only (no decoder)
+            exif_data = self._get_context(image_bytes, image_context).metadata["tags"]
 
             if not exif_data:
                 # No EXIF data - suspicious (metadata might be stripped)
@@ -54,14 +65,10 @@ class MetadataDetector(Detector):
             indicators = []
 
             # Check for editing software
-            software_tag = exif_data.get(305)  # Software tag
-            if software_tag:
-                software_lower = software_tag.lower()
-                for editing_sw in self.editing_software:
-                    if editing_sw in software_lower:
-                        suspicion_score += self.editing_software_score
-                        indicators.append(f"editing_software:{software_tag}")
-                        break
+            software_tag = exif_data.get(TAG_SOFTWARE)
+            if match_editing_software(software_tag, self.editing_software):
+                suspicion_score += self.editing_software_score
+                indicators.append(f"editing_software:{software_tag}")
 
             # Check for stripped metadata (very few tags)
             if len(exif_data) < self.few_tags_threshold:
@@ -1,12 +1,14 @@
 """Noise Variance analysis detector (TIER 3)."""
 
-import io
 import logging
+from typing import Optional
 import numpy as np
 from PIL import Image
 import cv2
 from forgery_detection.services.detectors.detector import Detector
+from forgery_detection.services.image_context import ImageContext
 from forgery_detection.config_loader import get_config
+from forgery_detection.utils.regional_stats import RegionalStats, grid_edges
 
 logger = logging.getLogger(__name__)
 
@@ -17,10 +19,19 @@ class NoiseVarianceDetector(Detector):
 
     Algorithm:
     1. Divide image into regions
-    2. Compute noise variance (std dev) for each region
+    2. Compute noise level for each region
     3. Check for outliers (significantly different noise levels)
     4. Spliced regions may have different noise characteristics
 
+    Noise engines (noise_variance_detector.engine):
+    - residual: high-pass residual of the full-resolution luminance (3x3
+      median-filter residual, Laplacian, or Haar wavelet HH band), with a
+      robust per-block noise level 1.4826 * median(|residual|) (MAD). Scene
+      content is mostly removed by the high-pass, and the median ignores the
+      edges that survive it.
+    - pixel_std: standard deviation of the pixel values of each region
+      (legacy; measures scene content as much as noise)
+
     Note:
     - NOT PRNU (Photo Response Non-Uniformity) - that requires reference images
     - Simple variance checks only
@@ -36,46 +47,81 @@ class NoiseVarianceDetector(Detector):
         Initialize Noise Variance detector.
 
         Args:
-            grid_size: Divide image into grid_size x grid_size regions (optional, uses config if None)
+            grid_size: Divide image into grid_size x grid_size regions
+                (optional, uses config if None)
         """
         config = get_config()
-        self.grid_size = grid_size if grid_size is not None else config.get_int("noise_variance_detector.grid_size", 4)
+        self.grid_size = (
+            grid_size
+            if grid_size is not None
+            else config.get_int("noise_variance_detector.grid_size", 4)
+        )
+        # Noise estimate: residual (robust residual MAD) | pixel_std (legacy)
+        self.engine = config.get("noise_variance_detector.engine", "residual")
+        self.residual_filter = config.get("noise_variance_detector.residual_filter", "median")
         # CV thresholds
-        self.cv_high_threshold = config.get_float("noise_variance_detector.cv_thresholds.high_threshold", 0.5)
-        self.cv_high_score = config.get_float("noise_variance_detector.cv_thresholds.high_score", 0.8)
-        self.cv_medium_threshold = config.get_float("noise_variance_detector.cv_thresholds.medium_threshold", 0.3)
-        self.cv_medium_score = config.get_float("noise_variance_detector.cv_thresholds.medium_score", 0.4)
+        self.cv_high_threshold = config.get_float(
+            "noise_variance_detector.cv_thresholds.high_threshold", 0.5
+        )
+        self.cv_high_score = config.get_float(
+            "noise_variance_detector.cv_thresholds.high_score", 0.8
+        )
+        self.cv_medium_threshold = config.get_float(
+            "noise_variance_detector.cv_thresholds.medium_threshold", 0.3
+        )
+        self.cv_medium_score = config.get_float(
+            "noise_variance_detector.cv_thresholds.medium_score", 0.4
+        )
         self.cv_low_score = config.get_float("noise_variance_detector.cv_thresholds.low_score", 0.0)
         # Z-score outlier detection
         self.zscore_threshold = config.get_float("noise_variance_detector.zscore.threshold", 2.5)
         self.zscore_score = config.get_float("noise_variance_detector.zscore.score", 0.6)
+        if self.engine == "residual":
+            # Residual levels spread more across regions (textures leave some
+            # residual): thresholds sit at the same natural-image percentiles
+            self.cv_high_threshold = config.get_float(
+                "noise_variance_detector.residual_thresholds.high_threshold", 1.25
+            )
+            self.cv_medium_threshold = config.get_float(
+                "noise_variance_detector.residual_thresholds.medium_threshold", 0.7
+            )
+            self.zscore_threshold = config.get_float(
+                "noise_variance_detector.residual_thresholds.zscore_threshold", 2.9
+            )
+        # pixel_std: coarse regional statistics on a reduced-resolution view (0 = full resolution)
+        self.pixel_std_resolution = (
+            config.get_int("noise_variance_detector.max_resolution", 1024) or None
+        )
         # Error handling
-        self.error_default_score = config.get_float("noise_variance_detector.error_default_score", 0.0)
+        self.error_default_score = config.get_float(
+            "noise_variance_detector.error_default_score", 0.0
+        )
         # Visualization
-        self.colormap = getattr(cv2, f"COLORMAP_{config.get('noise_variance_detector.colormap', 'JET')}")
+        self.colormap = getattr(
+            cv2, f"COLORMAP_{config.get('noise_variance_detector.colormap', 'JET')}"
+        )
+
+    @property
+    def max_resolution(self) -> Optional[int]:
+        """Longest side read: reduced for pixel_std, full resolution for residuals."""
+        return self.pixel_std_resolution if self.engine == "pixel_std" else None
 
-    def analyze(self, image_bytes: bytes) -> float:
+    def analyze(self, image_bytes: bytes, image_context: Optional[ImageContext] = None) -> float:
         """
         Analyze image for inconsistent noise patterns.
 
         Args:
             image_bytes: Raw image data
+            image_context: Optional shared decode context for image_bytes
 
         Returns:
             Suspicion score 0.0-1.0
         """
         try:
-            img = Image.open(io.BytesIO(image_bytes))
-
-            # Convert to RGB if needed
-            if img.mode != "RGB":
-                img = img.convert("RGB")
-
-            # Convert to numpy array (float for precision)
-            img_array = np.array(img, dtype=np.float32)
-
-            # Calculate regional noise variance
-            regional_variances = self._calculate_regional_noise(img_array)
+            # Calculate regional noise levels
+            regional_variances = (
+                self.noise_blocks(self._get_context(image_bytes, image_context)).ravel().tolist()
+            )
 
             # Check for outliers
             suspicion_score = self._detect_noise_outliers(regional_variances)
@@ -89,35 +135,132 @@ class NoiseVarianceDetector(Detector):
             )
             return self.error_default_score
 
+    def noise_blocks(self, ctx: ImageContext) -> np.ndarray:
+        """
+        Noise level of each region (memoized per image).
+
+        Args:
+            ctx: Shared decode context
+
+        Returns:
+            grid_size x grid_size array of noise levels
+        """
+
+        def compute():
+            if self.engine == "pixel_std":
+                # Shared float32 RGB array (float for precision), reduced to max_resolution
+                return self._block_noise(ctx.float32_at(self.pixel_std_resolution))
+            # Full resolution: downscaling would average the noise away
+            if self.residual_filter in ("median", "laplacian"):
+                # Full-resolution residuals come from the image's feature store
+                return self._residual_noise(ctx.feature(f"{self.residual_filter}_residual"))
+            return self._block_noise(ctx.gray)
+
+        return ctx.get_or_compute(
+            f"noise_blocks@{self.engine}:{self.residual_filter}:{self.grid_size}", compute
+        )
+
     def _calculate_regional_noise(self, img_array: np.ndarray) -> list:
         """
-        Calculate noise variance for each region.
+        Calculate noise level for each region.
+
+        Args:
+            img_array: Image as numpy array (H x W x 3, or H x W luminance)
+
+        Returns:
+            List of noise levels for each region
+        """
+        return self._block_noise(img_array).ravel().tolist()
+
+    def _block_noise(self, img_array: np.ndarray) -> np.ndarray:
+        """
+        Noise level per region of a grid covering every pixel.
 
         Args:
-            img_array: Image as numpy array (H x W x 3)
+            img_array: Image as numpy array (H x W x 3, or H x W luminance)
 
         Returns:
-            List of noise variance values for each region
+            grid_size x grid_size array of noise levels
+        """
+        if self.engine == "pixel_std":
+            # Estimate noise using standard deviation
+            # (Simple approach: noise = local std deviation)
+            _, regional_stds = RegionalStats(img_array).grid(self.grid_size)
+            return regional_stds
+
+        return self._residual_noise(self._noise_residual(self._luminance(img_array)))
+
+    def _residual_noise(self, residual: np.ndarray) -> np.ndarray:
+        """Noise level per region from an absolute noise residual (see _noise_residual)."""
+        # MAD of a zero-median residual, scaled to a Gaussian standard deviation
+        return 1.4826 * self._block_medians(residual, self.grid_size)
+
+    @staticmethod
+    def _luminance(img_array: np.ndarray) -> np.ndarray:
+        """uint8 luminance of an RGB (uint8 or float) or single-channel image."""
+        if img_array.dtype != np.uint8:
+            img_array = np.clip(np.rint(img_array), 0, 255).astype(np.uint8)
+        if img_array.ndim == 3:
+            return cv2.cvtColor(img_array, cv2.COLOR_RGB2GRAY)
+        return img_array
+
+    def _noise_residual(self, gray: np.ndarray) -> np.ndarray:
         """
-        height, width = img_array.shape[:2]
-        region_h = height // self.grid_size
-        region_w = width // self.grid_size
+        Absolute high-pass residual of a luminance image.
 
-        regional_variances = []
+        Args:
+            gray: uint8 luminance (H x W)
 
-        for i in range(self.grid_size):
-            for j in range(self.grid_size):
-                # Extract region
-                region = img_array[
-                    i * region_h : (i + 1) * region_h, j * region_w : (j + 1) * region_w
-                ]
+        Returns:
+            uint8 |residual| (saturated at 255); half resolution for wavelet
+        """
+        if self.residual_filter == "laplacian":
+            return cv2.convertScaleAbs(cv2.Laplacian(gray, cv2.CV_16S, ksize=1))
+        if self.residual_filter == "wavelet":
+            # Haar HH band (diagonal detail) of each 2 x 2 cell
+            g = gray[: gray.shape[0] // 2 * 2, : gray.shape[1] // 2 * 2].astype(np.int16)
+            hh = g[0::2, 0::2] - g[0::2, 1::2] - g[1::2, 0::2] + g[1::2, 1::2]
+            return cv2.convertScaleAbs(hh, alpha=0.5)
+        return cv2.absdiff(gray, cv2.medianBlur(gray, 3))
+
+    @staticmethod
+    def _block_medians(values: np.ndarray, grid_size: int) -> np.ndarray:
+        """
+        Median of uint8 values per region of a grid_size x grid_size grid.
 
-                # Estimate noise using standard deviation
-                # (Simple approach: noise = local std deviation)
-                noise_estimate = np.std(region)
-                regional_variances.append(noise_estimate)
+        One histogram per region (a bincount per band of grid rows, O(pixels)
+        for any grid size); the median is interpolated within its histogram
+        bin so small integer residuals still give continuous levels.
 
-        return regional_variances
+        Args:
+            values: uint8 array (H x W)
+            grid_size: Grid rows and columns
+
+        Returns:
+            grid_size x grid_size float64 medians (0 for empty regions)
+        """
+        height, width = values.shape
+        y_edges = grid_edges(height, grid_size)
+        x_edges = grid_edges(width, grid_size)
+        # Histogram slot of each column: region column * 256
+        column_offsets = np.repeat(np.arange(grid_size, dtype=np.int64) * 256, np.diff(x_edges))
+
+        hist = np.empty((grid_size, grid_size, 256), dtype=np.float64)
+        for row, (y0, y1) in enumerate(zip(y_edges[:-1], y_edges[1:])):
+            slots = values[y0:y1] + column_offsets
+            hist[row] = np.bincount(slots.ravel(), minlength=grid_size * 256).reshape(
+                grid_size, 256
+            )
+
+        # Grouped median: bin k holding the middle value, interpolated within [k - 0.5, k + 0.5)
+        cumulative = np.cumsum(hist, axis=-1)
+        half = cumulative[..., -1:] / 2.0
+        k = np.minimum((cumulative < half).sum(axis=-1, keepdims=True), 255)
+        in_bin = np.take_along_axis(hist, k, axis=-1)
+        below = np.take_along_axis(cumulative, k, axis=-1) - in_bin
+        with np.errstate(invalid="ignore", divide="ignore"):
+            medians = k - 0.5 + (half - below) / in_bin
+        return np.nan_to_num(np.maximum(medians[..., 0], 0.0))
 
     def _detect_noise_outliers(self, variances: list) -> float:
         """
@@ -167,43 +310,28 @@ class NoiseVarianceDetector(Detector):
 
         return min(suspicion_score, 1.0)
 
-    def visualize_noise_map(self, image_bytes: bytes) -> Image.Image:
+    def visualize_noise_map(
+        self, image_bytes: bytes, image_context: Optional[ImageContext] = None
+    ) -> Image.Image:
         """
         Generate visualization of noise variance map (for debugging).
 
         Args:
             image_bytes: Raw image data
+            image_context: Optional shared decode context for image_bytes
 
         Returns:
             PIL Image showing noise variance heatmap
         """
         try:
-            img = Image.open(io.BytesIO(image_bytes))
-
-            if img.mode != "RGB":
-                img = img.convert("RGB")
+            # Same block array as analyze() (memoized in the context)
+            ctx = self._get_context(image_bytes, image_context)
+            blocks = self.noise_blocks(ctx)
 
-            img_array = np.array(img, dtype=np.float32)
-            height, width = img_array.shape[:2]
-
-            # Calculate regional noise
-            region_h = height // self.grid_size
-            region_w = width // self.grid_size
-
-            # Create heatmap
-            heatmap = np.zeros((height, width), dtype=np.float32)
-
-            for i in range(self.grid_size):
-                for j in range(self.grid_size):
-                    region = img_array[
-                        i * region_h : (i + 1) * region_h, j * region_w : (j + 1) * region_w
-                    ]
-                    noise = np.std(region)
-
-                    # Fill heatmap region
-                    heatmap[
-                        i * region_h : (i + 1) * region_h, j * region_w : (j + 1) * region_w
-                    ] = noise
+            # Create full-size heatmap: each grid cell filled with its noise level
+            heatmap = cv2.resize(
+                blocks.astype(np.float32), ctx.size, interpolation=cv2.INTER_NEAREST
+            )
 
             # Normalize and convert to color map
             heatmap_norm = (
@@ -1,10 +1,14 @@
 """Reverse image search detector (TIER 1)."""
 
-import io
 import logging
-from PIL import Image
+import threading
+from pathlib import Path
+from typing import Optional
 import imagehash
 from forgery_detection.services.detectors.detector import Detector
+from forgery_detection.services.image_context import ImageContext
+from forgery_detection.services.phash_index import PHashIndex
+from forgery_detection.config_loader import get_config
 
 logger = logging.getLogger(__name__)
 
@@ -18,32 +22,57 @@ class ReverseSearchDetector(Detector):
     - Can be used to detect stock photos from internet
     - Can be used to detect duplicate claims (future database integration)
 
+    Duplicate claims: with reverse_search_detector.index.enabled, every pHash is
+    stored in a persistent PHashIndex together with its claim id. An image whose
+    pHash is within match_radius bits of an image from another claim scores
+    1 - distance / (match_radius + 1); exact duplicates score 1.0.
+
     NOTE: Web-based search (TinEye API) is optional/future enhancement.
-    MVP only generates pHash for future use.
     """
 
-    def analyze(self, image_bytes: bytes) -> float:
+    def __init__(self):
+        """Initialize with config parameters."""
+        config = get_config()
+        # pHash works on a 32x32 thumbnail: decode at most max_resolution (0 = full resolution)
+        self.max_resolution = config.get_int("reverse_search_detector.max_resolution", 512) or None
+        # Duplicate-claim index
+        self.index_enabled = config.get_bool("reverse_search_detector.index.enabled", False)
+        self.index_path = config.get("reverse_search_detector.index.path", "phash_index")
+        self.match_radius = config.get_int("reverse_search_detector.index.match_radius", 6)
+        self.claim_id_source = config.get("reverse_search_detector.index.claim_id", "path")
+        self.insert_analyzed = config.get_bool("reverse_search_detector.index.insert", True)
+        self.compact_threshold = config.get_int(
+            "reverse_search_detector.index.compact_threshold", 100000
+        )
+        # Scores depend on what the index holds, not just on the image
+        self.cacheable = not self.index_enabled
+        self._index: Optional[PHashIndex] = None
+        self._index_lock = threading.Lock()
+
+    def analyze(self, image_bytes: bytes, image_context: Optional[ImageContext] = None) -> float:
         """
         Generate perceptual hash for image.
 
         Args:
             image_bytes: Raw image data
+            image_context: Optional shared decode context for image_bytes
 
         Returns:
-            Suspicion score 0.0 (MVP: no search implemented)
+            Suspicion score 0.0-1.0 (0.0 when no near-duplicate from another
+            claim is indexed, or when the index is disabled)
         """
         try:
-            img = Image.open(io.BytesIO(image_bytes))
+            ctx = self._get_context(image_bytes, image_context)
 
             # Generate perceptual hash (pHash algorithm)
-            phash = imagehash.phash(img)
-            phash_hex = str(phash)
+            phash_hex = self.compute_phash(ctx)
 
-            # MVP: No web search, no phash matching
-            # Future: Could query TinEye API here and return 1.0 if match found
-            suspicion_score = 0.0
+            if not self.index_enabled:
+                # No index: fingerprint only
+                return 0.0
 
-            return suspicion_score
+            # Future: Could also query TinEye API here
+            return self._match_and_insert(int(phash_hex, 16), ctx)
 
         except Exception as e:
             # Unable to generate hash
@@ -53,6 +82,62 @@ class ReverseSearchDetector(Detector):
             )
             return 0.0
 
+    def compute_phash(self, image_context: ImageContext) -> str:
+        """
+        Perceptual hash of an image, memoized on its context.
+
+        Args:
+            image_context: Shared decode context
+
+        Returns:
+            64-bit pHash as a 16-digit hex string
+        """
+        return image_context.get_or_compute(
+            f"phash@{self.max_resolution}",
+            lambda: str(imagehash.phash(image_context.rgb_image_at(self.max_resolution))),
+        )
+
+    def close(self) -> None:
+        """Close the pHash index, if opened."""
+        with self._index_lock:
+            if self._index is not None:
+                self._index.close()
+                self._index = None
+
+    def _get_index(self) -> PHashIndex:
+        # Opened lazily so each worker process gets its own connection
+        with self._index_lock:
+            if self._index is None:
+                self._index = PHashIndex(self.index_path, compact_threshold=self.compact_threshold)
+            return self._index
+
+    def _claim_id(self, image_context: ImageContext) -> Optional[str]:
+        """Claim an image belongs to, derived from its path."""
+        if image_context.path is None:
+            return None
+        if self.claim_id_source == "parent_dir":
+            return Path(image_context.path).parent.name
+        return image_context.path
+
+    def _match_and_insert(self, phash: int, image_context: ImageContext) -> float:
+        """Score against indexed images of other claims, then index this image."""
+        index = self._get_index()
+        claim_id = self._claim_id(image_context)
+        sha256 = image_context.sha256
+
+        matches = index.query(phash, self.match_radius)
+        # Same claim (e.g. re-analysis or several photos of one claim) is not a duplicate claim
+        other_claims = [m for m in matches if claim_id is None or m["claim_id"] != claim_id]
+        already_indexed = any(m["sha256"] == sha256 and m["claim_id"] == claim_id for m in matches)
+
+        if self.insert_analyzed and not already_indexed:
+            index.insert(phash, claim_id=claim_id, path=image_context.path, sha256=sha256)
+
+        if not other_claims:
+            return 0.0
+        best_distance = other_claims[0]["distance"]
+        return 1.0 - best_distance / (self.match_radius + 1)
+
     def compute_hash_distance(self, hash1: str, hash2: str) -> int:
         """
         Compute Hamming distance between two perceptual hashes.
@@ -1,14 +1,20 @@
 """Statistical analysis detector (TIER 2)."""
 
-import io
 import logging
+from typing import Optional
+import cv2
 import numpy as np
-from PIL import Image
 from forgery_detection.services.detectors.detector import Detector
+from forgery_detection.services.image_context import ImageContext
 from forgery_detection.config_loader import get_config
+from forgery_detection.utils.regional_stats import RegionalStats
 
 logger = logging.getLogger(__name__)
 
+# Forward differences of the channel mean (R + G + B) / 3, applied to the channel sum
+_FORWARD_X = np.array([[-1.0, 1.0]], dtype=np.float32) / 3.0
+_FORWARD_Y = _FORWARD_X.T.copy()
+
 
 class StatisticalDetector(Detector):
     """
@@ -18,6 +24,11 @@ class StatisticalDetector(Detector):
     - Histogram anomalies (unnatural color distributions)
     - Color channel correlation (R/G/B relationships)
     - Edge density differences (manipulated regions have different edge characteristics)
+
+    All checks run on the uint8 image: histograms come from cv2.calcHist,
+    the three channel correlations from one 3x3 covariance of shared first
+    and second moments, and gradients from float32 cv2.filter2D passes, so
+    no float copies of the image are made.
     """
 
     def __init__(self):
@@ -28,53 +39,54 @@ class StatisticalDetector(Detector):
         self.weight_correlation = config.get_float("statistical_detector.weights.correlation", 0.3)
         self.weight_edge = config.get_float("statistical_detector.weights.edge", 0.3)
         # Histogram anomaly detection
-        self.gap_ratio_threshold = config.get_float("statistical_detector.histogram.gap_ratio_threshold", 0.3)
-        self.gap_ratio_score = config.get_float("statistical_detector.histogram.gap_ratio_score", 0.2)
-        self.max_peak_threshold = config.get_float("statistical_detector.histogram.max_peak_threshold", 0.1)
+        self.gap_ratio_threshold = config.get_float(
+            "statistical_detector.histogram.gap_ratio_threshold", 0.3
+        )
+        self.gap_ratio_score = config.get_float(
+            "statistical_detector.histogram.gap_ratio_score", 0.2
+        )
+        self.max_peak_threshold = config.get_float(
+            "statistical_detector.histogram.max_peak_threshold", 0.1
+        )
         self.max_peak_score = config.get_float("statistical_detector.histogram.max_peak_score", 0.2)
         self.num_channels = config.get_int("statistical_detector.histogram.num_channels", 3)
         # Color correlation thresholds
-        self.very_suspicious_threshold = config.get_float("statistical_detector.correlation.very_suspicious_threshold", 0.5)
-        self.very_suspicious_score = config.get_float("statistical_detector.correlation.very_suspicious_score", 0.8)
-        self.somewhat_suspicious_threshold = config.get_float("statistical_detector.correlation.somewhat_suspicious_threshold", 0.7)
-        self.somewhat_suspicious_score = config.get_float("statistical_detector.correlation.somewhat_suspicious_score", 0.4)
+        self.very_suspicious_threshold = config.get_float(
+            "statistical_detector.correlation.very_suspicious_threshold", 0.5
+        )
+        self.very_suspicious_score = config.get_float(
+            "statistical_detector.correlation.very_suspicious_score", 0.8
+        )
+        self.somewhat_suspicious_threshold = config.get_float(
+            "statistical_detector.correlation.somewhat_suspicious_threshold", 0.7
+        )
+        self.somewhat_suspicious_score = config.get_float(
+            "statistical_detector.correlation.somewhat_suspicious_score", 0.4
+        )
         # Edge density analysis
         self.edge_std_divisor = config.get_float("statistical_detector.edge.std_divisor", 50.0)
         self.edge_grid_size = config.get_int("statistical_detector.edge.grid_size", 3)
+        # Coarse statistics: analyze a reduced-resolution view (0 = full resolution)
+        self.max_resolution = config.get_int("statistical_detector.max_resolution", 1024) or None
         # Error handling
         self.error_default_score = config.get_float("statistical_detector.error_default_score", 0.0)
 
-    def analyze(self, image_bytes: bytes) -> float:
+    def analyze(self, image_bytes: bytes, image_context: Optional[ImageContext] = None) -> float:
         """
         Analyze image for statistical anomalies.
 
         Args:
             image_bytes: Raw image data
+            image_context: Optional shared decode context for image_bytes
 
         Returns:
             Suspicion score 0.0-1.0
         """
         try:
-            img = Image.open(io.BytesIO(image_bytes))
-
-            # Convert to RGB if needed
-            if img.mode != "RGB":
-                img = img.convert("RGB")
-
-            # Convert to numpy array
-            img_array = np.array(img, dtype=np.float32)
-
-            # Run statistical checks
-            histogram_score = self._check_histogram_anomalies(img_array)
-            correlation_score = self._check_color_correlation(img_array)
-            edge_score = self._check_edge_density(img_array)
-
-            # Weighted combination
-            suspicion_score = (self.weight_histogram * histogram_score +
-                             self.weight_correlation * correlation_score +
-                             self.weight_edge * edge_score)
-
-            return min(max(suspicion_score, 0.0), 1.0)
+            # Shared uint8 RGB array, reduced to max_resolution
+            return self._score(
+                self._get_context(image_bytes, image_context).rgb_at(self.max_resolution)
+            )
 
         except Exception as e:
             logger.warning(
@@ -83,46 +95,97 @@ class StatisticalDetector(Detector):
             )
             return self.error_default_score
 
-    def _check_histogram_anomalies(self, img_array: np.ndarray) -> float:
+    def _score(self, rgb: np.ndarray) -> float:
         """
-        Check for unnatural histogram patterns.
+        Weighted statistical suspicion of a uint8 RGB image.
 
-        Natural images have smooth, bell-curved histograms.
-        Manipulated images may have gaps, spikes, or unnatural distributions.
+        Args:
+            rgb: Image (H x W x 3, uint8)
+
+        Returns:
+            Suspicion score 0.0-1.0
+        """
+        # Contiguous channel planes shared by all checks
+        channels = cv2.split(rgb)
+
+        # Run statistical checks
+        histogram_score = self._histogram_score(self._channel_histograms(channels))
+        correlation_score = self._correlation_score(channels)
+        edge_score = self._edge_score(channels)
+
+        # Weighted combination
+        suspicion_score = (
+            self.weight_histogram * histogram_score
+            + self.weight_correlation * correlation_score
+            + self.weight_edge * edge_score
+        )
+
+        return min(max(suspicion_score, 0.0), 1.0)
+
+    @staticmethod
+    def _as_channels(img_array: np.ndarray) -> list[np.ndarray]:
+        """uint8 channel planes of an RGB image (uint8, or float with integral values)."""
+        if img_array.dtype != np.uint8:
+            img_array = np.clip(np.rint(img_array), 0, 255).astype(np.uint8)
+        return cv2.split(img_array)
+
+    def _channel_histograms(self, channels: list[np.ndarray]) -> np.ndarray:
+        """
+        256-bin histogram of each channel.
 
         Args:
-            img_array: Image as numpy array (H x W x 3)
+            channels: uint8 channel planes
+
+        Returns:
+            Histograms (num_channels x 256)
+        """
+        return np.stack(
+            [
+                cv2.calcHist([channel], [0], None, [256], [0, 256])[:, 0]
+                for channel in channels[: self.num_channels]
+            ]
+        )
+
+    def _histogram_score(self, hists: np.ndarray) -> float:
+        """
+        Histogram anomaly score from per-channel histograms.
+
+        Args:
+            hists: Histograms (num_channels x 256)
 
         Returns:
             Suspicion score 0.0-1.0
         """
-        suspicion = 0.0
+        # Gaps: share of missing intensity values per channel
+        gap_ratio = np.sum(hists == 0, axis=1) / 256.0
+        # Spikes: tallest bin of the normalized histogram per channel
+        max_peak = np.max(hists / (np.sum(hists, axis=1, keepdims=True) + 1e-6), axis=1)
 
-        # Check each color channel
-        for channel_idx in range(self.num_channels):
-            channel = img_array[:, :, channel_idx].flatten()
+        suspicion = np.where(
+            gap_ratio > self.gap_ratio_threshold, self.gap_ratio_score, 0.0
+        ) + np.where(max_peak > self.max_peak_threshold, self.max_peak_score, 0.0)
 
-            # Compute histogram
-            hist, _ = np.histogram(channel, bins=256, range=(0, 256))
+        # Normalize across channels
+        return float(min(np.sum(suspicion) / self.num_channels, 1.0))
 
-            # Check for gaps (missing intensity values)
-            # Natural images rarely have large gaps
-            zero_bins = np.sum(hist == 0)
-            gap_ratio = zero_bins / 256.0
+    def _check_histogram_anomalies(self, img_array: np.ndarray) -> float:
+        """
+        Check for unnatural histogram patterns.
 
-            if gap_ratio > self.gap_ratio_threshold:
-                suspicion += self.gap_ratio_score
+        Natural images have smooth, bell-curved histograms.
+        Manipulated images may have gaps, spikes, or unnatural distributions.
 
-            # Check for spikes (unnatural peaks)
-            # Normalize histogram
-            hist_norm = hist / (np.sum(hist) + 1e-6)
-            max_peak = np.max(hist_norm)
+        Args:
+            img_array: Image as numpy array (H x W x 3)
 
-            if max_peak > self.max_peak_threshold:
-                suspicion += self.max_peak_score
+        Returns:
+            Suspicion score 0.0-1.0
+        """
+        # Compute histogram of each color channel
+        hists = self._channel_histograms(self._as_channels(img_array))
 
-        # Normalize across channels
-        return min(suspicion / self.num_channels, 1.0)
+        # Gaps (natural images rarely have large gaps) and spikes (unnatural peaks)
+        return self._histogram_score(hists)
 
     def _check_color_correlation(self, img_array: np.ndarray) -> float:
         """
@@ -137,26 +200,49 @@ class StatisticalDetector(Detector):
         Returns:
             Suspicion score 0.0-1.0
         """
-        # Flatten channels
-        r = img_array[:, :, 0].flatten()
-        g = img_array[:, :, 1].flatten()
-        b = img_array[:, :, 2].flatten()
+        return self._correlation_score(self._as_channels(img_array))
 
-        # Compute correlations
-        corr_rg = np.corrcoef(r, g)[0, 1]
-        corr_rb = np.corrcoef(r, b)[0, 1]
-        corr_gb = np.corrcoef(g, b)[0, 1]
+    def _correlation_score(self, channels: list[np.ndarray]) -> float:
+        """Color correlation suspicion from uint8 R, G, B planes (see _check_color_correlation)."""
+        corr = self._channel_correlations(channels)
 
         # Natural images typically have correlation > 0.7
         # Low correlation suggests manipulation
-        avg_corr = (corr_rg + corr_rb + corr_gb) / 3.0
+        avg_corr = (corr[0, 1] + corr[0, 2] + corr[1, 2]) / 3.0
 
         if avg_corr < self.very_suspicious_threshold:
             return self.very_suspicious_score  # Very suspicious
         elif avg_corr < self.somewhat_suspicious_threshold:
             return self.somewhat_suspicious_score  # Somewhat suspicious
         else:
-            return 0.0  # Normal correlation
+            return 0.0  # Normal correlation (or undefined: a constant channel)
+
+    @staticmethod
+    def _channel_correlations(channels: list[np.ndarray]) -> np.ndarray:
+        """
+        Pearson correlation matrix of three uint8 channels.
+
+        One 3x3 covariance from shared moments: channel sums plus the six
+        distinct products (uint8 x uint8 fits uint16), summed exactly.
+
+        Args:
+            channels: uint8 R, G, B planes
+
+        Returns:
+            3x3 correlations (NaN where a channel is constant)
+        """
+        n = channels[0].size
+        sums = np.array([cv2.sumElems(channel)[0] for channel in channels[:3]])
+        products = np.empty((3, 3))
+        for i in range(3):
+            for j in range(i, 3):
+                product = cv2.multiply(channels[i], channels[j], dtype=cv2.CV_16U)
+                products[i, j] = products[j, i] = cv2.sumElems(product)[0]
+
+        covariance = products / n - np.outer(sums, sums) / (n * n)
+        stds = np.sqrt(np.maximum(np.diag(covariance), 0.0))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return covariance / np.outer(stds, stds)
 
     def _check_edge_density(self, img_array: np.ndarray) -> float:
         """
@@ -171,39 +257,34 @@ class StatisticalDetector(Detector):
         Returns:
             Suspicion score 0.0-1.0
         """
-        # Convert to grayscale
-        gray = np.mean(img_array, axis=2)
-
-        # Simple edge detection using gradient
-        grad_x = np.abs(np.diff(gray, axis=1))
-        grad_y = np.abs(np.diff(gray, axis=0))
-
-        # Pad to match original dimensions
-        grad_x = np.pad(grad_x, ((0, 0), (0, 1)), mode="edge")
-        grad_y = np.pad(grad_y, ((0, 1), (0, 0)), mode="edge")
-
-        # Compute edge magnitude
-        edge_magnitude = np.sqrt(grad_x**2 + grad_y**2)
-
-        # Divide image into regions and check edge density variance
-        height, width = edge_magnitude.shape
-        region_h = height // self.edge_grid_size
-        region_w = width // self.edge_grid_size
-
-        edge_densities = []
-        for i in range(self.edge_grid_size):
-            for j in range(self.edge_grid_size):
-                region = edge_magnitude[
-                    i * region_h : (i + 1) * region_h, j * region_w : (j + 1) * region_w
-                ]
-                density = np.mean(region)
-                edge_densities.append(density)
+        return self._edge_score(self._as_channels(img_array))
+
+    def _edge_score(self, channels: list[np.ndarray]) -> float:
+        """Edge density inconsistency from uint8 R, G, B planes (see _check_edge_density)."""
+        # Grayscale (channel mean) kept as the exact uint16 channel sum; the 1/3 is in the kernels
+        channel_sum = cv2.add(channels[0], channels[1], dtype=cv2.CV_16U)
+        channel_sum = cv2.add(channel_sum, channels[2], dtype=cv2.CV_16U)
+
+        # Simple edge detection using forward-difference gradients (float32, no padding copies)
+        grad_x = cv2.filter2D(
+            channel_sum, cv2.CV_32F, _FORWARD_X, anchor=(0, 0), borderType=cv2.BORDER_REPLICATE
+        )
+        grad_y = cv2.filter2D(
+            channel_sum, cv2.CV_32F, _FORWARD_Y, anchor=(0, 0), borderType=cv2.BORDER_REPLICATE
+        )
+        # Last column / row repeats its neighbour's gradient
+        grad_x[:, -1] = grad_x[:, -2]
+        grad_y[-1] = grad_y[-2]
+
+        # Compute edge magnitude (in place)
+        edge_magnitude = cv2.magnitude(grad_x, grad_y, grad_x)
+        del grad_y
+
+        # Divide image into regions (covering every pixel) and check edge density variance
+        edge_densities = RegionalStats(edge_magnitude, squares=False).grid(self.edge_grid_size)[0]
 
         # High variance in edge density suggests manipulation
-        edge_variance = np.var(edge_densities)
         edge_std = np.std(edge_densities)
 
         # Normalize (typical variance: 10-100 for natural images)
-        suspicion_score = min(edge_std / self.edge_std_divisor, 1.0)
-
-        return suspicion_score
+        return float(min(edge_std / self.edge_std_divisor, 1.0))
@@ -0,0 +1,166 @@
+"""Near-duplicate clustering of the images in one run by perceptual hash."""
+
+import logging
+from typing import Iterable, Optional
+
+import numpy as np
+
+from forgery_detection.config_loader import get_config
+from forgery_detection.services.phash_index import popcount64
+
+logger = logging.getLogger(__name__)
+
+
+class DuplicateClusterer:
+    """
+    Groups images of a batch whose pHashes are within a Hamming distance.
+
+    Hashes are packed into one uint64 array and compared all-pairs in square
+    tiles of block_size x block_size: one broadcast XOR plus a popcount per
+    tile, so the n² comparisons run in NumPy and memory stays bounded by the
+    tile. Near pairs become edges of a graph whose connected components
+    (vectorized union-find) are the duplicate clusters, so a photo reused
+    with small crops or recompression chains into one cluster.
+    """
+
+    def __init__(self, max_distance: Optional[int] = None, block_size: Optional[int] = None):
+        """
+        Initialize with config parameters.
+
+        Args:
+            max_distance: Max Hamming distance (of 64 bits) between near-duplicates
+            block_size: Hashes per tile side (memory: 8 bytes x block_size²)
+        """
+        config = get_config()
+        self.enabled = config.get_bool("duplicate_clusterer.enabled", True)
+        self.max_distance = (
+            max_distance
+            if max_distance is not None
+            else config.get_int("duplicate_clusterer.max_distance", 8)
+        )
+        self.block_size = max(
+            1,
+            (
+                block_size
+                if block_size is not None
+                else config.get_int("duplicate_clusterer.block_size", 2048)
+            ),
+        )
+
+    def pack_hashes(self, phashes: Iterable[str]) -> np.ndarray:
+        """
+        Pack hex pHashes into a uint64 array.
+
+        Args:
+            phashes: 16-digit hex strings (as produced by imagehash)
+
+        Returns:
+            uint64 array, one value per hash
+        """
+        return np.array([int(h, 16) for h in phashes], dtype=np.uint64)
+
+    def near_pairs(self, hashes: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Find all pairs i < j within max_distance.
+
+        Args:
+            hashes: uint64 array of packed hashes
+
+        Returns:
+            Tuple (i, j, distance) of equal-length int64 arrays
+        """
+        n = len(hashes)
+        rows, cols, dists = [], [], []
+        for start in range(0, n, self.block_size):
+            block = hashes[start : start + self.block_size, None]
+            # Upper triangle only: tiles from the diagonal block onwards
+            for other in range(start, n, self.block_size):
+                distances = popcount64(block ^ hashes[None, other : other + self.block_size])
+                near = distances <= self.max_distance
+                if other == start:
+                    near &= np.triu(np.ones(near.shape, dtype=bool), k=1)
+                i, j = np.nonzero(near)
+                if len(i):
+                    rows.append(i + start)
+                    cols.append(j + other)
+                    dists.append(distances[i, j].astype(np.int64))
+
+        if not rows:
+            empty = np.zeros(0, dtype=np.int64)
+            return empty, empty, empty
+        return np.concatenate(rows), np.concatenate(cols), np.concatenate(dists)
+
+    def cluster(self, hashes: np.ndarray) -> list[np.ndarray]:
+        """
+        Group hashes into near-duplicate clusters.
+
+        Args:
+            hashes: uint64 array of packed hashes
+
+        Returns:
+            Index arrays of clusters with 2+ members, largest first
+        """
+        i, j, _ = self.near_pairs(hashes)
+        return self._group(self._connected_components(len(hashes), i, j))
+
+    def find_clusters(self, records: list[dict]) -> list[dict]:
+        """
+        Cluster scored image records by their "phash" field.
+
+        Args:
+            records: Per-image dicts with filename and phash (records without
+                a phash are ignored)
+
+        Returns:
+            Clusters (largest first), each a dict with size, max_distance
+            (largest distance between linked members) and members (the records);
+            empty when clustering is disabled
+        """
+        if not self.enabled:
+            return []
+        hashed = [r for r in records if r.get("phash")]
+        hashes = self.pack_hashes(r["phash"] for r in hashed)
+        i, j, distances = self.near_pairs(hashes)
+        labels = self._connected_components(len(hashes), i, j)
+
+        # Largest linked distance per component, labelling each edge once
+        max_distances = np.zeros(len(hashes), dtype=np.int64)
+        np.maximum.at(max_distances, labels[i], distances)
+
+        clusters = []
+        for members in self._group(labels):
+            clusters.append(
+                {
+                    "size": len(members),
+                    "max_distance": int(max_distances[labels[members[0]]]),
+                    "members": [hashed[m] for m in members],
+                }
+            )
+        logger.info(f"Found {len(clusters)} near-duplicate clusters among {len(hashed)} images")
+        return clusters
+
+    def _group(self, labels: np.ndarray) -> list[np.ndarray]:
+        """Components with 2+ members, largest first, from per-node component labels."""
+        order = np.argsort(labels, kind="stable")
+        boundaries = np.flatnonzero(np.diff(labels[order])) + 1
+        groups = [g for g in np.split(order, boundaries) if len(g) > 1]
+        return sorted(groups, key=lambda g: (-len(g), g[0]))
+
+    def _connected_components(self, n: int, i: np.ndarray, j: np.ndarray) -> np.ndarray:
+        """Component label (smallest member index) per node, via min-label propagation."""
+        labels = np.arange(n)
+        if len(i) == 0:
+            return labels
+        while True:
+            # Hook each edge's larger label onto the smaller, then compress paths
+            previous = labels.copy()
+            smaller = np.minimum(labels[i], labels[j])
+            np.minimum.at(labels, labels[i], smaller)
+            np.minimum.at(labels, labels[j], smaller)
+            while True:
+                compressed = labels[labels]
+                if np.array_equal(compressed, labels):
+                    break
+                labels = compressed
+            if np.array_equal(labels, previous):
+                return labels
@@ -0,0 +1,264 @@
+"""Per-image analysis context shared by all detectors."""
+
+import hashlib
+import io
+import threading
+from typing import Any, Callable, Iterable, Optional
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from forgery_detection.services.metadata_extractor import MetadataExtractor
+
+# Decode plan before plan_resolutions() is called (None plans a full-resolution decode)
+_UNPLANNED = -1
+
+# Named intermediate products derived from the luminance (see ImageContext.feature)
+FEATURES = ("luminance", "median_residual", "laplacian_residual")
+
+
+class ImageContext:
+    """
+    Lazily decoded views of a single image, shared across detectors.
+
+    Every detector used to call Image.open() + convert("RGB") on the same bytes.
+    The context decodes on first access and memoizes each product, so one image
+    is decoded once per evaluation no matter how many detectors consume it.
+
+    Products are computed at most once even when detectors run concurrently
+    on separate threads.
+
+    Products:
+    - image: PIL image as opened (header parsed, pixels not yet decoded)
+    - rgb_image: PIL image converted to RGB
+    - rgb: RGB uint8 array (H x W x 3)
+    - float32: RGB float32 array (H x W x 3)
+    - gray: grayscale uint8 array (H x W)
+    - metadata: EXIF IFD0 tags and XMP read from the header segments only
+      (MetadataExtractor, no decoder)
+    - sha256: SHA-256 hex digest of the raw bytes (content address)
+
+    Reduced-resolution views (resolution pyramid):
+    - rgb_at(max_side), float32_at(max_side), rgb_image_at(max_side): the image
+      with its longest side at most max_side. JPEGs are decoded directly at
+      1/2, 1/4 or 1/8 scale in the DCT domain (PIL draft()), other formats are
+      area-resized, so detectors needing only coarse statistics never pay for
+      a full-resolution decode.
+    - plan_resolutions(max_sides): declares the resolutions the image's
+      consumers will read, so every reduced view is downsampled from the one
+      largest decode instead of each being decoded separately.
+
+    Feature store (feature(name, max_side)): intermediate products that
+    several detectors build on, requested by name and computed once per
+    image and resolution:
+    - luminance: uint8 luminance (H x W); the gray product at full resolution
+    - median_residual: uint8 |luminance - 3x3 median| (noise residual)
+    - laplacian_residual: uint8 |Laplacian| of the luminance (saturated at 255)
+
+    release() evicts memoized products once an image is done, so a context
+    that outlives its scoring keeps no pixel buffers alive.
+    """
+
+    def __init__(self, image_bytes: bytes, path: Optional[str] = None):
+        """
+        Initialize context for raw image data.
+
+        Args:
+            image_bytes: Raw image data
+            path: Optional source path (for logging and bookkeeping)
+        """
+        self.image_bytes = image_bytes
+        self.path = path
+        self._products: dict[str, Any] = {}
+        self._locks: dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+        # PIL image objects are not safe for concurrent use (shared file pointer)
+        self._pil_lock = threading.Lock()
+        self._planned_side: Optional[int] = _UNPLANNED
+
+    def get_or_compute(self, name: str, factory: Callable[[], Any]) -> Any:
+        """
+        Return a memoized product, computing it on first request.
+
+        Args:
+            name: Product name
+            factory: Zero-argument callable computing the product
+
+        Returns:
+            The memoized product
+        """
+        try:
+            return self._products[name]
+        except KeyError:
+            pass
+
+        with self._locks_guard:
+            lock = self._locks.setdefault(name, threading.Lock())
+        with lock:
+            if name not in self._products:
+                self._products[name] = factory()
+        return self._products[name]
+
+    def release(self, *names: str) -> None:
+        """
+        Evict memoized products; they are recomputed if requested again.
+
+        Args:
+            names: Product names to evict (all products if none are given)
+        """
+        with self._locks_guard:
+            if not names:
+                self._products.clear()
+            for name in names:
+                self._products.pop(name, None)
+
+    def feature(self, name: str, max_side: Optional[int] = None) -> Any:
+        """
+        Named intermediate product (see FEATURES), memoized per resolution.
+
+        Args:
+            name: Feature name
+            max_side: Longest side of the source luminance (None or 0 = full resolution)
+
+        Returns:
+            The memoized feature
+        """
+        if name not in FEATURES:
+            raise ValueError(f"Unknown feature: {name} (expected one of {', '.join(FEATURES)})")
+        # Every max_side the image already fits shares the full-resolution product
+        if max_side and max(self.size) <= max_side:
+            max_side = None
+        key = f"{name}@{max_side}" if max_side else name
+        return self.get_or_compute(key, lambda: getattr(self, f"_compute_{name}")(max_side))
+
+    @property
+    def image(self) -> Image.Image:
+        """PIL image as opened from the raw bytes."""
+        return self.get_or_compute("image", lambda: Image.open(io.BytesIO(self.image_bytes)))
+
+    @property
+    def rgb_image(self) -> Image.Image:
+        """PIL image in RGB mode (decodes pixel data)."""
+        return self.get_or_compute("rgb_image", self._decode_rgb)
+
+    @property
+    def rgb(self) -> np.ndarray:
+        """RGB image as uint8 array (H x W x 3)."""
+        return self.get_or_compute("rgb", lambda: np.asarray(self.rgb_image, dtype=np.uint8))
+
+    @property
+    def float32(self) -> np.ndarray:
+        """RGB image as float32 array (H x W x 3)."""
+        return self.get_or_compute("float32", lambda: self.rgb.astype(np.float32))
+
+    @property
+    def gray(self) -> np.ndarray:
+        """Grayscale image as uint8 array (H x W)."""
+        return self.feature("luminance")
+
+    @property
+    def metadata(self) -> dict:
+        """Header-only metadata: format, IFD0 tags and XMP (see MetadataExtractor.extract)."""
+        return self.get_or_compute(
+            "metadata", lambda: MetadataExtractor().extract(self.image_bytes)
+        )
+
+    @property
+    def size(self) -> tuple[int, int]:
+        """Full-resolution (width, height), read from the header."""
+        return self.image.size
+
+    def plan_resolutions(self, max_sides: Iterable[Optional[int]]) -> None:
+        """
+        Declare the resolutions consumers will read (e.g. Detector.max_resolution).
+
+        Reduced views are then downsampled from the largest planned decode: from
+        the full-resolution rgb product when any consumer needs it, else from the
+        largest planned reduced view, decoded once.
+
+        Args:
+            max_sides: Longest sides that will be requested (None or 0 = full resolution)
+        """
+        sides = [side or None for side in max_sides]
+        if sides:
+            self._planned_side = None if None in sides else max(sides)
+
+    def rgb_at(self, max_side: Optional[int]) -> np.ndarray:
+        """
+        RGB uint8 array with its longest side at most max_side.
+
+        Args:
+            max_side: Maximum width/height in pixels (None or 0 = full resolution)
+
+        Returns:
+            The full-resolution rgb product if it already fits, else a reduced copy
+        """
+        if not max_side or max(self.size) <= max_side:
+            return self.rgb
+        return self.get_or_compute(f"rgb@{max_side}", lambda: self._decode_reduced(max_side))
+
+    def float32_at(self, max_side: Optional[int]) -> np.ndarray:
+        """RGB float32 array with its longest side at most max_side (see rgb_at)."""
+        if not max_side or max(self.size) <= max_side:
+            return self.float32
+        return self.get_or_compute(
+            f"float32@{max_side}", lambda: self.rgb_at(max_side).astype(np.float32)
+        )
+
+    def rgb_image_at(self, max_side: Optional[int]) -> Image.Image:
+        """PIL RGB image with its longest side at most max_side (see rgb_at)."""
+        if not max_side or max(self.size) <= max_side:
+            return self.rgb_image
+        return self.get_or_compute(
+            f"rgb_image@{max_side}", lambda: Image.fromarray(self.rgb_at(max_side))
+        )
+
+    @property
+    def sha256(self) -> str:
+        """SHA-256 hex digest of the raw image bytes."""
+        return self.get_or_compute("sha256", lambda: hashlib.sha256(self.image_bytes).hexdigest())
+
+    def _decode_rgb(self) -> Image.Image:
+        with self._pil_lock:
+            img = self.image
+            if img.mode != "RGB":
+                img = img.convert("RGB")
+            img.load()
+            return img
+
+    def _decode_reduced(self, max_side: int) -> np.ndarray:
+        width, height = self.size
+        scale = max_side / max(width, height)
+        target = (max(1, round(width * scale)), max(1, round(height * scale)))
+
+        source_side = self._planned_side
+        if source_side != _UNPLANNED and (source_side is None or source_side > max_side):
+            # A larger view is decoded anyway: downsample it instead of decoding again
+            rgb = self.rgb_at(source_side)
+        elif "rgb" not in self._products and self.image.format == "JPEG":
+            # DCT-domain scaling: decode at the smallest 1/2^k size still >= target
+            img = Image.open(io.BytesIO(self.image_bytes))
+            img.draft("RGB", target)
+            if img.mode != "RGB":
+                img = img.convert("RGB")
+            rgb = np.asarray(img, dtype=np.uint8)
+        else:
+            # Other formats (or already decoded): downsample the full-resolution pixels
+            rgb = self.rgb
+
+        if rgb.shape[1] > target[0] or rgb.shape[0] > target[1]:
+            rgb = cv2.resize(rgb, target, interpolation=cv2.INTER_AREA)
+        return rgb
+
+    def _compute_luminance(self, max_side: Optional[int]) -> np.ndarray:
+        return cv2.cvtColor(self.rgb_at(max_side), cv2.COLOR_RGB2GRAY)
+
+    def _compute_median_residual(self, max_side: Optional[int]) -> np.ndarray:
+        luminance = self.feature("luminance", max_side)
+        return cv2.absdiff(luminance, cv2.medianBlur(luminance, 3))
+
+    def _compute_laplacian_residual(self, max_side: Optional[int]) -> np.ndarray:
+        return cv2.convertScaleAbs(
+            cv2.Laplacian(self.feature("luminance", max_side), cv2.CV_16S, ksize=1)
+        )
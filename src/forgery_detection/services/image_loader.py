@@ -1,20 +1,46 @@
 """Image loading service for reading images from directories."""
 
 import logging
+import queue
+import threading
 from pathlib import Path
+from typing import Iterable, Iterator, Optional
+
+from forgery_detection.config_loader import get_config
 
 logger = logging.getLogger(__name__)
 
+# Sentinel marking the end of a prefetch stream
+_END = object()
+
 
 class ImageLoader:
     """
     Service for loading images from labeled directories.
+
+    Images can be loaded eagerly (load_labeled_images) or streamed lazily
+    (iter_labeled_images) so memory stays bounded on large datasets.
     """
 
     SUPPORTED_EXTENSIONS = {".jpg", ".jpeg", ".png", ".bmp", ".tif", ".tiff"}
 
+    def __init__(self, prefetch_size: Optional[int] = None):
+        """
+        Initialize image loader.
+
+        Args:
+            prefetch_size: Max images read ahead by the background reader
+                (optional, uses config if None, 0 disables prefetching)
+        """
+        config = get_config()
+        self.prefetch_size = (
+            prefetch_size
+            if prefetch_size is not None
+            else config.get_int("image_loader.prefetch_size", 8)
+        )
+
     def load_labeled_images(
-        self, forged_dir: str, authentic_dir: str
+        self, forged_dir: str, authentic_dir: str, recursive: bool = False
     ) -> list[tuple[str, bytes, str]]:
         """
         Load images from labeled directories.
@@ -22,39 +48,156 @@ class ImageLoader:
         Args:
             forged_dir: Directory containing forged images
             authentic_dir: Directory containing authentic images
+            recursive: Also walk subdirectories
 
         Returns:
             List of tuples: (image_path, image_bytes, label)
             where label is "forged" or "authentic"
         """
-        images = []
-
-        # Load forged images
-        forged_path = Path(forged_dir)
-        if forged_path.exists():
-            forged_count = 0
-            for file_path in forged_path.iterdir():
-                if file_path.suffix.lower() in self.SUPPORTED_EXTENSIONS:
-                    with open(file_path, "rb") as f:
-                        image_bytes = f.read()
-                    images.append((str(file_path), image_bytes, "forged"))
-                    forged_count += 1
-            logger.debug(f"Loaded {forged_count} forged images from {forged_dir}")
-        else:
-            logger.warning(f"Forged directory does not exist: {forged_dir}")
-
-        # Load authentic images
-        authentic_path = Path(authentic_dir)
-        if authentic_path.exists():
-            authentic_count = 0
-            for file_path in authentic_path.iterdir():
-                if file_path.suffix.lower() in self.SUPPORTED_EXTENSIONS:
-                    with open(file_path, "rb") as f:
-                        image_bytes = f.read()
-                    images.append((str(file_path), image_bytes, "authentic"))
-                    authentic_count += 1
-            logger.debug(f"Loaded {authentic_count} authentic images from {authentic_dir}")
-        else:
-            logger.warning(f"Authentic directory does not exist: {authentic_dir}")
+        labeled_paths = self._iter_labeled_paths(forged_dir, authentic_dir, recursive)
+        return list(self._read_images(labeled_paths))
+
+    def iter_labeled_images(
+        self, forged_dir: str, authentic_dir: str, recursive: bool = False
+    ) -> Iterator[tuple[str, bytes, str]]:
+        """
+        Lazily yield images from labeled directories.
 
+        Files are read one at a time; at most prefetch_size images are held
+        in memory ahead of the consumer.
+
+        Args:
+            forged_dir: Directory containing forged images
+            authentic_dir: Directory containing authentic images
+            recursive: Also walk subdirectories
+
+        Yields:
+            Tuples: (image_path, image_bytes, label)
+        """
+        labeled_paths = self._iter_labeled_paths(forged_dir, authentic_dir, recursive)
+        images = self._read_images(labeled_paths)
+        if self.prefetch_size > 0:
+            return self._prefetch(images, self.prefetch_size)
         return images
+
+    def iter_unlabeled_images(
+        self, inputs: list[str], recursive: bool = False
+    ) -> Iterator[tuple[str, bytes, None]]:
+        """
+        Lazily yield unlabeled images for prediction.
+
+        Each input may be a directory, an image file, or a text file listing
+        one image path per line (blank lines and lines starting with # are
+        ignored).
+
+        Args:
+            inputs: Directories, image files and/or .txt file lists
+            recursive: Also walk subdirectories of directory inputs
+
+        Yields:
+            Tuples: (image_path, image_bytes, None)
+        """
+        paths = ((file_path, None) for file_path in self._iter_input_paths(inputs, recursive))
+        images = self._read_images(paths)
+        if self.prefetch_size > 0:
+            return self._prefetch(images, self.prefetch_size)
+        return images
+
+    def _iter_input_paths(self, inputs: list[str], recursive: bool) -> Iterator[Path]:
+        """Yield image files named by directories, files and file lists."""
+        for entry in inputs:
+            path = Path(entry)
+            if path.is_dir():
+                yield from self._iter_directory(path, recursive)
+            elif path.suffix.lower() == ".txt" and path.is_file():
+                with open(path, "r") as f:
+                    listed = [line.strip() for line in f]
+                yield from self._iter_input_paths(
+                    [line for line in listed if line and not line.startswith("#")], recursive
+                )
+            elif path.is_file():
+                yield path
+            else:
+                logger.warning(f"Input does not exist: {entry}")
+
+    def _iter_labeled_paths(
+        self, forged_dir: str, authentic_dir: str, recursive: bool
+    ) -> Iterator[tuple[Path, str]]:
+        """Yield (file_path, label) for supported files of both directories."""
+        for directory, label in ((forged_dir, "forged"), (authentic_dir, "authentic")):
+            dir_path = Path(directory)
+            if not dir_path.exists():
+                logger.warning(f"{label.title()} directory does not exist: {directory}")
+                continue
+
+            count = 0
+            for file_path in self._iter_directory(dir_path, recursive):
+                yield file_path, label
+                count += 1
+            logger.debug(f"Found {count} {label} images in {directory}")
+
+    def _iter_directory(self, dir_path: Path, recursive: bool) -> Iterator[Path]:
+        """Yield supported image files of a directory."""
+        entries = dir_path.rglob("*") if recursive else dir_path.iterdir()
+        for file_path in entries:
+            if file_path.suffix.lower() in self.SUPPORTED_EXTENSIONS and file_path.is_file():
+                yield file_path
+
+    def _read_images(
+        self, labeled_paths: Iterable[tuple[Path, str]]
+    ) -> Iterator[tuple[str, bytes, str]]:
+        """Read file contents lazily, one file at a time."""
+        for file_path, label in labeled_paths:
+            with open(file_path, "rb") as f:
+                image_bytes = f.read()
+            yield str(file_path), image_bytes, label
+
+    def _prefetch(self, items: Iterator, window: int) -> Iterator:
+        """
+        Read items ahead in a background thread through a bounded queue.
+
+        File I/O overlaps with analysis, while the queue bound caps how many
+        images are held in memory at once.
+
+        Args:
+            items: Source iterator
+            window: Max items buffered ahead of the consumer
+
+        Yields:
+            Items of the source iterator, in order
+        """
+        buffer: queue.Queue = queue.Queue(maxsize=window)
+        stop = threading.Event()
+
+        def put(item) -> bool:
+            # Retry with timeout so the reader exits if the consumer stops early
+            while not stop.is_set():
+                try:
+                    buffer.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def reader():
+            try:
+                for item in items:
+                    if not put(item):
+                        return
+                put(_END)
+            except BaseException as e:
+                put(e)
+
+        thread = threading.Thread(target=reader, name="image-prefetch", daemon=True)
+        thread.start()
+        try:
+            while True:
+                item = buffer.get()
+                if item is _END:
+                    return
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+        finally:
+            stop.set()
+            thread.join()
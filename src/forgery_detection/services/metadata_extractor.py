@@ -0,0 +1,264 @@
+"""Header-only image metadata extraction (EXIF IFD0 and XMP) without decoding pixels."""
+
+import mmap
+import re
+import struct
+from typing import Any, Iterable, Optional
+
+# Known editing software (lowercase), overridden by metadata_detector.editing_software
+DEFAULT_EDITING_SOFTWARE = [
+    "photoshop",
+    "gimp",
+    "paint.net",
+    "affinity",
+    "pixelmator",
+    "acorn",
+    "photoscape",
+]
+
+# TIFF field types: struct code and bytes per value (unknown types are kept as raw bytes)
+_FIELD_TYPES = {
+    1: ("B", 1),
+    2: ("s", 1),
+    3: ("H", 2),
+    4: ("I", 4),
+    5: ("I", 8),
+    6: ("b", 1),
+    7: ("s", 1),
+    8: ("h", 2),
+    9: ("i", 4),
+    10: ("i", 8),
+    11: ("f", 4),
+    12: ("d", 8),
+    13: ("I", 4),
+}
+_RATIONAL_TYPES = (5, 10)
+
+# Segment identifiers
+_EXIF_ID = b"Exif\x00\x00"
+_XMP_ID = b"http://ns.adobe.com/xap/1.0/\x00"
+_PNG_XMP_KEYWORD = b"XML:com.adobe.xmp\x00"
+_PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+# JPEG markers without a length field, and frame headers (SOF0-SOF15 except DHT, JPG, DAC)
+_STANDALONE_MARKERS = {0x01, *range(0xD0, 0xD8)}
+_SOF_MARKERS = set(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+# TIFF tags
+TAG_SOFTWARE = 305
+TAG_ORIENTATION = 274
+TAG_XMP = 700
+
+_XMP_ORIENTATION = re.compile(r'tiff:Orientation(?:="|>)([0-9])')
+
+
+def match_editing_software(software: Any, editing_software: Iterable[str]) -> Optional[str]:
+    """
+    Editing program named in a Software string.
+
+    Args:
+        software: Software tag value (non-strings never match)
+        editing_software: Lowercase program names
+
+    Returns:
+        The first matching program name, or None
+    """
+    if not isinstance(software, str) or not software:
+        return None
+    software_lower = software.lower()
+    return next((name for name in editing_software if name in software_lower), None)
+
+
+class MetadataExtractor:
+    """
+    Reads EXIF and XMP metadata from the header segments of an image file.
+
+    No decoder is instantiated: only the bytes of the metadata containers are
+    touched, so the cost does not depend on the pixel count (microseconds per
+    image), and extract_file() reads a file only where the metadata lives.
+
+    Containers:
+    - JPEG: APP1 Exif (TIFF structure) and APP1 XMP segments before the frame header
+    - TIFF: the file's own IFD0, XMP from the XMLPacket tag
+    - PNG: eXIf chunk and the XMP iTXt chunk before the first IDAT
+    - BMP: no metadata
+
+    Tags are the entries of IFD0, as PIL's getexif() reports them: tag id to
+    value (str for ASCII, int/float or tuples for numbers, bytes otherwise).
+    """
+
+    def extract(self, data) -> dict:
+        """
+        Parse the metadata of an image.
+
+        Args:
+            data: Image bytes (or any buffer: bytes, memoryview, mmap)
+
+        Returns:
+            Dict with format ("jpeg" | "png" | "tiff" | "bmp"), tags (IFD0
+            tag id to value) and xmp (XMP packet as str, or None)
+
+        Raises:
+            ValueError: Unknown format, or a file that ends inside its headers
+        """
+        try:
+            if data[:3] == b"\xff\xd8\xff":
+                return self._extract_jpeg(data)
+            if data[:8] == _PNG_SIGNATURE:
+                return self._extract_png(data)
+            if data[:4] in (b"II*\x00", b"MM\x00*"):
+                tags = self._read_tiff(data, 0)
+                return self._result("tiff", tags, self._decode_xmp(tags.get(TAG_XMP)))
+            if data[:2] == b"BM":
+                return self._result("bmp", {}, None)
+        except (struct.error, IndexError) as e:
+            raise ValueError(f"Truncated image metadata: {e}") from e
+        raise ValueError("Unknown image format")
+
+    def extract_file(self, path: str) -> dict:
+        """
+        Parse the metadata of an image file without reading the whole file.
+
+        The file is memory-mapped, so only the pages holding the header
+        segments are read from disk.
+
+        Args:
+            path: Image file path
+
+        Returns:
+            See extract()
+        """
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            return self.extract(data)
+
+    def _extract_jpeg(self, data) -> dict:
+        tags, xmp = None, None
+        pos = 2
+        while True:
+            if pos + 4 > len(data):
+                raise ValueError("JPEG ends before its frame header")
+            if data[pos] != 0xFF:
+                raise ValueError(f"Corrupt JPEG marker at offset {pos}")
+            marker = data[pos + 1]
+            if marker == 0xFF:
+                # Fill byte before a marker
+                pos += 1
+                continue
+            if marker in _STANDALONE_MARKERS:
+                pos += 2
+                continue
+            if marker in _SOF_MARKERS:
+                # Metadata segments precede the frame header
+                return self._result("jpeg", tags or {}, xmp)
+            if marker == 0xDA:
+                raise ValueError("JPEG scan starts before its frame header")
+
+            (length,) = struct.unpack_from(">H", data, pos + 2)
+            start, end = pos + 4, pos + 2 + length
+            if end > len(data):
+                raise ValueError("JPEG ends before its frame header")
+            if marker == 0xE1:
+                # First Exif and first XMP segment win
+                if tags is None and data[start : start + len(_EXIF_ID)] == _EXIF_ID:
+                    tags = self._read_tiff(data, start + len(_EXIF_ID))
+                elif xmp is None and data[start : start + len(_XMP_ID)] == _XMP_ID:
+                    xmp = self._decode_xmp(data[start + len(_XMP_ID) : end])
+            pos = end
+
+    def _extract_png(self, data) -> dict:
+        tags, xmp = None, None
+        pos = len(_PNG_SIGNATURE)
+        while True:
+            if pos + 8 > len(data):
+                raise ValueError("PNG ends before its image data")
+            length, chunk_type = struct.unpack_from(">I4s", data, pos)
+            start, end = pos + 8, pos + 8 + length
+            if chunk_type == b"IDAT":
+                return self._result("png", tags or {}, xmp)
+            if end + 4 > len(data):
+                raise ValueError("PNG ends before its image data")
+            if chunk_type == b"eXIf" and tags is None:
+                tags = self._read_tiff(data, start)
+            elif (
+                chunk_type == b"iTXt"
+                and xmp is None
+                and data[start : start + len(_PNG_XMP_KEYWORD)] == _PNG_XMP_KEYWORD
+            ):
+                # Keyword, compression flag and method, then NUL-terminated language
+                # and translated keyword
+                text = data[start + len(_PNG_XMP_KEYWORD) : end]
+                if text[:1] == b"\x00":
+                    xmp = self._decode_xmp(text[2:].split(b"\x00", 2)[-1])
+            pos = end + 4  # Skip CRC
+
+    @staticmethod
+    def _result(format_type: str, tags: dict, xmp: Optional[str]) -> dict:
+        # Like PIL's getexif(), an XMP orientation stands in for a missing IFD0 one
+        if xmp and TAG_ORIENTATION not in tags:
+            match = _XMP_ORIENTATION.search(xmp)
+            if match:
+                tags[TAG_ORIENTATION] = int(match.group(1))
+        return {"format": format_type, "tags": tags, "xmp": xmp}
+
+    def _read_tiff(self, data, base: int) -> dict:
+        """
+        IFD0 tags of a TIFF structure.
+
+        Args:
+            data: Buffer holding the structure
+            base: Offset of the TIFF header (IFD offsets are relative to it)
+
+        Returns:
+            Tag id to decoded value; entries pointing outside the buffer are skipped
+        """
+        byte_order = data[base : base + 2]
+        if byte_order == b"II":
+            order = "<"
+        elif byte_order == b"MM":
+            order = ">"
+        else:
+            raise ValueError("Invalid TIFF byte order")
+        (ifd,) = struct.unpack_from(order + "I", data, base + 4)
+        (count,) = struct.unpack_from(order + "H", data, base + ifd)
+
+        tags = {}
+        for entry in range(base + ifd + 2, base + ifd + 2 + 12 * count, 12):
+            tag, field_type, n = struct.unpack_from(order + "HHI", data, entry)
+            code, size = _FIELD_TYPES.get(field_type, ("s", 1))
+            length = size * n
+            # Values of up to 4 bytes are stored in the entry itself
+            start = (
+                entry + 8
+                if length <= 4
+                else base + struct.unpack_from(order + "I", data, entry + 8)[0]
+            )
+            if start + length > len(data):
+                continue
+            tags[tag] = self._decode_value(data, start, length, field_type, code, n, order)
+        return tags
+
+    @staticmethod
+    def _decode_value(
+        data, start: int, length: int, field_type: int, code: str, n: int, order: str
+    ) -> Any:
+        if code == "s":
+            raw = bytes(data[start : start + length])
+            # ASCII strings are NUL-terminated
+            return raw.rstrip(b"\x00").decode("latin-1") if field_type == 2 else raw
+        if field_type in _RATIONAL_TYPES:
+            pairs = struct.unpack_from(f"{order}{2 * n}{code}", data, start)
+            values = tuple(
+                num / den if den else float("nan") for num, den in zip(pairs[::2], pairs[1::2])
+            )
+        else:
+            values = struct.unpack_from(f"{order}{n}{code}", data, start)
+        return values[0] if n == 1 else values
+
+    @staticmethod
+    def _decode_xmp(packet) -> Optional[str]:
+        if packet is None:
+            return None
+        if isinstance(packet, tuple):
+            # XMLPacket stored as BYTE values
+            packet = bytes(packet)
+        return bytes(packet).decode("utf-8", "replace").rstrip("\x00")
@@ -0,0 +1,103 @@
+"""Confusion-matrix, ROC and precision-recall metrics for evaluation runs."""
+
+import numpy as np
+
+
+class MetricsEngine:
+    """
+    Computes evaluation metrics for all criteria from one pass over the images.
+
+    Labels and final scores are collected into arrays once and sorted per class.
+    Counting images flagged at a threshold (score >= threshold, as in Classifier)
+    is then a binary search, so any number of criteria and full ROC/PR curves
+    cost O(log n) per threshold instead of one pass over the images each.
+    """
+
+    def compute(
+        self, image_details: list[dict], thresholds: dict[str, float], modes: list[str]
+    ) -> dict:
+        """
+        Compute metrics for the requested criteria plus ROC/PR curves.
+
+        Args:
+            image_details: Per-image dicts with ground_truth and final_score
+            thresholds: Threshold values by mode
+            modes: Modes to report
+
+        Returns:
+            Dict with "modes" ({mode: confusion matrix and rates}),
+            "roc" (fpr, tpr, thresholds, auc) and "pr" (precision, recall, thresholds, auc)
+        """
+        labels = np.array([d["ground_truth"] == "forged" for d in image_details], dtype=bool)
+        scores = np.array([d["final_score"] for d in image_details], dtype=np.float64)
+        positive_scores = np.sort(scores[labels])
+        negative_scores = np.sort(scores[~labels])
+
+        mode_metrics = {}
+        for mode in modes:
+            tp, fp = self._flagged_counts(
+                positive_scores, negative_scores, np.array([thresholds[mode]])
+            )
+            mode_metrics[mode] = self._rates(
+                int(tp[0]), int(fp[0]), len(positive_scores), len(negative_scores)
+            )
+            mode_metrics[mode]["threshold"] = thresholds[mode]
+
+        return {
+            "modes": mode_metrics,
+            "roc": self._roc_curve(positive_scores, negative_scores, scores),
+            "pr": self._pr_curve(positive_scores, negative_scores, scores),
+        }
+
+    def _flagged_counts(
+        self, positive_scores: np.ndarray, negative_scores: np.ndarray, thresholds: np.ndarray
+    ) -> tuple[np.ndarray, np.ndarray]:
+        # Images with score >= t = all minus those strictly below t
+        tp = len(positive_scores) - np.searchsorted(positive_scores, thresholds, side="left")
+        fp = len(negative_scores) - np.searchsorted(negative_scores, thresholds, side="left")
+        return tp, fp
+
+    def _rates(self, tp: int, fp: int, positives: int, negatives: int) -> dict:
+        fn = positives - tp
+        tn = negatives - fp
+        total = positives + negatives
+        return {
+            "total": total,
+            "tp": tp,
+            "fp": fp,
+            "fn": fn,
+            "tn": tn,
+            "precision": tp / (tp + fp) if (tp + fp) > 0 else 0.0,
+            "recall": tp / (tp + fn) if (tp + fn) > 0 else 0.0,
+            "fpr": fp / (fp + tn) if (fp + tn) > 0 else 0.0,
+            "accuracy": (tp + tn) / total if total > 0 else 0.0,
+        }
+
+    def _curve_thresholds(self, scores: np.ndarray) -> np.ndarray:
+        # Every distinct score, descending, preceded by +inf (nothing flagged)
+        return np.concatenate(([np.inf], np.unique(scores)[::-1]))
+
+    def _roc_curve(
+        self, positive_scores: np.ndarray, negative_scores: np.ndarray, scores: np.ndarray
+    ) -> dict:
+        thresholds = self._curve_thresholds(scores)
+        tp, fp = self._flagged_counts(positive_scores, negative_scores, thresholds)
+        tpr = tp / len(positive_scores) if len(positive_scores) else np.zeros(len(thresholds))
+        fpr = fp / len(negative_scores) if len(negative_scores) else np.zeros(len(thresholds))
+        # Trapezoidal area under the (fpr, tpr) staircase
+        area = np.sum(np.diff(fpr) * (tpr[1:] + tpr[:-1]) / 2.0)
+        auc = float(area) if len(positive_scores) and len(negative_scores) else None
+        return {"fpr": fpr, "tpr": tpr, "thresholds": thresholds, "auc": auc}
+
+    def _pr_curve(
+        self, positive_scores: np.ndarray, negative_scores: np.ndarray, scores: np.ndarray
+    ) -> dict:
+        thresholds = self._curve_thresholds(scores)[1:]
+        tp, fp = self._flagged_counts(positive_scores, negative_scores, thresholds)
+        flagged = tp + fp
+        precision = np.divide(tp, flagged, out=np.ones(len(thresholds)), where=flagged > 0)
+        recall = tp / len(positive_scores) if len(positive_scores) else np.zeros(len(thresholds))
+        # Average precision: precision weighted by each recall increment
+        recall_steps = np.diff(np.concatenate(([0.0], recall)))
+        auc = float(np.sum(recall_steps * precision)) if len(positive_scores) else None
+        return {"precision": precision, "recall": recall, "thresholds": thresholds, "auc": auc}
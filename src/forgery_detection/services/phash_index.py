@@ -0,0 +1,412 @@
+"""Persistent perceptual-hash index with sub-linear Hamming-radius queries."""
+
+import fcntl
+import itertools
+import logging
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# 64-bit hash split into 4 x 16-bit chunks (multi-index hashing)
+CHUNKS = 4
+CHUNK_BITS = 16
+
+# Ids looked up per SQL statement (SQLite allows 999 bound variables before 3.32)
+MAX_SQL_VARIABLES = 900
+
+
+def popcount64(values: np.ndarray) -> np.ndarray:
+    """
+    Count set bits of each uint64 (SWAR, no Python loop).
+
+    Args:
+        values: uint64 array
+
+    Returns:
+        Bit counts (uint64 array of the same shape)
+    """
+    v = values.astype(np.uint64, copy=True)
+    # In-place steps: one scratch array instead of a temporary per operator
+    t = v >> np.uint64(1)
+    t &= np.uint64(0x5555555555555555)
+    v -= t
+    np.right_shift(v, np.uint64(2), out=t)
+    t &= np.uint64(0x3333333333333333)
+    v &= np.uint64(0x3333333333333333)
+    v += t
+    np.right_shift(v, np.uint64(4), out=t)
+    v += t
+    v &= np.uint64(0x0F0F0F0F0F0F0F0F)
+    v *= np.uint64(0x0101010101010101)
+    v >>= np.uint64(56)
+    return v
+
+
+def _flip_masks(max_bits: int) -> np.ndarray:
+    """All 16-bit masks with at most max_bits bits set."""
+    masks = [0]
+    for k in range(1, max_bits + 1):
+        for bits in itertools.combinations(range(CHUNK_BITS), k):
+            masks.append(sum(1 << b for b in bits))
+    return np.array(masks, dtype=np.uint32)
+
+
+class PHashIndex:
+    """
+    On-disk index of 64-bit perceptual hashes plus claim metadata.
+
+    Layout (one directory):
+    - meta.sqlite: every hash with its claim id, path and SHA-256 (source of truth)
+    - segment-<n>/: immutable sorted tables for hashes 0..n-1, memory-mapped:
+      hashes.npy (uint64 by id) and, per 16-bit chunk, ids sorted by chunk
+      value (chunk<c>_ids.npy) with CSR bucket offsets (chunk<c>_offsets.npy)
+    - CURRENT: name of the live segment (swapped atomically on compaction)
+    - LOCK: file lock serializing compactions across processes
+
+    Queries use multi-index hashing: if two hashes differ in at most r bits,
+    one of the 4 chunks differs in at most r // 4 bits. Only the buckets of
+    those chunk values are read and verified with a popcount, so lookups touch
+    a tiny fraction of the index. Hashes inserted after the last compaction
+    live in a small in-memory delta that is scanned exhaustively, and are
+    merged into a new segment once compact_threshold of them accumulate.
+    The merge runs on a background thread: the new segment is sorted and
+    written without holding the index lock, then swapped in, so inserts and
+    queries are not stalled by it. Processes sharing the directory compact
+    one at a time, CURRENT only ever moves to a larger segment, and only
+    segments older than the live one are deleted.
+    """
+
+    def __init__(self, path: str, compact_threshold: int = 100000):
+        """
+        Open (or create) the index.
+
+        Args:
+            path: Index directory
+            compact_threshold: Pending inserts merged into the sorted tables at once
+        """
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.compact_threshold = compact_threshold
+        self._lock = threading.RLock()
+        # Serializes compactions (taken before _lock, never while holding it)
+        self._compact_lock = threading.Lock()
+        self._compactor: Optional[threading.Thread] = None
+        # Pending inserts, in buffers that double when full
+        self._delta_count = 0
+        self._delta_id_buffer = np.zeros(0, dtype=np.int64)
+        self._delta_hash_buffer = np.zeros(0, dtype=np.uint64)
+        self._conn = sqlite3.connect(
+            str(self.path / "meta.sqlite"), timeout=30.0, check_same_thread=False
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS phashes (
+                id INTEGER PRIMARY KEY,
+                phash INTEGER NOT NULL,
+                claim_id TEXT,
+                path TEXT,
+                sha256 TEXT,
+                added_at REAL NOT NULL
+            )
+            """)
+        self._conn.commit()
+        self._load_segment()
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._refresh_delta()
+            return self._segment_size + len(self._delta_ids)
+
+    def insert(
+        self,
+        phash: int,
+        claim_id: Optional[str] = None,
+        path: Optional[str] = None,
+        sha256: Optional[str] = None,
+    ) -> int:
+        """
+        Add one hash.
+
+        Args:
+            phash: 64-bit perceptual hash as an unsigned int
+            claim_id: Claim the image belongs to
+            path: Source path
+            sha256: SHA-256 of the image bytes
+
+        Returns:
+            Id of the new entry
+        """
+        with self._lock:
+            # Rowids are assigned max + 1 and never deleted, so entry id = rowid - 1
+            cursor = self._conn.execute(
+                "INSERT INTO phashes (phash, claim_id, path, sha256, added_at) VALUES (?, ?, ?, "
+                "?, ?)",
+                (self._to_signed(phash), claim_id, path, sha256, time.time()),
+            )
+            self._conn.commit()
+            entry_id = cursor.lastrowid - 1
+            self._refresh_delta()
+            if self._delta_count >= self.compact_threshold and self._compactor is None:
+                self._compactor = threading.Thread(
+                    target=self._compact_in_background, name="phash-compaction", daemon=True
+                )
+                self._compactor.start()
+            return entry_id
+
+    def query(self, phash: int, radius: int) -> list[dict]:
+        """
+        Find indexed hashes within a Hamming radius.
+
+        Args:
+            phash: 64-bit perceptual hash as an unsigned int
+            radius: Max Hamming distance (0-64)
+
+        Returns:
+            Matches sorted by distance: dicts with id, distance, claim_id, path and sha256
+        """
+        query = np.uint64(phash)
+        with self._lock:
+            self._refresh_delta()
+            ids, distances = self._query_segment(query, radius)
+            # Recent inserts: exhaustive scan of the small delta
+            delta_distances = popcount64(self._delta_hashes ^ query)
+            near = delta_distances <= radius
+            ids = np.concatenate([ids, self._delta_ids[near]])
+            distances = np.concatenate([distances, delta_distances[near]])
+            if len(ids) == 0:
+                return []
+
+            rowids = [int(i) + 1 for i in ids]
+            rows = []
+            # Bounded IN lists: popular images or large radii can match thousands of entries
+            for start in range(0, len(rowids), MAX_SQL_VARIABLES):
+                chunk = rowids[start : start + MAX_SQL_VARIABLES]
+                rows.extend(
+                    self._conn.execute(
+                        "SELECT id - 1, claim_id, path, sha256 FROM phashes "
+                        f"WHERE id IN ({','.join('?' * len(chunk))})",
+                        chunk,
+                    ).fetchall()
+                )
+
+        meta = {row[0]: row[1:] for row in rows}
+        matches = [
+            {
+                "id": int(i),
+                "distance": int(d),
+                "claim_id": meta[int(i)][0],
+                "path": meta[int(i)][1],
+                "sha256": meta[int(i)][2],
+            }
+            for i, d in zip(ids, distances)
+        ]
+        return sorted(matches, key=lambda m: (m["distance"], m["id"]))
+
+    def compact(self) -> None:
+        """Merge pending inserts into a new immutable sorted segment."""
+        with self._compact_lock, self._file_lock():
+            # Snapshot under the lock, after picking up segments other processes published
+            with self._lock:
+                self._reload_if_changed()
+                self._refresh_delta()
+                if self._delta_count == 0:
+                    return
+                segment_hashes = self._hashes
+                delta_hashes = self._delta_hashes.copy()
+
+            # Sort and write the new tables without blocking inserts and queries
+            hashes = np.concatenate([segment_hashes, delta_hashes]).astype(np.uint64)
+            n = len(hashes)
+            name = f"segment-{n}"
+            staging = self.path / f".{name}.{os.getpid()}.tmp"
+            shutil.rmtree(staging, ignore_errors=True)
+            staging.mkdir()
+
+            np.save(staging / "hashes.npy", hashes)
+            for c in range(CHUNKS):
+                values = ((hashes >> np.uint64(c * CHUNK_BITS)) & np.uint64(0xFFFF)).astype(
+                    np.uint16
+                )
+                order = np.argsort(values, kind="stable").astype(np.uint32)
+                counts = np.bincount(values, minlength=1 << CHUNK_BITS)
+                offsets = np.concatenate(([0], np.cumsum(counts))).astype(np.int64)
+                np.save(staging / f"chunk{c}_ids.npy", order)
+                np.save(staging / f"chunk{c}_offsets.npy", offsets)
+
+            # CURRENT names a smaller segment (checked under the file lock), so a directory
+            # with this name is left over from an interrupted compaction
+            shutil.rmtree(self.path / name, ignore_errors=True)
+            os.replace(staging, self.path / name)
+
+            # Swap in: entries inserted meanwhile stay in the delta
+            with self._lock:
+                if self._segment_size_of(self._read_current()) < n:
+                    pointer = self.path / f".CURRENT.{os.getpid()}.tmp"
+                    pointer.write_text(name)
+                    os.replace(pointer, self.path / "CURRENT")
+                self._load_segment()
+                self._remove_old_segments()
+            logger.info(f"Compacted pHash index: {n} hashes in {name}")
+
+    def close(self) -> None:
+        """Wait for a running compaction, then close the metadata database."""
+        compactor = self._compactor
+        if compactor is not None:
+            compactor.join()
+        with self._lock:
+            self._conn.close()
+
+    def _compact_in_background(self) -> None:
+        try:
+            self.compact()
+        except Exception as e:
+            # Pending inserts stay in the delta; the next threshold crossing retries
+            logger.warning(f"pHash index compaction failed: {type(e).__name__}: {e}")
+        finally:
+            with self._lock:
+                self._compactor = None
+
+    @property
+    def _delta_ids(self) -> np.ndarray:
+        return self._delta_id_buffer[: self._delta_count]
+
+    @property
+    def _delta_hashes(self) -> np.ndarray:
+        return self._delta_hash_buffer[: self._delta_count]
+
+    @contextmanager
+    def _file_lock(self) -> Iterator[None]:
+        """Exclusive lock on the index directory, shared by every process using it."""
+        with open(self.path / "LOCK", "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _read_current(self) -> Optional[str]:
+        current = self.path / "CURRENT"
+        try:
+            return current.read_text().strip() or None
+        except FileNotFoundError:
+            return None
+
+    @staticmethod
+    def _segment_size_of(name: Optional[str]) -> int:
+        return int(name.rsplit("-", 1)[1]) if name else 0
+
+    def _reload_if_changed(self) -> None:
+        """Load the segment another process published since this one was loaded."""
+        if self._read_current() != self._segment_name:
+            self._load_segment()
+
+    def _remove_old_segments(self) -> None:
+        """Delete segments smaller than the live one (held under the file lock)."""
+        live_size = self._segment_size_of(self._segment_name)
+        for segment in self.path.glob("segment-*"):
+            if self._segment_size_of(segment.name) < live_size:
+                # Processes still mapping it keep their pages until they reload
+                shutil.rmtree(segment, ignore_errors=True)
+
+    def _load_segment(self) -> None:
+        """Memory-map the live segment and drop the delta entries it now contains."""
+        while True:
+            self._segment_name = self._read_current()
+            if not self._segment_name:
+                break
+            segment = self.path / self._segment_name
+            try:
+                self._hashes = np.load(segment / "hashes.npy", mmap_mode="r")
+                self._chunk_ids = [
+                    np.load(segment / f"chunk{c}_ids.npy", mmap_mode="r") for c in range(CHUNKS)
+                ]
+                self._chunk_offsets = [
+                    np.load(segment / f"chunk{c}_offsets.npy", mmap_mode="r") for c in range(CHUNKS)
+                ]
+                break
+            except FileNotFoundError:
+                # Replaced by a larger segment between reading CURRENT and loading it
+                if self._read_current() == self._segment_name:
+                    raise
+        if not self._segment_name:
+            self._hashes = np.zeros(0, dtype=np.uint64)
+            self._chunk_ids = []
+            self._chunk_offsets = []
+        self._segment_size = len(self._hashes)
+
+        # Delta ids are ascending: keep the tail not covered by the segment
+        covered = int(np.searchsorted(self._delta_ids, self._segment_size))
+        remaining = self._delta_count - covered
+        self._delta_id_buffer[:remaining] = self._delta_id_buffer[
+            covered : self._delta_count
+        ].copy()
+        self._delta_hash_buffer[:remaining] = self._delta_hash_buffer[
+            covered : self._delta_count
+        ].copy()
+        self._delta_count = remaining
+
+    def _refresh_delta(self) -> None:
+        """Pick up hashes inserted (by any process) since the last refresh."""
+        last_id = int(self._delta_ids[-1]) if self._delta_count else self._segment_size - 1
+        rows = self._conn.execute(
+            "SELECT id - 1, phash FROM phashes WHERE id > ? ORDER BY id", (last_id + 1,)
+        ).fetchall()
+        if not rows:
+            return
+
+        ids, hashes = zip(*rows)
+        end = self._delta_count + len(rows)
+        if end > len(self._delta_id_buffer):
+            # Amortized O(1) appends: double the capacity when full
+            capacity = max(end, 2 * len(self._delta_id_buffer), 1024)
+            self._delta_id_buffer = np.resize(self._delta_id_buffer, capacity)
+            self._delta_hash_buffer = np.resize(self._delta_hash_buffer, capacity)
+        self._delta_id_buffer[self._delta_count : end] = ids
+        self._delta_hash_buffer[self._delta_count : end] = np.array(
+            [self._to_unsigned(h) for h in hashes], dtype=np.uint64
+        )
+        self._delta_count = end
+
+    def _query_segment(self, query: np.uint64, radius: int) -> tuple[np.ndarray, np.ndarray]:
+        """Ids and distances in the sorted segment within radius of query (multi-index hashing)."""
+        if self._segment_size == 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.uint64)
+
+        masks = _flip_masks(min(radius // CHUNKS, CHUNK_BITS))
+        candidates = []
+        for c in range(CHUNKS):
+            value = int((query >> np.uint64(c * CHUNK_BITS)) & np.uint64(0xFFFF))
+            # Buckets of every chunk value within radius // 4 bits, gathered without a loop
+            buckets = np.bitwise_xor(masks, value)
+            starts = self._chunk_offsets[c][buckets]
+            lengths = self._chunk_offsets[c][buckets + 1] - starts
+            total = int(lengths.sum())
+            if total:
+                run_starts = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+                candidates.append(self._chunk_ids[c][run_starts + np.arange(total)])
+        if not candidates:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.uint64)
+
+        ids = np.unique(np.concatenate(candidates)).astype(np.int64)
+        distances = popcount64(self._hashes[ids] ^ query)
+        near = distances <= radius
+        return ids[near], distances[near]
+
+    @staticmethod
+    def _to_signed(value: int) -> int:
+        # SQLite integers are signed 64-bit
+        return value - (1 << 64) if value >= (1 << 63) else value
+
+    @staticmethod
+    def _to_unsigned(value: int) -> int:
+        return value + (1 << 64) if value < 0 else value
@@ -1,8 +1,14 @@
 """Report generation service for forgery detection results."""
 
 from datetime import datetime
-from PIL import Image
-import io
+from typing import Optional
+from forgery_detection.config_loader import get_config
+from forgery_detection.services.image_context import ImageContext
+from forgery_detection.services.metadata_extractor import (
+    DEFAULT_EDITING_SOFTWARE,
+    TAG_SOFTWARE,
+    match_editing_software,
+)
 
 
 class ReportGenerator:
@@ -10,37 +16,30 @@ class ReportGenerator:
 
     def __init__(self):
         """Initialize report generator."""
-        self.editing_software = [
-            "photoshop",
-            "gimp",
-            "paint.net",
-            "affinity",
-            "pixelmator",
-            "acorn",
-            "lightroom",
-            "capture one",
-            "darktable",
-            "rawtherapee",
-            "paint shop",
-        ]
+        # Same list as the metadata detector, so report flags agree with its scores
+        self.editing_software = get_config().get_list(
+            "metadata_detector.editing_software", DEFAULT_EDITING_SOFTWARE
+        )
 
     def generate_evaluation_report(
         self,
-        results_by_mode: dict[str, list[tuple[str, str, str]]],
+        metrics: dict,
         modes: list[str],
         thresholds: dict[str, float],
         weights: dict[str, float],
         image_details: list[dict],
+        duplicate_clusters: Optional[list[dict]] = None,
     ) -> str:
         """
         Generate evaluation mode report.
 
         Args:
-            results_by_mode: Classification results by mode
+            metrics: Evaluation metrics from MetricsEngine.compute()
             modes: List of mode names
             thresholds: Threshold values by mode
             weights: Detector weights used
             image_details: Detailed scores for each image
+            duplicate_clusters: Near-duplicate clusters from DuplicateClusterer.find_clusters()
 
         Returns:
             Markdown report string
@@ -48,7 +47,7 @@ class ReportGenerator:
         report = []
         report.append("# Forgery Detection - Evaluation Report")
         report.append(f"\n**Generated:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-        report.append(f"\n**Mode:** Evaluation (Ground Truth Labels Available)")
+        report.append("\n**Mode:** Evaluation (Ground Truth Labels Available)")
         report.append(f"\n**Total Images:** {len(image_details)}")
         report.append("\n---\n")
 
@@ -64,11 +63,13 @@ class ReportGenerator:
         report.append("| Mode | Threshold | Description |")
         report.append("|------|-----------|-------------|")
         report.append(
-            f"| Strict | {thresholds['strict']:.2f} | High confidence required (fewer false positives) |"
+            f"| Strict | {thresholds['strict']:.2f} | High confidence required (fewer false "
+            "positives) |"
         )
         report.append(f"| Balanced | {thresholds['balanced']:.2f} | Balanced approach (default) |")
         report.append(
-            f"| Aggressive | {thresholds['aggressive']:.2f} | Flag more images (catches more forgeries) |"
+            f"| Aggressive | {thresholds['aggressive']:.2f} | Flag more images (catches more "
+            "forgeries) |"
         )
 
         report.append("\n---\n")
@@ -76,40 +77,55 @@ class ReportGenerator:
         # Performance metrics
         report.append("## Performance Metrics\n")
         for mode in modes:
-            results = results_by_mode[mode]
-            tp = sum(1 for _, pred, truth in results if pred == "forged" and truth == "forged")
-            fp = sum(1 for _, pred, truth in results if pred == "forged" and truth == "authentic")
-            fn = sum(1 for _, pred, truth in results if pred == "authentic" and truth == "forged")
-            tn = sum(
-                1 for _, pred, truth in results if pred == "authentic" and truth == "authentic"
-            )
+            m = metrics["modes"][mode]
 
-            total = len(results)
-            precision = tp / (tp + fp) if (tp + fp) > 0 else 0.0
-            recall = tp / (tp + fn) if (tp + fn) > 0 else 0.0
-            accuracy = (tp + tn) / total if total > 0 else 0.0
-
-            report.append(f"### {mode.upper()} Mode (threshold={thresholds[mode]:.2f})\n")
+            report.append(f"### {mode.upper()} Mode (threshold={m['threshold']:.2f})\n")
             report.append("| Metric | Value | Description |")
             report.append("|--------|-------|-------------|")
-            report.append(f"| Total | {total} | Total images evaluated |")
-            report.append(f"| True Positives (TP) | {tp} | Forged images correctly detected |")
-            report.append(f"| False Positives (FP) | {fp} | Authentic images incorrectly flagged |")
-            report.append(f"| False Negatives (FN) | {fn} | Forged images missed |")
-            report.append(f"| True Negatives (TN) | {tn} | Authentic images correctly cleared |")
+            report.append(f"| Total | {m['total']} | Total images evaluated |")
+            report.append(f"| True Positives (TP) | {m['tp']} | Forged images correctly detected |")
+            report.append(
+                f"| False Positives (FP) | {m['fp']} | Authentic images incorrectly flagged |"
+            )
+            report.append(f"| False Negatives (FN) | {m['fn']} | Forged images missed |")
+            report.append(
+                f"| True Negatives (TN) | {m['tn']} | Authentic images correctly cleared |"
+            )
             report.append(
-                f"| **Precision** | **{precision:.1%}** | Accuracy of forgery detections |"
+                f"| **Precision** | **{m['precision']:.1%}** | Accuracy of forgery detections |"
             )
-            report.append(f"| **Recall** | **{recall:.1%}** | Percentage of forgeries caught |")
-            report.append(f"| **Accuracy** | **{accuracy:.1%}** | Overall correctness |")
+            report.append(
+                f"| **Recall** | **{m['recall']:.1%}** | Percentage of forgeries caught |"
+            )
+            report.append(f"| **Accuracy** | **{m['accuracy']:.1%}** | Overall correctness |")
             report.append("")
 
+        # Threshold-independent ranking quality
+        report.append("### Score Ranking (all thresholds)\n")
+        report.append("| Metric | Value | Description |")
+        report.append("|--------|-------|-------------|")
+        report.append(
+            f"| **ROC AUC** | **{self._format_auc(metrics['roc']['auc'])}** | "
+            "Chance a forged image scores above an authentic one |"
+        )
+        report.append(
+            f"| **Average Precision** | **{self._format_auc(metrics['pr']['auc'])}** | "
+            "Area under the precision-recall curve |"
+        )
+        report.append("")
+
         # Individual image analysis - Compact table format
         report.append("## Individual Image Analysis\n")
 
         # Build table header dynamically based on modes
-        header = "| Filename | Ground Truth | Score | Format | Metadata | ELA | Stat | Copy-Move | Noise |"
-        separator = "|----------|--------------|-------|--------|----------|-----|------|-----------|-------|"
+        header = (
+            "| Filename | Ground Truth | Score | Format "
+            "| Metadata | ELA | Stat | Copy-Move | Noise |"
+        )
+        separator = (
+            "|----------|--------------|-------|--------"
+            "|----------|-----|------|-----------|-------|"
+        )
         for mode in modes:
             header += f" {mode.title()} |"
             separator += "---------|"
@@ -167,10 +183,32 @@ class ReportGenerator:
         report.append("- 🔴✓ = Correctly classified as forged")
         report.append("- ✗ = Misclassified")
         report.append(
-            "- **Flags:** SW=Editing software detected, NO-EXIF=All metadata stripped, STRIPPED=Missing critical camera tags"
+            "- **Flags:** SW=Editing software detected, NO-EXIF=All metadata stripped, "
+            "STRIPPED=Missing critical camera tags"
         )
         report.append("\n---\n")
 
+        # Near-duplicate clusters
+        if duplicate_clusters:
+            report.append("## Duplicate Clusters\n")
+            report.append(
+                f"{len(duplicate_clusters)} group(s) of images with near-identical "
+                "perceptual hashes (same photo recompressed, resized or slightly cropped).\n"
+            )
+            for n, cluster in enumerate(duplicate_clusters, start=1):
+                report.append(
+                    f"### Cluster {n} ({cluster['size']} images, max distance "
+                    f"{cluster['max_distance']})\n"
+                )
+                report.append("| Filename | Ground Truth | Score | pHash |")
+                report.append("|----------|--------------|-------|-------|")
+                for member in cluster["members"]:
+                    report.append(
+                        f"| {member['filename']} | {member['ground_truth'][:4].upper()} "
+                        f"| {member['final_score']:.3f} | `{member['phash']}` |"
+                    )
+                report.append("")
+
         # Recommendations
         report.append("---\n")
         report.append("## Recommendations\n")
@@ -181,46 +219,62 @@ class ReportGenerator:
         )
         if high_metadata_count > 0:
             report.append(
-                f"- **Metadata signals detected** in {high_metadata_count} image(s). Consider increasing metadata weight for better detection.\n"
+                f"- **Metadata signals detected** in {high_metadata_count} image(s). Consider "
+                "increasing metadata weight for better detection.\n"
+            )
+
+        # Check reused photos
+        if duplicate_clusters:
+            report.append(
+                f"- **{len(duplicate_clusters)} near-duplicate cluster(s) found.** Review whether "
+                "the same photo was submitted more than once.\n"
             )
 
         # Check recall issues
         for mode in modes:
-            results = results_by_mode[mode]
-            fn = sum(1 for _, pred, truth in results if pred == "authentic" and truth == "forged")
+            fn = metrics["modes"][mode]["fn"]
             if fn > 0:
                 report.append(
-                    f"- **{mode.title()} mode missed {fn} forgery(ies).** Consider lowering threshold or tuning weights.\n"
+                    f"- **{mode.title()} mode missed {fn} forgery(ies).** Consider lowering "
+                    "threshold or tuning weights.\n"
                 )
 
         return "\n".join(report)
 
-    def analyze_exif(self, image_bytes: bytes) -> dict:
+    def _format_auc(self, value: Optional[float]) -> str:
+        # AUC is undefined when only one class is present
+        return f"{value:.3f}" if value is not None else "n/a"
+
+    def analyze_exif(
+        self, image_bytes: bytes, image_context: Optional[ImageContext] = None
+    ) -> dict:
         """
         Analyze EXIF metadata from image.
 
         Args:
             image_bytes: Raw image data
+            image_context: Optional shared decode context for image_bytes
 
         Returns:
             Dictionary with EXIF analysis results
         """
         try:
-            img = Image.open(io.BytesIO(image_bytes))
-            exif_data = img.getexif()
+            if image_context is None:
+                image_context = ImageContext(image_bytes)
+            # Shares the header-only parse with the metadata detector
+            exif_data = image_context.metadata["tags"]
 
-            result = {"tags_count": len(exif_data) if exif_data else 0}
+            result = {"tags_count": len(exif_data)}
 
-            if not exif_data or len(exif_data) == 0:
+            if not exif_data:
                 return result
 
             # Check for software tag
-            software_tag = exif_data.get(305)
+            software_tag = exif_data.get(TAG_SOFTWARE)
             if software_tag:
                 result["software"] = software_tag
-                software_lower = software_tag.lower()
-                result["is_editing_software"] = any(
-                    sw in software_lower for sw in self.editing_software
+                result["is_editing_software"] = (
+                    match_editing_software(software_tag, self.editing_software) is not None
                 )
 
             # Check for missing critical tags
@@ -0,0 +1,165 @@
+"""Persistent, content-addressed cache of raw detector scores."""
+
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Optional
+
+from forgery_detection.config_loader import get_config
+
+logger = logging.getLogger(__name__)
+
+
+def config_fingerprint(section: str) -> str:
+    """
+    Fingerprint a config section (e.g. "ela_detector").
+
+    Args:
+        section: Top-level config key holding a detector's parameters
+
+    Returns:
+        Hex digest that changes whenever any value in the section changes
+    """
+    values = get_config().get_dict(section)
+    payload = json.dumps(values, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+class ScoreCache:
+    """
+    SQLite cache of detector scores keyed by image content and detector config.
+
+    Key: (SHA-256 of image bytes, detector name, fingerprint of the detector's
+    config section). Tweaking one detector's config changes only its
+    fingerprint, so a re-run recomputes that detector and reuses the rest.
+
+    Perceptual hashes of the records are cached the same way, keyed by image
+    and the reverse-search config fingerprint, so a fully warm cache needs
+    no decode at all.
+    """
+
+    def __init__(self, path: str):
+        """
+        Open (or create) the cache database.
+
+        Args:
+            path: SQLite database file
+        """
+        self.path = path
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        # Shared across threads behind _lock; WAL lets worker processes read concurrently
+        self._conn = sqlite3.connect(path, timeout=30.0, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS detector_scores (
+                image_sha256 TEXT NOT NULL,
+                detector TEXT NOT NULL,
+                config_fingerprint TEXT NOT NULL,
+                score REAL NOT NULL,
+                PRIMARY KEY (image_sha256, detector, config_fingerprint)
+            ) WITHOUT ROWID
+            """)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS phashes (
+                image_sha256 TEXT NOT NULL,
+                config_fingerprint TEXT NOT NULL,
+                phash TEXT NOT NULL,
+                PRIMARY KEY (image_sha256, config_fingerprint)
+            ) WITHOUT ROWID
+            """)
+        self._conn.commit()
+
+    def get_scores(self, image_sha256: str, fingerprints: dict[str, str]) -> dict[str, float]:
+        """
+        Look up cached scores for one image.
+
+        Args:
+            image_sha256: SHA-256 hex digest of the image bytes
+            fingerprints: {detector_name: config_fingerprint} to look up
+
+        Returns:
+            {detector_name: score} for detectors with a matching entry
+        """
+        if not fingerprints:
+            return {}
+
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT detector, config_fingerprint, score FROM detector_scores "
+                "WHERE image_sha256 = ?",
+                (image_sha256,),
+            ).fetchall()
+
+        return {
+            detector: score
+            for detector, fingerprint, score in rows
+            if fingerprints.get(detector) == fingerprint
+        }
+
+    def put_scores(
+        self, image_sha256: str, scores: dict[str, float], fingerprints: dict[str, str]
+    ) -> None:
+        """
+        Store scores for one image.
+
+        Args:
+            image_sha256: SHA-256 hex digest of the image bytes
+            scores: {detector_name: score}
+            fingerprints: {detector_name: config_fingerprint}
+        """
+        if not scores:
+            return
+
+        rows = [
+            (image_sha256, detector, fingerprints[detector], float(score))
+            for detector, score in scores.items()
+        ]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO detector_scores VALUES (?, ?, ?, ?)", rows
+            )
+            self._conn.commit()
+
+    def get_phash(self, image_sha256: str, fingerprint: str) -> Optional[str]:
+        """
+        Look up the cached perceptual hash of one image.
+
+        Args:
+            image_sha256: SHA-256 hex digest of the image bytes
+            fingerprint: Config fingerprint of the hashing detector
+
+        Returns:
+            The hex pHash, or None if not cached
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT phash FROM phashes WHERE image_sha256 = ? AND config_fingerprint = ?",
+                (image_sha256, fingerprint),
+            ).fetchone()
+        return row[0] if row else None
+
+    def put_phash(self, image_sha256: str, phash: str, fingerprint: str) -> None:
+        """
+        Store the perceptual hash of one image.
+
+        Args:
+            image_sha256: SHA-256 hex digest of the image bytes
+            phash: Hex pHash
+            fingerprint: Config fingerprint of the hashing detector
+        """
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO phashes VALUES (?, ?, ?)",
+                (image_sha256, fingerprint, phash),
+            )
+            self._conn.commit()
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,52 @@
+"""Persistence of per-image detector scores for replay and tuning."""
+
+import json
+import logging
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+
+class ScoreStore:
+    """
+    Reads and writes per-image detector score records as JSON Lines.
+
+    Each line holds one image: filename, ground_truth, format, detector_scores,
+    exif_analysis and phash. That is everything needed to re-run aggregation,
+    classification, metrics and the report without decoding any image.
+    """
+
+    FIELDS = ("filename", "ground_truth", "format", "detector_scores", "exif_analysis", "phash")
+
+    def write(self, path: str, image_details: list[dict]) -> None:
+        """
+        Write score records.
+
+        Args:
+            path: Output JSONL file
+            image_details: Per-image detail dicts built during evaluation
+        """
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w") as f:
+            for detail in image_details:
+                record = {field: detail.get(field) for field in self.FIELDS}
+                f.write(json.dumps(record, default=str) + "\n")
+        logger.info(f"Saved detector scores for {len(image_details)} images to: {path}")
+
+    def read(self, path: str) -> list[dict]:
+        """
+        Read score records.
+
+        Args:
+            path: JSONL file written by write()
+
+        Returns:
+            List of records in file order
+        """
+        records = []
+        with open(path, "r") as f:
+            for line in f:
+                if line.strip():
+                    records.append(json.loads(line))
+        logger.info(f"Loaded detector scores for {len(records)} images from: {path}")
+        return records
@@ -0,0 +1,317 @@
+"""Vectorized search over aggregation weights and classification thresholds."""
+
+import logging
+import time
+from typing import Optional
+
+import numpy as np
+
+from forgery_detection.config_loader import get_config
+
+logger = logging.getLogger(__name__)
+
+
+class WeightTuner:
+    """
+    Tunes score_aggregator weights and per-mode thresholds from stored detector scores.
+
+    Algorithm:
+    1. Load the images x detectors score matrix S and an inclusion mask M that
+       mirrors ScoreAggregator (ELA only for JPEG, reverse search only on a match)
+    2. Sample thousands of weight vectors from the simplex (Dirichlet)
+    3. Score every image under every weight vector with one matrix multiply:
+       F = (S * M) @ W.T / (M @ W.T)
+    4. Bucket F against a threshold grid with searchsorted and count TP/FP for
+       every (weight vector, threshold) pair with cumulative sums
+    5. Per mode, keep thresholds meeting the precision/recall targets and pick the
+       single weight vector that maximizes the modes' objectives
+
+    Weights are shared by all modes; only thresholds are per mode, as in config.yml.
+    """
+
+    OBJECTIVES = ("precision", "recall", "f1", "accuracy")
+
+    def __init__(self, n_samples: Optional[int] = None, seed: Optional[int] = None):
+        """
+        Initialize with config parameters.
+
+        Args:
+            n_samples: Number of random weight vectors (optional, uses config if None)
+            seed: Random seed (optional, uses config if None)
+        """
+        config = get_config()
+        self.n_samples = (
+            n_samples if n_samples is not None else config.get_int("weight_tuner.n_samples", 20000)
+        )
+        self.seed = seed if seed is not None else config.get_int("weight_tuner.seed", 42)
+        self.threshold_step = config.get_float("weight_tuner.threshold_step", 0.01)
+        self.batch_size = config.get_int("weight_tuner.batch_size", 2000)
+        self.pareto_size = config.get_int("weight_tuner.pareto_size", 10)
+        self.targets = config.get_dict(
+            "weight_tuner.targets",
+            {
+                "strict": {"min_precision": 0.95, "objective": "recall"},
+                "balanced": {"min_recall": 0.8, "max_fpr": 0.2, "objective": "f1"},
+                "aggressive": {"min_recall": 0.95, "objective": "precision"},
+            },
+        )
+        for mode, target in self.targets.items():
+            if target.get("objective", "f1") not in self.OBJECTIVES:
+                raise ValueError(
+                    f"Unknown objective for mode '{mode}': {target.get('objective')}. "
+                    f"Expected one of {self.OBJECTIVES}"
+                )
+
+    def build_matrix(
+        self, records: list[dict], detectors: list[str]
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Build score matrix, inclusion mask and labels from stored records.
+
+        Args:
+            records: Score records (see ScoreStore)
+            detectors: Detector names, defining the column order
+
+        Returns:
+            Tuple (scores n x d float64, mask n x d float64, labels n bool, True=forged)
+        """
+        n, d = len(records), len(detectors)
+        scores = np.zeros((n, d), dtype=np.float64)
+        mask = np.zeros((n, d), dtype=np.float64)
+        for i, record in enumerate(records):
+            detector_scores = record["detector_scores"]
+            for j, name in enumerate(detectors):
+                if name in detector_scores:
+                    scores[i, j] = detector_scores[name]
+                    mask[i, j] = 1.0
+            is_jpeg = record["format"] == "jpeg"
+            if "ela" in detectors and not is_jpeg:
+                mask[i, detectors.index("ela")] = 0.0
+
+        # Same exclusion rule as ScoreAggregator: reverse search counts only on a match
+        if "reverse_search" in detectors:
+            j = detectors.index("reverse_search")
+            mask[scores[:, j] == 0.0, j] = 0.0
+
+        labels = np.array([r["ground_truth"] == "forged" for r in records], dtype=bool)
+        return scores, mask, labels
+
+    def final_scores(self, scores: np.ndarray, mask: np.ndarray, weights: np.ndarray) -> np.ndarray:
+        """
+        Aggregate scores for many weight vectors at once.
+
+        Args:
+            scores: Score matrix (n x d)
+            mask: Inclusion mask (n x d)
+            weights: Weight vectors (k x d)
+
+        Returns:
+            Final scores (n x k), clipped to [0, 1]
+        """
+        weighted_sum = (scores * mask) @ weights.T
+        total_weight = mask @ weights.T
+        with np.errstate(divide="ignore", invalid="ignore"):
+            final = np.where(total_weight > 0.0, weighted_sum / total_weight, 0.0)
+        return np.clip(final, 0.0, 1.0)
+
+    def confusion_counts(
+        self, final: np.ndarray, labels: np.ndarray, thresholds: np.ndarray
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Count true and false positives for every (weight vector, threshold) pair.
+
+        An image is flagged at threshold t when final >= t, as in Classifier.
+
+        Args:
+            final: Final scores (n x k)
+            labels: Ground truth (n, True=forged)
+            thresholds: Sorted threshold grid (t,)
+
+        Returns:
+            Tuple (tp k x t, fp k x t)
+        """
+        k = final.shape[1]
+        n_bins = len(thresholds) + 1
+        # Number of thresholds <= score: image is flagged at threshold j iff j < bucket
+        buckets = np.searchsorted(thresholds, final, side="right")
+        offsets = np.arange(k) * n_bins
+
+        def flagged_counts(rows: np.ndarray) -> np.ndarray:
+            flat = (buckets[rows] + offsets).ravel()
+            hist = np.bincount(flat, minlength=k * n_bins).reshape(k, n_bins)
+            # Flagged at threshold j = images with bucket > j (reverse cumulative sum)
+            return np.cumsum(hist[:, ::-1], axis=1)[:, ::-1][:, 1:]
+
+        return flagged_counts(labels), flagged_counts(~labels)
+
+    def tune(self, records: list[dict], current_weights: dict[str, float]) -> dict:
+        """
+        Search weights and thresholds.
+
+        Args:
+            records: Score records (see ScoreStore)
+            current_weights: Current score_aggregator weights (also define detector order)
+
+        Returns:
+            Dict with weights, thresholds, per-mode metrics, Pareto front and timing
+        """
+        start = time.perf_counter()
+        detectors = list(current_weights.keys())
+        scores, mask, labels = self.build_matrix(records, detectors)
+        positives = int(labels.sum())
+        negatives = int((~labels).sum())
+        if positives == 0 or negatives == 0:
+            raise ValueError("Tuning needs both forged and authentic images")
+
+        # Candidate weights: current config first, then uniform samples of the simplex
+        rng = np.random.default_rng(self.seed)
+        current = np.array([current_weights[name] for name in detectors], dtype=np.float64)
+        samples = rng.dirichlet(np.ones(len(detectors)), size=self.n_samples)
+        weights = np.vstack([current / current.sum(), samples])
+        thresholds = np.round(np.arange(self.threshold_step, 1.0, self.threshold_step), 6)
+
+        modes = list(self.targets.keys())
+        best_value = {m: np.empty(len(weights)) for m in modes}
+        best_threshold_idx = {m: np.empty(len(weights), dtype=np.int64) for m in modes}
+        # Pareto bookkeeping: fewest false positives per true-positive count
+        pareto_fp = np.full(positives + 1, np.iinfo(np.int64).max, dtype=np.int64)
+        pareto_at = np.zeros((positives + 1, 2), dtype=np.int64)
+
+        for begin in range(0, len(weights), self.batch_size):
+            batch = weights[begin : begin + self.batch_size]
+            final = self.final_scores(scores, mask, batch)
+            tp, fp = self.confusion_counts(final, labels, thresholds)
+            metrics = self._metrics(tp, fp, positives, negatives)
+
+            for m in modes:
+                value = self._objective(metrics, self.targets[m])
+                # Among thresholds tied on the objective, prefer the best F1
+                is_best = value == value.max(axis=1, keepdims=True)
+                idx = np.argmax(np.where(is_best & np.isfinite(value), metrics["f1"], -1.0), axis=1)
+                best_threshold_idx[m][begin : begin + len(batch)] = idx
+                best_value[m][begin : begin + len(batch)] = value[np.arange(len(batch)), idx]
+
+            self._update_pareto(tp, fp, begin, pareto_fp, pareto_at)
+
+        # One weight vector for all modes: most feasible modes, then best summed objective
+        values = np.stack([best_value[m] for m in modes], axis=1)
+        feasible = np.isfinite(values)
+        total = np.where(feasible, values, 0.0).sum(axis=1)
+        best = int(np.lexsort((-total, -feasible.sum(axis=1)))[0])
+
+        result_thresholds = {}
+        result_metrics = {}
+        final = self.final_scores(scores, mask, weights[best : best + 1])
+        tp, fp = self.confusion_counts(final, labels, thresholds)
+        metrics = self._metrics(tp, fp, positives, negatives)
+        for m in modes:
+            j = int(best_threshold_idx[m][best])
+            result_thresholds[m] = float(thresholds[j])
+            result_metrics[m] = {
+                "feasible": bool(feasible[best, modes.index(m)]),
+                **{name: float(values_[0, j]) for name, values_ in metrics.items()},
+            }
+
+        pareto = self._pareto_front(pareto_fp, pareto_at, positives, weights, thresholds, detectors)
+        elapsed = time.perf_counter() - start
+        logger.info(
+            f"Evaluated {len(weights)} weight vectors x {len(thresholds)} thresholds "
+            f"on {len(records)} images in {elapsed:.2f}s"
+        )
+
+        return {
+            "weights": {name: float(w) for name, w in zip(detectors, weights[best])},
+            "thresholds": result_thresholds,
+            "metrics": result_metrics,
+            "pareto": pareto,
+            "evaluated": len(weights) * len(thresholds),
+            "elapsed": elapsed,
+        }
+
+    def _metrics(
+        self, tp: np.ndarray, fp: np.ndarray, positives: int, negatives: int
+    ) -> dict[str, np.ndarray]:
+        flagged = tp + fp
+        with np.errstate(divide="ignore", invalid="ignore"):
+            precision = np.where(flagged > 0, tp / flagged, 0.0)
+        recall = tp / positives
+        fpr = fp / negatives
+        with np.errstate(divide="ignore", invalid="ignore"):
+            f1 = np.where(
+                precision + recall > 0, 2 * precision * recall / (precision + recall), 0.0
+            )
+        accuracy = (tp + (negatives - fp)) / (positives + negatives)
+        return {
+            "precision": precision,
+            "recall": recall,
+            "fpr": fpr,
+            "f1": f1,
+            "accuracy": accuracy,
+        }
+
+    def _objective(self, metrics: dict[str, np.ndarray], target: dict) -> np.ndarray:
+        # Objective value where all targets are met, -inf elsewhere
+        feasible = np.ones_like(metrics["precision"], dtype=bool)
+        if "min_precision" in target:
+            feasible &= metrics["precision"] >= float(target["min_precision"])
+        if "min_recall" in target:
+            feasible &= metrics["recall"] >= float(target["min_recall"])
+        if "max_fpr" in target:
+            feasible &= metrics["fpr"] <= float(target["max_fpr"])
+        return np.where(feasible, metrics[target.get("objective", "f1")], -np.inf)
+
+    def _update_pareto(
+        self,
+        tp: np.ndarray,
+        fp: np.ndarray,
+        offset: int,
+        pareto_fp: np.ndarray,
+        pareto_at: np.ndarray,
+    ) -> None:
+        # Keep, for every TP count, the (weights, threshold) with the fewest FP
+        flat_tp = tp.ravel()
+        flat_fp = fp.ravel()
+        order = np.lexsort((flat_fp, flat_tp))
+        first = np.ones(len(order), dtype=bool)
+        first[1:] = flat_tp[order][1:] != flat_tp[order][:-1]
+        candidates = order[first]
+        tp_values = flat_tp[candidates]
+        better = flat_fp[candidates] < pareto_fp[tp_values]
+        tp_values, candidates = tp_values[better], candidates[better]
+        pareto_fp[tp_values] = flat_fp[candidates]
+        rows, cols = np.unravel_index(candidates, tp.shape)
+        pareto_at[tp_values, 0] = rows + offset
+        pareto_at[tp_values, 1] = cols
+
+    def _pareto_front(
+        self,
+        pareto_fp: np.ndarray,
+        pareto_at: np.ndarray,
+        positives: int,
+        weights: np.ndarray,
+        thresholds: np.ndarray,
+        detectors: list[str],
+    ) -> list[dict]:
+        # Non-dominated points: recall increases, false positives strictly increase too
+        front = []
+        best_fp = np.iinfo(np.int64).max
+        for tp in range(positives, 0, -1):
+            fp = pareto_fp[tp]
+            if fp < best_fp:
+                best_fp = fp
+                w, t = pareto_at[tp]
+                front.append(
+                    {
+                        "precision": tp / (tp + fp),
+                        "recall": tp / positives,
+                        "threshold": float(thresholds[t]),
+                        "weights": {name: float(v) for name, v in zip(detectors, weights[w])},
+                    }
+                )
+        front.reverse()
+
+        # Thin out long fronts evenly for display
+        if len(front) > self.pareto_size:
+            keep = np.unique(np.linspace(0, len(front) - 1, self.pareto_size).round().astype(int))
+            front = [front[i] for i in keep]
+        return front
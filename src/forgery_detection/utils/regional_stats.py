@@ -0,0 +1,148 @@
+"""Regional mean/std statistics from integral images (summed-area tables)."""
+
+from typing import Optional
+
+import cv2
+import numpy as np
+
+
+def grid_edges(length: int, cells: int) -> np.ndarray:
+    """
+    Cell boundaries splitting length pixels into cells nearly equal parts.
+
+    Remainder pixels are spread over the cells (sizes differ by at most one),
+    so every row and column belongs to exactly one cell.
+
+    Args:
+        length: Number of pixels along the axis
+        cells: Number of cells
+
+    Returns:
+        cells + 1 increasing boundaries from 0 to length
+    """
+    return np.linspace(0, length, cells + 1).astype(np.int64)
+
+
+class RegionalStats:
+    """
+    Mean and standard deviation of any rectangle of an image in O(1).
+
+    One pass (cv2.integral2) builds integral images of the values and of the
+    squared values. Any rectangle's sum is then four lookups, so grids of any
+    size and sliding windows are answered from the same precomputation,
+    vectorized over all regions at once. Channels are pooled: statistics
+    cover every value of every channel in the region.
+    """
+
+    def __init__(self, values: np.ndarray, squares: bool = True):
+        """
+        Build the integral images.
+
+        Args:
+            values: Image (H x W) or multi-channel image (H x W x C, C <= 4)
+            squares: Also integrate squared values (needed for std)
+        """
+        if values.ndim not in (2, 3):
+            raise ValueError(f"Expected an H x W or H x W x C array, got shape {values.shape}")
+        self.height, self.width = values.shape[:2]
+        self.channels = values.shape[2] if values.ndim == 3 else 1
+
+        if values.dtype not in (np.uint8, np.float32, np.float64):
+            values = values.astype(np.float64)
+        if values.ndim == 3 and not squares:
+            # Sums only: pool channels first so one table is kept instead of C
+            values = self._pool_channels(values)
+
+        # float64 tables: exact for integer images, no cancellation drift for floats
+        self._sqsum: Optional[np.ndarray] = None
+        if squares:
+            self._sum, self._sqsum = cv2.integral2(values, sdepth=cv2.CV_64F, sqdepth=cv2.CV_64F)
+        else:
+            self._sum = cv2.integral(values, sdepth=cv2.CV_64F)
+
+    @staticmethod
+    def _pool_channels(values: np.ndarray) -> np.ndarray:
+        # Per-pixel channel sums (uint8 sums are exact in uint16); channel-wise
+        # in-place adds are several times faster than a reduction over the last axis
+        pooled = values[..., 0].astype(np.uint16 if values.dtype == np.uint8 else np.float64)
+        for channel in range(1, values.shape[2]):
+            pooled += values[..., channel]
+        return pooled
+
+    @staticmethod
+    def _rect_sums(table: np.ndarray, y0, x0, y1, x1) -> np.ndarray:
+        sums = table[y1, x1] - table[y0, x1] - table[y1, x0] + table[y0, x0]
+        # Per-channel tables: pool the channels of each rectangle
+        return sums.sum(axis=-1) if table.ndim == 3 else sums
+
+    def counts(self, y0, x0, y1, x1) -> np.ndarray:
+        """Number of values in rectangles [y0, y1) x [x0, x1) (broadcast arrays)."""
+        return (np.asarray(y1) - y0) * (np.asarray(x1) - x0) * self.channels
+
+    def means(self, y0, x0, y1, x1) -> np.ndarray:
+        """
+        Mean of rectangles [y0, y1) x [x0, x1).
+
+        Args:
+            y0, x0, y1, x1: Corner coordinates (ints or broadcastable int arrays)
+
+        Returns:
+            Means (float64, broadcast shape); NaN for empty rectangles
+        """
+        counts = self.counts(y0, x0, y1, x1)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return self._rect_sums(self._sum, y0, x0, y1, x1) / counts
+
+    def stds(self, y0, x0, y1, x1) -> np.ndarray:
+        """
+        Population standard deviation of rectangles [y0, y1) x [x0, x1).
+
+        Args:
+            y0, x0, y1, x1: Corner coordinates (ints or broadcastable int arrays)
+
+        Returns:
+            Standard deviations (float64, broadcast shape); NaN for empty rectangles
+        """
+        if self._sqsum is None:
+            raise ValueError("RegionalStats was built without squares")
+        counts = self.counts(y0, x0, y1, x1)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = self._rect_sums(self._sum, y0, x0, y1, x1) / counts
+            mean_square = self._rect_sums(self._sqsum, y0, x0, y1, x1) / counts
+        # E[x²] - E[x]², clipped against rounding below zero
+        return np.sqrt(np.maximum(mean_square - mean * mean, 0.0))
+
+    def grid(self, rows: int, cols: Optional[int] = None) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Statistics of a rows x cols grid covering the whole image.
+
+        Args:
+            rows: Grid rows
+            cols: Grid columns (default: rows)
+
+        Returns:
+            Tuple (means, stds) of rows x cols arrays; stds is None without squares
+        """
+        y_edges = grid_edges(self.height, rows)
+        x_edges = grid_edges(self.width, cols if cols is not None else rows)
+        y0, y1 = y_edges[:-1, None], y_edges[1:, None]
+        x0, x1 = x_edges[None, :-1], x_edges[None, 1:]
+        stds = self.stds(y0, x0, y1, x1) if self._sqsum is not None else None
+        return self.means(y0, x0, y1, x1), stds
+
+    def windows(self, size: int, step: int = 1) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Statistics of every size x size window at the given step.
+
+        Args:
+            size: Window side in pixels
+            step: Distance between window origins
+
+        Returns:
+            Tuple (means, stds) indexed by window row and column; stds is None
+            without squares
+        """
+        y0 = np.arange(0, self.height - size + 1, step)[:, None]
+        x0 = np.arange(0, self.width - size + 1, step)[None, :]
+        stds = self.stds(y0, x0, y0 + size, x0 + size) if self._sqsum is not None else None
+        return self.means(y0, x0, y0 + size, x0 + size), stds
@@ -0,0 +1,67 @@
+"""Tests for BlockMatcher service."""
+
+import numpy as np
+from forgery_detection.services.block_matcher import BlockMatcher, dct_basis
+
+
+class TestBlockMatcher:
+    """Test cases for BlockMatcher."""
+
+    def setup_method(self):
+        """Setup test fixtures."""
+        self.matcher = BlockMatcher()
+
+    def _create_panel(self, height=300, width=400, seed=0):
+        """Helper: smooth gradient with faint sensor-like noise (a painted panel)."""
+        rng = np.random.default_rng(seed)
+        base = np.linspace(100, 140, width)[None, :] + np.linspace(0, 20, height)[:, None]
+        return np.clip(base + rng.normal(0, 1.5, (height, width)), 0, 255).astype(np.uint8)
+
+    def test_dct_basis_is_orthonormal(self):
+        """Test the basis rows are orthonormal."""
+        basis = dct_basis(16, 16).astype(np.float64)
+        np.testing.assert_allclose(basis @ basis.T, np.eye(16), atol=1e-5)
+
+    def test_clean_panel_has_no_clones(self):
+        """Test natural noise does not produce clone matches."""
+        result = self.matcher.find_clones(self._create_panel())
+        assert result == {"shifts": [], "matched_fraction": 0.0}
+
+    def test_finds_clone_in_flat_region(self):
+        """Test a clone-stamped patch is found with its shift vector."""
+        gray = self._create_panel()
+        gray[200:260, 250:310] = gray[20:80, 30:90]
+
+        result = self.matcher.find_clones(gray)
+
+        assert result["shifts"][0]["dy"] == 180
+        assert result["shifts"][0]["dx"] == 220
+        assert result["matched_fraction"] > 0
+
+    def test_finds_clone_at_offset_off_the_index_grid(self):
+        """Test shifts that are not multiples of index_step are found."""
+        gray = self._create_panel()
+        gray[201:261, 253:313] = gray[20:80, 30:90]
+
+        result = self.matcher.find_clones(gray)
+
+        assert (result["shifts"][0]["dy"], result["shifts"][0]["dx"]) == (181, 223)
+
+    def test_tiling_does_not_change_result(self):
+        """Test small tiles give the same matches as one tile."""
+        gray = self._create_panel()
+        gray[150:210, 200:260] = gray[10:70, 10:70]
+
+        small = BlockMatcher(tile_rows=8).find_clones(gray)
+        large = BlockMatcher(tile_rows=1024).find_clones(gray)
+
+        assert small == large
+
+    def test_flat_blocks_are_ignored(self):
+        """Test uniform areas (which all match each other) give no clones."""
+        gray = np.full((200, 200), 128, dtype=np.uint8)
+        assert self.matcher.find_clones(gray)["shifts"] == []
+
+    def test_image_smaller_than_block(self):
+        """Test images smaller than one block give no clones."""
+        assert self.matcher.find_clones(np.zeros((8, 8), dtype=np.uint8))["matched_fraction"] == 0.0
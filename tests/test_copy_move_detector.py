@@ -1,9 +1,11 @@
 """Tests for CopyMoveDetector service."""
 
 import io
+import cv2
 import numpy as np
 from PIL import Image
 from forgery_detection.services.detectors.copy_move_detector import CopyMoveDetector
+from forgery_detection.services.image_context import ImageContext
 
 
 class TestCopyMoveDetector:
@@ -13,6 +15,12 @@ class TestCopyMoveDetector:
         """Setup test fixtures."""
         self.detector = CopyMoveDetector()
 
+    @staticmethod
+    def _count_matches(detector, gray):
+        """Helper: number of copy-move matches kept on a grayscale image."""
+        query_idx, _ = detector._match_features(*detector._detect_features(gray))
+        return len(query_idx)
+
     def _create_test_image(self, width=200, height=200, pattern="solid"):
         """Helper to create test images."""
         if pattern == "solid":
@@ -78,19 +86,19 @@ class TestCopyMoveDetector:
         # Small image has few features
         assert score >= 0.0
 
-    def test_detect_copy_move_no_features(self):
+    def test_match_features_no_features(self):
         """Test copy-move detection with no features."""
         # Uniform image - no features
         gray = np.ones((100, 100), dtype=np.uint8) * 128
-        matches = self.detector._detect_copy_move(gray)
+        matches = self._count_matches(self.detector, gray)
         assert matches == 0
 
-    def test_detect_copy_move_with_features(self):
+    def test_match_features_with_features(self):
         """Test copy-move detection with features present."""
         # Create image with some texture
         np.random.seed(42)
         gray = np.random.randint(0, 256, (200, 200), dtype=np.uint8)
-        matches = self.detector._detect_copy_move(gray)
+        matches = self._count_matches(self.detector, gray)
         # Should find some self-matches
         assert matches >= 0
 
@@ -124,3 +132,171 @@ class TestCopyMoveDetector:
         img_bytes = self._create_test_image(pattern="gradient")
         score = detector.analyze(img_bytes)
         assert 0.0 <= score <= 1.0
+
+    def test_analyze_batch_matches_analyze(self):
+        """Test batch scoring with a shared ORB/matcher equals per-image scoring."""
+        rng = np.random.default_rng(0)
+        noise = rng.integers(0, 256, (200, 200, 3), dtype=np.uint8)
+        noise[120:170, 120:170] = noise[10:60, 10:60]  # Copied region
+        buffer = io.BytesIO()
+        Image.fromarray(noise).save(buffer, format="PNG")
+        images = [
+            buffer.getvalue(),
+            self._create_test_image(pattern="checkerboard"),
+            b"invalid image data",
+            self._create_test_image(pattern="solid"),
+        ]
+
+        batch_scores = self.detector.analyze_batch([ImageContext(b) for b in images])
+
+        assert batch_scores == [self.detector.analyze(b) for b in images]
+        assert batch_scores[2] == self.detector.error_default_score
+
+    def _create_copied_region_gray(self, size=400):
+        """Helper: textured grayscale image with one region copied elsewhere."""
+        rng = np.random.default_rng(1)
+        gray = rng.integers(0, 256, (size, size), dtype=np.uint8)
+        gray[250:350, 250:350] = gray[20:120, 20:120]
+        return gray
+
+    def test_match_features_finds_copied_region(self):
+        """Test exact copies (Hamming distance 0) are counted, not skipped as self-matches."""
+        gray = self._create_copied_region_gray()
+        assert self._count_matches(self.detector, gray) > 0
+
+    def test_lsh_and_bruteforce_both_find_copied_region(self):
+        """Test the approximate LSH backend finds most of the exact backend's matches."""
+        gray = self._create_copied_region_gray()
+        counts = {}
+        for backend in ("bruteforce", "flann_lsh"):
+            detector = CopyMoveDetector()
+            detector.matcher.backend = backend
+            counts[backend] = self._count_matches(detector, gray)
+
+        assert counts["bruteforce"] > 0
+        assert counts["flann_lsh"] >= 0.8 * counts["bruteforce"]
+
+    def test_engine_by_format(self):
+        """Test the engine is selected from the image format."""
+        detector = CopyMoveDetector()
+        detector.engine = "orb"
+        detector.engine_by_format = {"png": "block_dct"}
+
+        assert detector.engine_for(self._create_test_image()) == "block_dct"
+        jpeg = io.BytesIO()
+        Image.new("RGB", (32, 32)).save(jpeg, format="JPEG")
+        assert detector.engine_for(jpeg.getvalue()) == "orb"
+
+    def test_block_dct_engine_finds_clone_in_flat_region(self):
+        """Test the block engine scores a clone-stamped flat panel that ORB misses."""
+        rng = np.random.default_rng(0)
+        panel = 120 + np.linspace(0, 20, 300)[:, None] + rng.normal(0, 1.5, (300, 400))
+        panel = np.clip(panel, 0, 255).astype(np.uint8)
+        panel[200:260, 250:310] = panel[20:80, 30:90]
+        buffer = io.BytesIO()
+        Image.fromarray(np.stack([panel] * 3, axis=2)).save(buffer, format="PNG")
+
+        detector = CopyMoveDetector()
+        detector.engine_by_format = {}
+        scores = {}
+        for engine in ("orb", "block_dct", "both"):
+            detector.engine = engine
+            scores[engine] = detector.analyze(buffer.getvalue())
+
+        assert scores["block_dct"] > 0.5
+        assert scores["both"] == max(scores["orb"], scores["block_dct"])
+
+    def _create_corner_textured_gray(self):
+        """Helper: large smooth image with one strongly textured corner."""
+        rng = np.random.default_rng(2)
+        gray = cv2.GaussianBlur(rng.integers(0, 256, (1200, 1600), dtype=np.uint8), (9, 9), 3)
+        gray[:300, :400] = rng.integers(0, 256, (300, 400), dtype=np.uint8)
+        return gray
+
+    def test_tiled_detection_covers_whole_image(self):
+        """Test per-tile quotas spread keypoints beyond the most textured area."""
+        gray = self._create_corner_textured_gray()
+        detector = CopyMoveDetector()
+
+        detector.tile_size = 0
+        whole, _ = detector._detect_features(gray)
+        detector.tile_size = 400
+        tiled, descriptors = detector._detect_features(gray)
+
+        def outside(kps):
+            return sum(kp.pt[0] >= 400 or kp.pt[1] >= 300 for kp in kps)
+
+        assert outside(tiled) > outside(whole)
+        assert len(descriptors) == len(tiled)
+        assert all(0 <= kp.pt[0] < 1600 and 0 <= kp.pt[1] < 1200 for kp in tiled)
+
+    def test_tiled_detection_threads_match_sequential(self):
+        """Test threaded tile detection returns the same keypoints."""
+        gray = self._create_corner_textured_gray()
+        detector = CopyMoveDetector()
+        detector.tile_size = 400
+
+        sequential = detector._detect_features(gray)
+        detector.tile_threads = 4
+        threaded = detector._detect_features(gray)
+
+        assert [kp.pt for kp in threaded[0]] == [kp.pt for kp in sequential[0]]
+        np.testing.assert_array_equal(threaded[1], sequential[1])
+
+    def test_visualize_matches_reuses_keypoints(self):
+        """Test visualization uses the keypoints memoized by analyze."""
+        img_bytes = self._create_test_image(pattern="checkerboard")
+        ctx = ImageContext(img_bytes)
+        detector = CopyMoveDetector()
+        detector.analyze(img_bytes, ctx)
+
+        def fail(*args, **kwargs):
+            raise AssertionError("ORB recomputed")
+
+        detector._detect_features = fail
+        viz = detector.visualize_matches(img_bytes, ctx)
+        assert viz.size == (200, 200)
+
+    def test_coherent_shifts_keep_clone_groups(self):
+        """Test matches sharing a displacement are kept and scattered ones dropped."""
+        clone = np.array([[100.0, 50.0], [102.0, 49.0], [99.0, 53.0]])
+        scattered = np.array([[300.0, -80.0], [-60.0, 220.0]])
+
+        coherent = self.detector._coherent_shifts(np.vstack([clone, scattered]))
+
+        assert coherent.tolist() == [True, True, True, False, False]
+
+    def test_coherent_shifts_fold_opposite_directions(self):
+        """Test a clone matched in both directions forms one group."""
+        shifts = np.array([[100.0, 50.0], [-100.0, -50.0], [101.0, 51.0]])
+        assert self.detector._coherent_shifts(shifts).all()
+
+    def test_coherent_shifts_disabled(self):
+        """Test min_cluster_size 1 keeps every match."""
+        detector = CopyMoveDetector()
+        detector.min_cluster_size = 1
+        assert detector._coherent_shifts(np.array([[300.0, -80.0]])).tolist() == [True]
+
+    def test_clustering_reduces_repetitive_texture_matches(self):
+        """Test a grille loses more matches to clustering than a real clone."""
+        rng = np.random.default_rng(0)
+        x = np.arange(800)[None, :]
+        y = np.arange(600)[:, None]
+        grille = (
+            128
+            + 60 * np.sign(np.sin(2 * np.pi * x / 23))
+            + 40 * np.sign(np.sin(2 * np.pi * y / 37))
+        )
+        grille = np.clip(grille + rng.normal(0, 6, (600, 800)), 0, 255).astype(np.uint8)
+        clone = cv2.GaussianBlur(rng.integers(0, 256, (600, 800), dtype=np.uint8), (5, 5), 1.5)
+        clone[350:500, 450:650] = clone[50:200, 50:250]
+
+        unclustered = CopyMoveDetector()
+        unclustered.min_cluster_size = 1
+        kept = {
+            name: self._count_matches(self.detector, gray) / self._count_matches(unclustered, gray)
+            for name, gray in (("grille", grille), ("clone", clone))
+        }
+
+        assert kept["clone"] > 0.9
+        assert kept["grille"] < 0.5
@@ -0,0 +1,99 @@
+"""Tests for DescriptorMatcher service."""
+
+import cv2
+import numpy as np
+import pytest
+from forgery_detection.services.descriptor_matcher import DescriptorMatcher
+
+
+class TestDescriptorMatcher:
+    """Test cases for DescriptorMatcher."""
+
+    def _create_descriptors(self, n=300, seed=0):
+        """Helper: random 32-byte ORB-like descriptors."""
+        rng = np.random.default_rng(seed)
+        return rng.integers(0, 256, (n, 32), dtype=np.uint8)
+
+    def _brute_force_neighbours(self, descriptors):
+        """Reference: two nearest other descriptors by exhaustive Hamming distance."""
+        bits = np.unpackbits(descriptors, axis=1).astype(np.int32)
+        distances = (bits[:, None, :] != bits[None, :, :]).sum(axis=2).astype(np.float64)
+        np.fill_diagonal(distances, np.inf)
+        return np.sort(distances, axis=1)[:, :2]
+
+    def test_bruteforce_excludes_self_match(self):
+        """Test no descriptor is returned as its own neighbour."""
+        descriptors = self._create_descriptors()
+        indices, _ = DescriptorMatcher(backend="bruteforce").match_self(descriptors)
+
+        assert indices.shape == (len(descriptors), 2)
+        assert not np.any(indices == np.arange(len(descriptors))[:, None])
+
+    def test_bruteforce_matches_exhaustive_distances(self):
+        """Test nearest and second-nearest distances equal the exhaustive reference."""
+        descriptors = self._create_descriptors()
+        _, distances = DescriptorMatcher(backend="bruteforce").match_self(descriptors)
+        np.testing.assert_array_equal(distances, self._brute_force_neighbours(descriptors))
+
+    def test_exact_duplicates_are_kept(self):
+        """Test an identical descriptor is found at distance 0 by both backends."""
+        descriptors = self._create_descriptors()
+        descriptors[7] = descriptors[200]
+        for backend in ("bruteforce", "flann_lsh"):
+            indices, distances = DescriptorMatcher(backend=backend).match_self(descriptors)
+            assert indices[7, 0] == 200 and distances[7, 0] == 0
+            assert indices[200, 0] == 7 and distances[200, 0] == 0
+
+    def test_lsh_finds_near_duplicates(self):
+        """Test the LSH backend recovers most near-duplicate pairs."""
+        rng = np.random.default_rng(1)
+        originals = self._create_descriptors(n=1000)
+        copies = originals[:200].copy()
+        # Flip a few bits of each copy
+        for row in copies:
+            row[rng.integers(0, 32, 2)] ^= np.uint8(1)
+        descriptors = np.concatenate([originals, copies])
+
+        indices, _ = DescriptorMatcher(backend="flann_lsh").match_self(descriptors)
+
+        found = np.mean(indices[1000:, 0] == np.arange(200))
+        assert found >= 0.9
+
+    def test_too_few_descriptors(self):
+        """Test a single descriptor has no neighbours."""
+        indices, distances = DescriptorMatcher().match_self(self._create_descriptors(n=1))
+        assert indices.tolist() == [[-1, -1]]
+        assert np.all(np.isinf(distances))
+
+    def test_two_descriptors_have_one_neighbour(self):
+        """Test the missing second neighbour is reported as -1 / inf."""
+        indices, distances = DescriptorMatcher(backend="bruteforce").match_self(
+            self._create_descriptors(n=2)
+        )
+        assert indices.tolist() == [[1, -1], [0, -1]]
+        assert np.isinf(distances[:, 1]).all()
+
+    def test_matchers_built_once(self, monkeypatch):
+        """Test matching reuses the matchers built in __init__ for every call and backend."""
+        matcher = DescriptorMatcher(backend="auto", auto_threshold=100)
+
+        def fail(*args, **kwargs):
+            raise AssertionError("matcher rebuilt")
+
+        monkeypatch.setattr(cv2, "BFMatcher", fail)
+        monkeypatch.setattr(cv2, "FlannBasedMatcher", fail)
+        for n in (50, 300, 50):
+            indices, _ = matcher.match_self(self._create_descriptors(n=n, seed=n))
+            assert (indices[:, 0] != np.arange(n)).all()
+
+    def test_auto_backend_selection(self):
+        """Test auto switches to LSH above the threshold."""
+        matcher = DescriptorMatcher(backend="auto", auto_threshold=100)
+        assert matcher.backend_for(100) == "bruteforce"
+        assert matcher.backend_for(101) == "flann_lsh"
+        assert DescriptorMatcher(backend="bruteforce").backend_for(10**6) == "bruteforce"
+
+    def test_unknown_backend_raises(self):
+        """Test an unknown backend name is rejected."""
+        with pytest.raises(ValueError):
+            DescriptorMatcher(backend="kdtree")
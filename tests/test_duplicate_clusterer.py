@@ -0,0 +1,82 @@
+"""Tests for DuplicateClusterer service."""
+
+import numpy as np
+from forgery_detection.services.duplicate_clusterer import DuplicateClusterer
+
+
+class TestDuplicateClusterer:
+    """Test cases for DuplicateClusterer."""
+
+    def setup_method(self):
+        """Setup test fixtures."""
+        self.clusterer = DuplicateClusterer(max_distance=8, block_size=16)
+
+    def _random_hashes(self, n, seed=0):
+        """Helper to create random 64-bit hashes."""
+        rng = np.random.default_rng(seed)
+        return rng.integers(0, 2**64 - 1, n, dtype=np.uint64, endpoint=True)
+
+    def test_near_pairs_match_brute_force(self):
+        """Test tiled all-pairs search finds exactly the pairs within max_distance."""
+        hashes = self._random_hashes(100)
+        # Near-duplicates straddling tile boundaries
+        hashes[40] = hashes[3] ^ np.uint64(0b1011)
+        hashes[95] = hashes[3] ^ np.uint64(0xFF)
+        hashes[17] = hashes[16] ^ np.uint64(1)
+
+        i, j, distances = self.clusterer.near_pairs(hashes)
+
+        expected = {
+            (a, b): bin(int(hashes[a]) ^ int(hashes[b])).count("1")
+            for a in range(len(hashes))
+            for b in range(a + 1, len(hashes))
+            if bin(int(hashes[a]) ^ int(hashes[b])).count("1") <= 8
+        }
+        assert dict(zip(zip(i.tolist(), j.tolist()), distances.tolist())) == expected
+
+    def test_chained_duplicates_form_one_cluster(self):
+        """Test transitively linked hashes join one cluster, largest cluster first."""
+        hashes = self._random_hashes(50, seed=1)
+        # Chain 5 -> 20 -> 45: ends are 12 bits apart but linked through the middle
+        hashes[20] = hashes[5] ^ np.uint64(0x3F)
+        hashes[45] = hashes[20] ^ np.uint64(0xFC0)
+        hashes[30] = hashes[10]
+
+        clusters = self.clusterer.cluster(hashes)
+
+        assert [c.tolist() for c in clusters] == [[5, 20, 45], [10, 30]]
+
+    def test_find_clusters_on_records(self):
+        """Test records are grouped by their hex pHash and records without one are ignored."""
+        records = [
+            {"filename": "a.jpg", "phash": "ffd8a0c0e0f0f8fc"},
+            {"filename": "b.jpg", "phash": "0123456789abcdef"},
+            {"filename": "c.jpg", "phash": "ffd8a0c0e0f0f8fd"},
+            {"filename": "d.jpg", "phash": None},
+        ]
+
+        clusters = self.clusterer.find_clusters(records)
+
+        assert len(clusters) == 1
+        assert clusters[0]["size"] == 2
+        assert clusters[0]["max_distance"] == 1
+        assert [m["filename"] for m in clusters[0]["members"]] == ["a.jpg", "c.jpg"]
+
+    def test_no_duplicates(self):
+        """Test distinct hashes give no clusters."""
+        assert self.clusterer.cluster(np.array([0, 2**64 - 1], dtype=np.uint64)) == []
+        assert self.clusterer.find_clusters([]) == []
+
+    def test_find_clusters_max_distance_per_cluster(self):
+        """Test each cluster reports the largest distance among its own links."""
+        hashes = self._random_hashes(6, seed=2)
+        hashes[1] = hashes[0] ^ np.uint64(0b111)  # distance 3
+        hashes[2] = hashes[1] ^ np.uint64(0b11 << 10)  # distance 2 (and 5 to hashes[0])
+        hashes[4] = hashes[3] ^ np.uint64(0xFF)  # distance 8
+        records = [
+            {"filename": f"{k}.jpg", "phash": f"{int(h):016x}"} for k, h in enumerate(hashes)
+        ]
+
+        clusters = self.clusterer.find_clusters(records)
+
+        assert [(c["size"], c["max_distance"]) for c in clusters] == [(3, 5), (2, 8)]
@@ -119,3 +119,99 @@ class TestELADetector:
         score = self.detector._calculate_ela_score(diff)
         # High variance suggests manipulation
         assert score > 0.0
+
+    def test_uint8_diff_matches_float_reference(self):
+        """Test the uint8 OpenCV path gives the same diff and score as a PIL float round trip."""
+        rng = np.random.default_rng(0)
+        img = Image.fromarray(rng.integers(0, 256, (30, 40, 3), dtype=np.uint8)).resize((160, 120))
+        buffer = io.BytesIO()
+        img.save(buffer, format="JPEG", quality=80)
+        jpeg_bytes = buffer.getvalue()
+
+        original = Image.open(io.BytesIO(jpeg_bytes)).convert("RGB")
+        resaved_buffer = io.BytesIO()
+        original.save(resaved_buffer, format="JPEG", quality=self.detector.default_quality)
+        resaved_buffer.seek(0)
+        reference = np.abs(
+            np.array(original, dtype=np.float32)
+            - np.array(Image.open(resaved_buffer), dtype=np.float32)
+        )
+
+        score = self.detector.analyze(jpeg_bytes)
+
+        assert reference.max() > 0
+        assert abs(score - self.detector._calculate_ela_score(reference)) < 1e-6
+        ela_image = np.asarray(self.detector.generate_ela_image(jpeg_bytes, "jpeg"))
+        expected = np.clip(reference * self.detector.scale_factor, 0, 255).astype(np.uint8)
+        assert np.array_equal(ela_image, expected)
+
+    def _create_ghost_pair(self):
+        """Helper: authentic JPEG and a copy with a region compressed earlier at quality 60."""
+        rng = np.random.default_rng(0)
+        base = np.asarray(
+            Image.fromarray(rng.integers(0, 256, (48, 64, 3), dtype=np.uint8)).resize(
+                (512, 384), Image.BICUBIC
+            )
+        )
+        buffer = io.BytesIO()
+        Image.fromarray(base).save(buffer, format="JPEG", quality=60)
+        earlier = np.asarray(Image.open(buffer).convert("RGB"))
+        forged = base.copy()
+        forged[128:256, 192:320] = earlier[128:256, 192:320]
+
+        images = []
+        for pixels in (base, forged):
+            buffer = io.BytesIO()
+            Image.fromarray(pixels).save(buffer, format="JPEG", quality=95)
+            images.append(buffer.getvalue())
+        return images
+
+    def test_ghost_analysis_finds_earlier_quality(self):
+        """Test the ghost sweep locates a region double-compressed at quality 60."""
+        authentic, forged = self._create_ghost_pair()
+
+        ghosts = self.detector.analyze_ghosts(forged)
+        authentic_ghosts = self.detector.analyze_ghosts(authentic)
+
+        block = ghosts["block_size"]
+        region = ghosts["ghost_quality"][128 // block : 256 // block, 192 // block : 320 // block]
+        assert ghosts["dominant_quality"] == 60
+        assert (region == 60).mean() > 0.5
+        assert ghosts["score"] > 0.8
+        assert authentic_ghosts["score"] < 0.2
+
+    def test_ghost_threads_match_sequential(self):
+        """Test concurrent encodes give the same ghost map as a sequential sweep."""
+        _, forged = self._create_ghost_pair()
+        self.detector.ghost_threads = 4
+        threaded = self.detector.analyze_ghosts(forged)
+        self.detector.close()
+
+        self.detector.ghost_threads = 1
+        sequential = self.detector.analyze_ghosts(forged)
+
+        assert np.array_equal(threaded["depth"], sequential["depth"])
+        assert threaded["score"] == sequential["score"]
+
+    def test_thread_budget_and_close(self):
+        """Test the scorer's thread budget sizes the ghost pool unless threads are configured."""
+        self.detector.set_thread_budget(2)
+        assert self.detector.ghost_threads == 2
+        pool = self.detector._get_ghost_pool()
+        assert pool._max_workers == 2
+
+        self.detector.close()
+        assert self.detector._ghost_pool is None
+        assert pool._shutdown
+
+        self.detector.configured_ghost_threads = 3
+        self.detector.set_thread_budget(1)
+        assert self.detector.ghost_threads == 2
+
+    def test_ghost_mode_flat_image(self):
+        """Test flat images have no ghosts and ghost mode keeps scores in range."""
+        self.detector.mode = "ghost"
+        jpeg_bytes = self._create_test_jpeg()
+
+        assert self.detector.analyze_ghosts(jpeg_bytes)["score"] == 0.0
+        assert 0.0 <= self.detector.analyze(jpeg_bytes) < 0.5
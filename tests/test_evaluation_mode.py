@@ -1,8 +1,8 @@
-"""Tests for evaluation mode context preparation."""
+"""Tests for evaluation mode context preparation and replay."""
 
 import argparse
 import re
-from forgery_detection.modes.evaluation_mode import prepare_context
+from forgery_detection.modes.evaluation_mode import EvaluationMode, prepare_context
 
 
 class TestPrepareContext:
@@ -98,3 +98,44 @@ class TestPrepareContext:
         # Verify minute is valid (00-59)
         minute = int(time_part[2:])
         assert 0 <= minute <= 59
+
+
+class TestReplay:
+    """Test cases for replaying stored detector scores."""
+
+    def test_replay_recomputes_scores_and_report(self, tmp_path):
+        """Test replay aggregates stored scores and writes a report without images."""
+        records = [
+            {
+                "filename": "forged.jpg",
+                "ground_truth": "forged",
+                "format": "jpeg",
+                "detector_scores": {"metadata": 1.0, "ela": 1.0},
+                "exif_analysis": {"tags_count": 0},
+            },
+            {
+                "filename": "authentic.png",
+                "ground_truth": "authentic",
+                "format": "png",
+                "detector_scores": {"metadata": 0.0, "statistical": 0.0},
+                "exif_analysis": {"tags_count": 12},
+            },
+        ]
+        scores_path = str(tmp_path / "scores.jsonl")
+        report_path = str(tmp_path / "report.md")
+        mode = EvaluationMode()
+        mode.score_store.write(scores_path, records)
+
+        mode.run_replay(
+            {
+                "replay": scores_path,
+                "criteria": "balanced",
+                "report": report_path,
+                "config_file": "config.yml (default)",
+            }
+        )
+
+        report = open(report_path).read()
+        assert "**Total Images:** 2" in report
+        assert "| True Positives (TP) | 1 |" in report
+        assert "| True Negatives (TN) | 1 |" in report
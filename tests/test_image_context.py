@@ -0,0 +1,172 @@
+"""Tests for ImageContext service."""
+
+import io
+from concurrent.futures import ThreadPoolExecutor
+import cv2
+import numpy as np
+import pytest
+from PIL import Image
+from forgery_detection.services.image_context import ImageContext
+from forgery_detection.services.detectors.statistical_detector import StatisticalDetector
+
+
+class TestImageContext:
+    """Test cases for ImageContext."""
+
+    def _create_test_image(self, width=60, height=40, mode="RGB", format="PNG", exif=None):
+        """Helper to create a test image."""
+        img = Image.new(mode, (width, height), color=128 if mode == "L" else (10, 128, 200))
+        buffer = io.BytesIO()
+        if exif:
+            img.save(buffer, format=format, exif=exif)
+        else:
+            img.save(buffer, format=format)
+        return buffer.getvalue()
+
+    def test_rgb_array_shape_and_dtype(self):
+        """Test RGB array is uint8 H x W x 3."""
+        ctx = ImageContext(self._create_test_image())
+        assert ctx.rgb.shape == (40, 60, 3)
+        assert ctx.rgb.dtype == np.uint8
+        assert tuple(ctx.rgb[0, 0]) == (10, 128, 200)
+
+    def test_float32_matches_rgb(self):
+        """Test float32 array mirrors RGB values."""
+        ctx = ImageContext(self._create_test_image())
+        assert ctx.float32.dtype == np.float32
+        assert np.array_equal(ctx.float32, ctx.rgb.astype(np.float32))
+
+    def test_grayscale_converts_non_rgb(self):
+        """Test grayscale image is converted to RGB and back to gray."""
+        ctx = ImageContext(self._create_test_image(mode="L"))
+        assert ctx.rgb_image.mode == "RGB"
+        assert ctx.gray.shape == (40, 60)
+        assert ctx.gray.dtype == np.uint8
+
+    def test_products_are_memoized(self):
+        """Test each product is computed only once."""
+        ctx = ImageContext(self._create_test_image())
+        assert ctx.rgb_image is ctx.rgb_image
+        assert ctx.rgb is ctx.rgb
+        assert ctx.float32 is ctx.float32
+        assert ctx.gray is ctx.gray
+
+    def test_metadata_parsed(self):
+        """Test EXIF tags are exposed through the header metadata."""
+        exif = Image.Exif()
+        exif[305] = "GIMP 2.10"
+        ctx = ImageContext(self._create_test_image(format="JPEG", exif=exif))
+        assert ctx.metadata["tags"].get(305) == "GIMP 2.10"
+
+    def test_invalid_bytes_raise_on_access(self):
+        """Test invalid data raises when a product is requested."""
+        ctx = ImageContext(b"not an image")
+        with pytest.raises(Exception):
+            _ = ctx.rgb
+
+    def test_detector_accepts_shared_context(self):
+        """Test detector gives the same score with and without a shared context."""
+        image_bytes = self._create_test_image()
+        detector = StatisticalDetector()
+        ctx = ImageContext(image_bytes)
+        assert detector.analyze(image_bytes, ctx) == detector.analyze(image_bytes)
+
+    def test_concurrent_access_computes_once(self):
+        """Test concurrent first access shares one decoded product."""
+        ctx = ImageContext(self._create_test_image())
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            arrays = list(pool.map(lambda _: ctx.rgb, range(16)))
+        assert all(a is arrays[0] for a in arrays)
+
+    def test_rgb_at_returns_full_image_when_small_enough(self):
+        """Test reduced views reuse the full-resolution product when it already fits."""
+        ctx = ImageContext(self._create_test_image())
+        assert ctx.rgb_at(100) is ctx.rgb
+        assert ctx.rgb_at(None) is ctx.rgb
+        assert ctx.float32_at(0) is ctx.float32
+
+    @pytest.mark.parametrize("format", ["JPEG", "PNG"])
+    def test_rgb_at_limits_longest_side(self, format):
+        """Test JPEG draft decoding and area resizing both honour max_side."""
+        ctx = ImageContext(self._create_test_image(width=800, height=500, format=format))
+
+        reduced = ctx.rgb_at(200)
+
+        assert reduced.shape == (125, 200, 3)
+        assert reduced.dtype == np.uint8
+        assert np.allclose(reduced[60, 100], (10, 128, 200), atol=4)
+        assert ctx.float32_at(200).shape == (125, 200, 3)
+        assert ctx.rgb_image_at(200).size == (200, 125)
+        # Memoized per size
+        assert ctx.rgb_at(200) is reduced
+
+    def test_rgb_at_jpeg_skips_full_decode(self):
+        """Test a JPEG reduced view does not decode the full-resolution pixels."""
+        ctx = ImageContext(self._create_test_image(width=800, height=500, format="JPEG"))
+        ctx.rgb_at(100)
+        assert "rgb" not in ctx._products
+
+    def test_planned_resolutions_share_one_decode(self):
+        """Test reduced views come from the largest planned decode."""
+        image_bytes = self._create_test_image(width=800, height=500, format="JPEG")
+        ctx = ImageContext(image_bytes)
+        ctx.plan_resolutions([400, 100])
+        assert ctx.rgb_at(100).shape == (62, 100, 3)
+        assert "rgb@400" in ctx._products
+        assert "rgb" not in ctx._products
+
+        ctx = ImageContext(image_bytes)
+        ctx.plan_resolutions([None, 100])
+        ctx.rgb_at(100)
+        assert "rgb" in ctx._products
+
+    def test_feature_luminance_is_gray(self):
+        """Test the luminance feature is the memoized gray product."""
+        ctx = ImageContext(self._create_test_image())
+        assert ctx.feature("luminance") is ctx.gray
+        assert ctx.gray.shape == (40, 60)
+
+    def test_feature_unknown_name_raises(self):
+        """Test unknown feature names are rejected."""
+        ctx = ImageContext(self._create_test_image())
+        with pytest.raises(ValueError):
+            ctx.feature("canny")
+
+    def test_features_match_opencv(self):
+        """Test the residual features against direct OpenCV calls."""
+        rng = np.random.default_rng(0)
+        buffer = io.BytesIO()
+        Image.fromarray(rng.integers(0, 256, (37, 50), dtype=np.uint8)).save(buffer, format="PNG")
+        ctx = ImageContext(buffer.getvalue())
+        gray = ctx.gray
+
+        median = ctx.feature("median_residual")
+        assert np.array_equal(median, np.abs(gray.astype(np.int16) - cv2.medianBlur(gray, 3)))
+
+        residual = ctx.feature("laplacian_residual")
+        assert np.array_equal(
+            residual, np.abs(cv2.Laplacian(gray.astype(np.float32), -1, ksize=1)).clip(0, 255)
+        )
+
+    def test_feature_memoized_per_resolution(self):
+        """Test features are keyed by resolution, sharing the full-resolution one when it fits."""
+        ctx = ImageContext(self._create_test_image(width=400, height=250))
+        assert ctx.feature("median_residual", 1000) is ctx.feature("median_residual")
+        reduced = ctx.feature("luminance", 200)
+        assert reduced.shape == (125, 200)
+        assert ctx.feature("luminance", 200) is reduced
+        assert "luminance@200" in ctx._products
+
+    def test_release_evicts_products(self):
+        """Test released products are recomputed on the next request."""
+        ctx = ImageContext(self._create_test_image())
+        gray = ctx.gray
+        ctx.feature("median_residual")
+
+        ctx.release("median_residual")
+        assert "median_residual" not in ctx._products
+        assert ctx.gray is gray
+
+        ctx.release()
+        assert ctx._products == {}
+        assert np.array_equal(ctx.gray, gray)
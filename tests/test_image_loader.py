@@ -0,0 +1,86 @@
+"""Tests for ImageLoader service."""
+
+import types
+from forgery_detection.services.image_loader import ImageLoader
+
+
+class TestImageLoader:
+    """Test cases for ImageLoader."""
+
+    def _make_dataset(self, tmp_path):
+        """Helper to create forged/authentic directories with a nested subdirectory."""
+        forged = tmp_path / "forged"
+        authentic = tmp_path / "authentic"
+        (forged / "nested").mkdir(parents=True)
+        authentic.mkdir()
+        (forged / "f1.jpg").write_bytes(b"forged-1")
+        (forged / "f2.PNG").write_bytes(b"forged-2")
+        (forged / "notes.txt").write_bytes(b"ignored")
+        (forged / "nested" / "f3.tif").write_bytes(b"forged-3")
+        (authentic / "a1.jpeg").write_bytes(b"authentic-1")
+        return str(forged), str(authentic)
+
+    def test_load_labeled_images(self, tmp_path):
+        """Test eager loading returns all supported top-level images with labels."""
+        forged, authentic = self._make_dataset(tmp_path)
+        images = ImageLoader().load_labeled_images(forged, authentic)
+
+        assert sorted((p.split("/")[-1], b, label) for p, b, label in images) == [
+            ("a1.jpeg", b"authentic-1", "authentic"),
+            ("f1.jpg", b"forged-1", "forged"),
+            ("f2.PNG", b"forged-2", "forged"),
+        ]
+
+    def test_iter_labeled_images_is_lazy(self, tmp_path):
+        """Test streaming mode returns an iterator, not a list."""
+        forged, authentic = self._make_dataset(tmp_path)
+        images = ImageLoader().iter_labeled_images(forged, authentic)
+
+        assert isinstance(images, types.GeneratorType)
+        assert len(list(images)) == 3
+
+    def test_iter_labeled_images_recursive(self, tmp_path):
+        """Test recursive mode walks subdirectories."""
+        forged, authentic = self._make_dataset(tmp_path)
+        images = list(ImageLoader().iter_labeled_images(forged, authentic, recursive=True))
+
+        names = sorted(p.split("/")[-1] for p, _, _ in images)
+        assert names == ["a1.jpeg", "f1.jpg", "f2.PNG", "f3.tif"]
+
+    def test_prefetch_preserves_order(self, tmp_path):
+        """Test prefetching yields the same sequence as direct reads."""
+        forged, authentic = self._make_dataset(tmp_path)
+        direct = list(ImageLoader(prefetch_size=0).iter_labeled_images(forged, authentic, True))
+        prefetched = list(ImageLoader(prefetch_size=1).iter_labeled_images(forged, authentic, True))
+
+        assert prefetched == direct
+
+    def test_prefetch_stops_when_consumer_stops(self, tmp_path):
+        """Test closing the stream early does not hang the reader thread."""
+        forged, authentic = self._make_dataset(tmp_path)
+        images = ImageLoader(prefetch_size=1).iter_labeled_images(forged, authentic, True)
+
+        next(images)
+        images.close()
+
+    def test_missing_directory_is_skipped(self, tmp_path):
+        """Test missing directories yield nothing instead of failing."""
+        forged, _ = self._make_dataset(tmp_path)
+        images = list(ImageLoader().iter_labeled_images(forged, str(tmp_path / "missing")))
+
+        assert all(label == "forged" for _, _, label in images)
+
+    def test_iter_unlabeled_images_accepts_dirs_files_and_lists(self, tmp_path):
+        """Test prediction inputs: directory, single file and .txt file list."""
+        forged, authentic = self._make_dataset(tmp_path)
+        file_list = tmp_path / "list.txt"
+        file_list.write_text(f"# claim 42\n{forged}/f1.jpg\n\n{tmp_path}/missing.jpg\n")
+        inputs = [authentic, f"{forged}/f2.PNG", str(file_list)]
+
+        images = list(ImageLoader().iter_unlabeled_images(inputs))
+
+        assert [(p.split("/")[-1], b, label) for p, b, label in images] == [
+            ("a1.jpeg", b"authentic-1", None),
+            ("f2.PNG", b"forged-2", None),
+            ("f1.jpg", b"forged-1", None),
+        ]
@@ -0,0 +1,117 @@
+"""Tests for ImageScorer and parallel scoring."""
+
+import io
+import numpy as np
+from PIL import Image
+from forgery_detection.modes.image_scorer import ImageScorer, iter_scored_images
+from forgery_detection.services.image_context import ImageContext
+
+
+class TestImageScorer:
+    """Test cases for ImageScorer."""
+
+    def setup_method(self):
+        """Setup test fixtures."""
+        self.scorer = ImageScorer()
+
+    def _create_test_image(self, seed=0, format="JPEG"):
+        """Helper to create a noisy test image."""
+        rng = np.random.default_rng(seed)
+        img = Image.fromarray(rng.integers(0, 256, (64, 64, 3), dtype=np.uint8))
+        buffer = io.BytesIO()
+        img.save(buffer, format=format)
+        return buffer.getvalue()
+
+    def test_score_returns_record(self):
+        """Test scoring a JPEG returns a full record."""
+        record = self.scorer.score("a.jpg", self._create_test_image())
+
+        assert record["filename"] == "a.jpg"
+        assert record["format"] == "jpeg"
+        assert 0.0 <= record["final_score"] <= 1.0
+        assert "ela" in record["detector_scores"]
+        assert "tags_count" in record["exif_analysis"]
+
+    def test_score_png_excludes_ela(self):
+        """Test non-JPEG recipe does not run ELA."""
+        record = self.scorer.score("a.png", self._create_test_image(format="PNG"))
+        assert "ela" not in record["detector_scores"]
+
+    def test_score_unknown_format_returns_none(self):
+        """Test unsupported data is skipped."""
+        assert self.scorer.score("a.bin", b"not an image") is None
+
+    def test_parallel_matches_serial_order(self):
+        """Test worker pool yields the same records, in input order, as the serial path."""
+        images = [(f"img{i}.jpg", self._create_test_image(seed=i), "forged") for i in range(5)]
+        images.insert(2, ("bad.bin", b"not an image", "authentic"))
+
+        serial = list(iter_scored_images(images, self.scorer, workers=1, batch_size=1))
+        parallel = list(iter_scored_images(images, self.scorer, workers=2, batch_size=2))
+
+        assert parallel == serial
+        assert [label for label, _ in parallel] == [label for _, _, label in images]
+        assert parallel[2][1] is None
+
+    def test_detector_threads_match_sequential(self):
+        """Test concurrent detectors give the same scores as sequential ones."""
+        image_bytes = self._create_test_image(seed=7)
+        threaded = ImageScorer(detector_threads=4)
+        try:
+            assert threaded.score("a.jpg", image_bytes) == self.scorer.score("a.jpg", image_bytes)
+        finally:
+            threaded.close()
+
+    def test_thread_budget_shared_by_workers(self, monkeypatch):
+        """Test detectors get the CPUs left per worker and detector thread, and are closed."""
+        monkeypatch.setattr("os.cpu_count", lambda: 8)
+        ela = ImageScorer(detector_threads=2, workers=2).recipes.detectors["ela"]
+        assert ela.ghost_threads == 2
+        scorer = ImageScorer(workers=16)
+        ela = scorer.recipes.detectors["ela"]
+        assert ela.ghost_threads == 1
+
+        ela._get_ghost_pool()
+        scorer.close()
+        assert ela._ghost_pool is None
+
+    def test_detectors_declare_resolutions(self):
+        """Test the scorer plans decodes from the resolutions detectors declare."""
+        detectors = self.scorer.recipes.detectors
+        assert detectors["statistical"].max_resolution == 1024
+        assert detectors["noise_variance"].max_resolution is None
+        assert not detectors["metadata"].reads_pixels
+
+        ctx = ImageContext(self._create_test_image(seed=3))
+        self.scorer._run_detectors([ctx], ["jpeg"])
+        assert ctx._planned_side is None
+
+    def test_score_batch_matches_score(self):
+        """Test batch scoring gives the same records as one image at a time."""
+        images = [(f"img{i}.jpg", self._create_test_image(seed=i)) for i in range(3)]
+        images.append(("a.png", self._create_test_image(seed=9, format="PNG")))
+        images.insert(1, ("bad.bin", b"not an image"))
+
+        records = self.scorer.score_batch(images)
+
+        assert records == [self.scorer.score(path, image_bytes) for path, image_bytes in images]
+        assert records[1] is None
+        assert records[-1]["filename"] == "a.png"
+
+    def test_score_batch_caps_pixels_decoded_together(self):
+        """Test a batch above batch_max_pixels runs detectors in chunks with the same records."""
+        images = [(f"img{i}.jpg", self._create_test_image(seed=i)) for i in range(5)]
+        expected = self.scorer.score_batch(images)
+
+        # 64 x 64 images: two fit under the cap
+        self.scorer.batch_max_pixels = 2 * 64 * 64
+        chunk_sizes = []
+        run_detectors = self.scorer._run_detectors
+
+        def counting(image_contexts, format_types):
+            chunk_sizes.append(len(image_contexts))
+            return run_detectors(image_contexts, format_types)
+
+        self.scorer._run_detectors = counting
+        assert self.scorer.score_batch(images) == expected
+        assert chunk_sizes == [2, 2, 1]
@@ -0,0 +1,117 @@
+"""Tests for MetadataExtractor service."""
+
+import io
+import mmap
+import pytest
+from PIL import Image
+from forgery_detection.services.metadata_extractor import MetadataExtractor, match_editing_software
+
+XMP_PACKET = (
+    '<x:xmpmeta xmlns:x="adobe:ns:meta/">'
+    '<rdf:RDF xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#">'
+    '<rdf:Description xmp:CreatorTool="Adobe Photoshop 25.0" tiff:Orientation="6"/>'
+    "</rdf:RDF></x:xmpmeta>"
+)
+
+
+class TestMetadataExtractor:
+    """Test cases for MetadataExtractor."""
+
+    def setup_method(self):
+        """Setup test fixtures."""
+        self.extractor = MetadataExtractor()
+
+    def _create_test_image(self, format="JPEG", exif_data=None, **save_args):
+        """Helper to create a test image with optional EXIF tags."""
+        img = Image.new("RGB", (64, 48), color=(90, 120, 150))
+        if exif_data:
+            exif = Image.Exif()
+            for tag, value in exif_data.items():
+                exif[tag] = value
+            save_args["exif"] = exif
+        buffer = io.BytesIO()
+        img.save(buffer, format=format, **save_args)
+        return buffer.getvalue()
+
+    def test_jpeg_tags_match_pil(self):
+        """Test JPEG APP1 Exif tags equal PIL's getexif()."""
+        exif_data = {305: "Adobe Photoshop CS6", 271: "Canon", 274: 1, 282: 72.0}
+        image_bytes = self._create_test_image(exif_data=exif_data)
+
+        metadata = self.extractor.extract(image_bytes)
+
+        assert metadata["format"] == "jpeg"
+        assert metadata["tags"] == dict(Image.open(io.BytesIO(image_bytes)).getexif())
+        assert metadata["tags"][305] == "Adobe Photoshop CS6"
+        assert metadata["xmp"] is None
+
+    def test_jpeg_xmp_packet(self):
+        """Test the APP1 XMP packet is returned and its orientation used like PIL does."""
+        image_bytes = self._create_test_image(xmp=XMP_PACKET.encode())
+
+        metadata = self.extractor.extract(image_bytes)
+
+        assert "xmp:CreatorTool" in metadata["xmp"]
+        assert metadata["tags"] == dict(Image.open(io.BytesIO(image_bytes)).getexif())
+        assert metadata["tags"][274] == 6
+
+    def test_png_exif_chunk(self):
+        """Test PNG eXIf chunks are parsed."""
+        image_bytes = self._create_test_image(
+            format="PNG", exif_data={305: "GIMP 2.10", 272: "EOS"}
+        )
+        metadata = self.extractor.extract(image_bytes)
+        assert metadata["format"] == "png"
+        assert metadata["tags"] == {305: "GIMP 2.10", 272: "EOS"}
+
+    def test_tiff_ifd0(self):
+        """Test a TIFF's own IFD0 is read, as PIL reports it."""
+        image_bytes = self._create_test_image(format="TIFF", exif_data={305: "Pixelmator Pro"})
+        metadata = self.extractor.extract(image_bytes)
+        assert metadata["format"] == "tiff"
+        assert metadata["tags"] == dict(Image.open(io.BytesIO(image_bytes)).getexif())
+        assert metadata["tags"][305] == "Pixelmator Pro"
+
+    def test_no_metadata(self):
+        """Test images without metadata give empty tags."""
+        for format in ("JPEG", "PNG", "BMP"):
+            metadata = self.extractor.extract(self._create_test_image(format=format))
+            assert metadata["tags"] == {}
+            assert metadata["xmp"] is None
+
+    @pytest.mark.parametrize("image_bytes", [b"", b"not an image at all", b"\xff\xd8\xff\xe0\x00"])
+    def test_invalid_data_raises(self, image_bytes):
+        """Test unknown formats and truncated headers raise ValueError."""
+        with pytest.raises(ValueError):
+            self.extractor.extract(image_bytes)
+
+    def test_truncated_before_frame_header_raises(self):
+        """Test a JPEG cut before its frame header raises instead of returning partial tags."""
+        image_bytes = self._create_test_image(exif_data={305: "Test"})
+        with pytest.raises(ValueError):
+            self.extractor.extract(image_bytes[:100])
+
+    def test_extract_file_maps_instead_of_reading(self, tmp_path, monkeypatch):
+        """Test files are parsed through a memory map rather than read into memory."""
+        path = tmp_path / "photo.jpg"
+        # Header followed by scan data the parser never reaches
+        path.write_bytes(self._create_test_image(exif_data={305: "Acorn 7"}) + b"\x00" * (1 << 20))
+        buffers = []
+        extract = self.extractor.extract
+
+        def recording_extract(data):
+            buffers.append(type(data))
+            return extract(data)
+
+        monkeypatch.setattr(self.extractor, "extract", recording_extract)
+
+        assert self.extractor.extract_file(str(path))["tags"] == {305: "Acorn 7"}
+        assert buffers == [mmap.mmap]
+
+    def test_match_editing_software(self):
+        """Test case-insensitive substring matching of editing programs."""
+        names = ["photoshop", "gimp"]
+        assert match_editing_software("Adobe PHOTOSHOP CC", names) == "photoshop"
+        assert match_editing_software("Canon EOS Utility", names) is None
+        assert match_editing_software("", names) is None
+        assert match_editing_software(b"gimp", names) is None
@@ -0,0 +1,73 @@
+"""Tests for MetricsEngine."""
+
+import numpy as np
+from forgery_detection.services.classifier import Classifier
+from forgery_detection.services.metrics import MetricsEngine
+
+
+class TestMetricsEngine:
+    """Test cases for MetricsEngine."""
+
+    def setup_method(self):
+        """Setup test fixtures."""
+        self.engine = MetricsEngine()
+        self.classifier = Classifier()
+
+    def _create_details(self, n=50, seed=0):
+        """Helper to create image details with coarse (tied) scores."""
+        rng = np.random.default_rng(seed)
+        details = []
+        for i in range(n):
+            forged = rng.uniform() < 0.5
+            score = float(np.round(rng.uniform(0.2, 1.0) if forged else rng.uniform(0.0, 0.8), 1))
+            details.append(
+                {"ground_truth": "forged" if forged else "authentic", "final_score": score}
+            )
+        return details
+
+    def test_confusion_matrix_matches_classifier(self):
+        """Test counts equal per-image classification, including scores equal to the threshold."""
+        details = self._create_details()
+        modes = ["strict", "balanced", "aggressive"]
+        metrics = self.engine.compute(details, self.classifier.thresholds, modes)
+
+        for mode in modes:
+            preds = [self.classifier.classify(d["final_score"], mode) for d in details]
+            truths = [d["ground_truth"] for d in details]
+            pairs = list(zip(preds, truths))
+            m = metrics["modes"][mode]
+            assert m["tp"] == pairs.count(("forged", "forged"))
+            assert m["fp"] == pairs.count(("forged", "authentic"))
+            assert m["fn"] == pairs.count(("authentic", "forged"))
+            assert m["tn"] == pairs.count(("authentic", "authentic"))
+            assert m["total"] == len(details)
+
+    def test_roc_auc_matches_pairwise_definition(self):
+        """Test ROC AUC equals P(forged score > authentic score), ties counting half."""
+        details = self._create_details(seed=1)
+        metrics = self.engine.compute(details, self.classifier.thresholds, ["balanced"])
+
+        pos = [d["final_score"] for d in details if d["ground_truth"] == "forged"]
+        neg = [d["final_score"] for d in details if d["ground_truth"] == "authentic"]
+        wins = sum(1.0 if p > n else 0.5 if p == n else 0.0 for p in pos for n in neg)
+
+        assert abs(metrics["roc"]["auc"] - wins / (len(pos) * len(neg))) < 1e-9
+
+    def test_perfect_separation(self):
+        """Test perfectly ranked scores give AUC 1.0 and average precision 1.0."""
+        details = [{"ground_truth": "forged", "final_score": s} for s in (0.9, 0.8)]
+        details += [{"ground_truth": "authentic", "final_score": s} for s in (0.2, 0.1)]
+        metrics = self.engine.compute(details, self.classifier.thresholds, ["balanced"])
+
+        assert metrics["roc"]["auc"] == 1.0
+        assert metrics["pr"]["auc"] == 1.0
+        assert metrics["roc"]["tpr"][-1] == 1.0
+        assert metrics["roc"]["fpr"][-1] == 1.0
+
+    def test_single_class_has_no_auc(self):
+        """Test AUC is undefined without both classes."""
+        details = [{"ground_truth": "forged", "final_score": 0.6}]
+        metrics = self.engine.compute(details, self.classifier.thresholds, ["balanced"])
+
+        assert metrics["roc"]["auc"] is None
+        assert metrics["modes"]["balanced"]["tp"] == 1
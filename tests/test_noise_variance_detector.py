@@ -4,6 +4,7 @@ import io
 import numpy as np
 from PIL import Image
 from forgery_detection.services.detectors.noise_variance_detector import NoiseVarianceDetector
+from forgery_detection.services.image_context import ImageContext
 
 
 class TestNoiseVarianceDetector:
@@ -168,3 +169,90 @@ class TestNoiseVarianceDetector:
         img_array = np.random.randint(0, 256, (200, 200, 3)).astype(np.float32)
         variances = detector._calculate_regional_noise(img_array)
         assert len(variances) == 8**2
+
+    def _create_scene(self, sigma=3.0, height=256, width=256, seed=0):
+        """Helper: strong scene content (bars and gradient) plus uniform Gaussian noise."""
+        rng = np.random.default_rng(seed)
+        x = np.arange(width)[None, :]
+        y = np.arange(height)[:, None]
+        scene = 60 + 0.4 * x + 80 * ((x // 32) % 2) * (y < height // 2)
+        return np.clip(scene + rng.normal(0, sigma, (height, width)), 0, 255).astype(np.uint8)
+
+    def test_residual_engine_estimates_noise_level(self):
+        """Test the median-residual MAD tracks the Gaussian noise level."""
+        levels = [
+            self.detector._block_noise(self._create_scene(sigma)).mean()
+            for sigma in (2.0, 4.0, 8.0)
+        ]
+        assert levels[0] < levels[1] < levels[2]
+        assert 2.0 < levels[1] < 6.0
+
+    def test_residual_engine_ignores_scene_content(self):
+        """Test uniform noise over strong scene content gives even levels (unlike pixel std)."""
+        gray = self._create_scene()
+        residual = self.detector._block_noise(gray)
+
+        legacy = NoiseVarianceDetector(grid_size=4)
+        legacy.engine = "pixel_std"
+        pixel_std = legacy._block_noise(gray)
+
+        def spread(v):
+            return v.std() / v.mean()
+
+        assert spread(residual) < 0.2
+        assert spread(residual) < spread(pixel_std)
+
+    def test_residual_filters(self):
+        """Test every residual filter gives a grid of non-negative levels."""
+        gray = self._create_scene()
+        for residual_filter in ("median", "laplacian", "wavelet"):
+            self.detector.residual_filter = residual_filter
+            levels = self.detector._block_noise(gray)
+            assert levels.shape == (4, 4)
+            assert (levels > 0).all()
+
+    def test_block_medians_match_numpy(self):
+        """Test interpolated histogram medians stay within half a level of np.median."""
+        rng = np.random.default_rng(1)
+        values = rng.integers(0, 12, (101, 83)).astype(np.uint8)
+
+        medians = NoiseVarianceDetector._block_medians(values, 3)
+
+        y_edges = [0, 33, 67, 101]
+        x_edges = [0, 27, 55, 83]
+        for i in range(3):
+            for j in range(3):
+                block = values[y_edges[i] : y_edges[i + 1], x_edges[j] : x_edges[j + 1]]
+                assert abs(medians[i, j] - np.median(block)) <= 0.5
+
+    def test_fine_grid(self):
+        """Test fine grids (32 x 32 blocks) are supported."""
+        detector = NoiseVarianceDetector(grid_size=32)
+        assert detector._block_noise(self._create_scene()).shape == (32, 32)
+
+    def test_visualize_noise_map_reuses_blocks(self):
+        """Test the noise map comes from the block array memoized by analyze."""
+        img_bytes = self._create_test_image(pattern="inconsistent")
+        ctx = ImageContext(img_bytes)
+        self.detector.analyze(img_bytes, ctx)
+
+        def fail(*args, **kwargs):
+            raise AssertionError("noise blocks recomputed")
+
+        self.detector._block_noise = fail
+        viz = self.detector.visualize_noise_map(img_bytes, ctx)
+        assert viz.size == (200, 200)
+
+    def test_residuals_come_from_feature_store(self):
+        """Test the median and Laplacian engines read the context's shared residual features."""
+        buffer = io.BytesIO()
+        Image.fromarray(self._create_scene()).convert("RGB").save(buffer, format="PNG")
+        image_bytes = buffer.getvalue()
+        for residual_filter in ("median", "laplacian"):
+            ctx = ImageContext(image_bytes)
+            self.detector.residual_filter = residual_filter
+
+            blocks = self.detector.noise_blocks(ctx)
+
+            assert f"{residual_filter}_residual" in ctx._products
+            assert np.allclose(blocks, self.detector._block_noise(ctx.gray))
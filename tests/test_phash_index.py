@@ -0,0 +1,143 @@
+"""Tests for PHashIndex service."""
+
+import numpy as np
+from forgery_detection.services.phash_index import PHashIndex, popcount64
+
+
+class TestPHashIndex:
+    """Test cases for PHashIndex."""
+
+    def _random_hashes(self, n, seed=0):
+        """Helper to create random 64-bit hashes as Python ints."""
+        rng = np.random.default_rng(seed)
+        return [int(h) for h in rng.integers(0, 2**64 - 1, n, dtype=np.uint64, endpoint=True)]
+
+    def _brute_force(self, hashes, query, radius):
+        """Helper to find ids within radius by exhaustive search."""
+        return sorted(i for i, h in enumerate(hashes) if bin(h ^ query).count("1") <= radius)
+
+    def test_popcount64_matches_python(self):
+        """Test SWAR popcount equals bin().count for full 64-bit values."""
+        values = self._random_hashes(100) + [0, 2**64 - 1]
+        counts = popcount64(np.array(values, dtype=np.uint64))
+
+        assert counts.tolist() == [bin(v).count("1") for v in values]
+
+    def test_query_matches_brute_force(self, tmp_path):
+        """Test segment plus delta queries return exactly the hashes within the radius."""
+        hashes = self._random_hashes(300, seed=1)
+        # Near-duplicates of the first hash at distances 1..10
+        hashes += [hashes[0] ^ ((1 << k) - 1) for k in range(1, 11)]
+        index = PHashIndex(str(tmp_path / "index"), compact_threshold=200)
+        for h in hashes:
+            index.insert(h, claim_id="c")
+
+        for radius in (0, 3, 8, 12):
+            ids = sorted(m["id"] for m in index.query(hashes[0], radius))
+            assert ids == self._brute_force(hashes, hashes[0], radius)
+
+    def test_matches_sorted_by_distance_with_metadata(self, tmp_path):
+        """Test matches carry their metadata and come nearest first."""
+        index = PHashIndex(str(tmp_path / "index"))
+        index.insert(0b111, claim_id="far", path="far.jpg", sha256="f")
+        index.insert(0b1, claim_id="near", path="near.jpg", sha256="n")
+
+        matches = index.query(0, 4)
+
+        assert [m["claim_id"] for m in matches] == ["near", "far"]
+        assert [m["distance"] for m in matches] == [1, 3]
+        assert matches[0]["path"] == "near.jpg"
+        assert matches[0]["sha256"] == "n"
+
+    def test_compaction_and_reopen_keep_results(self, tmp_path):
+        """Test compacted and pending hashes survive reopening the index."""
+        path = str(tmp_path / "index")
+        hashes = self._random_hashes(50, seed=2) + [2**64 - 1]
+        index = PHashIndex(path)
+        for h in hashes[:30]:
+            index.insert(h)
+        index.compact()
+        for h in hashes[30:]:
+            index.insert(h)
+        before = index.query(hashes[-1], 10)
+        index.close()
+
+        reopened = PHashIndex(path)
+
+        assert len(reopened) == len(hashes)
+        assert reopened.query(hashes[-1], 10) == before
+        assert before[0]["id"] == len(hashes) - 1
+
+    def test_background_compaction_keeps_inserting(self, tmp_path):
+        """Test crossing compact_threshold compacts off the insert path without losing entries."""
+        hashes = self._random_hashes(120, seed=3)
+        index = PHashIndex(str(tmp_path / "index"), compact_threshold=50)
+        for h in hashes:
+            index.insert(h, claim_id="c")
+        compactor = index._compactor
+        if compactor is not None:
+            compactor.join()
+
+        assert index._segment_size >= 50
+        assert len(index) == len(hashes)
+        for radius in (0, 6):
+            ids = sorted(m["id"] for m in index.query(hashes[7], radius))
+            assert ids == self._brute_force(hashes, hashes[7], radius)
+        index.close()
+
+    def test_delta_buffer_grows_geometrically(self, tmp_path):
+        """Test pending inserts append into a doubling buffer instead of reallocating each time."""
+        index = PHashIndex(str(tmp_path / "index"))
+        capacities = set()
+        for h in self._random_hashes(3000, seed=4):
+            index.insert(h)
+            capacities.add(len(index._delta_id_buffer))
+
+        assert capacities == {1024, 2048, 4096}
+        assert index._delta_count == 3000
+        index.close()
+
+    def test_processes_sharing_a_directory_compact_forward(self, tmp_path):
+        """Test compactions by several index instances only move CURRENT to larger segments."""
+        path = tmp_path / "index"
+        hashes = self._random_hashes(35, seed=5)
+        first, second = PHashIndex(str(path)), PHashIndex(str(path))
+        for h in hashes[:20]:
+            first.insert(h)
+        second.compact()
+        for h in hashes[20:30]:
+            second.insert(h)
+
+        # Picks up the other instance's segment before merging its own pending entries
+        first.compact()
+        assert (path / "CURRENT").read_text() == "segment-30"
+        assert sorted(p.name for p in path.glob("segment-*")) == ["segment-30"]
+
+        # Nothing left to merge: CURRENT stays put
+        second.compact()
+        assert (path / "CURRENT").read_text() == "segment-30"
+
+        # A directory left by an interrupted compaction is replaced
+        (path / "segment-35").mkdir()
+        for h in hashes[30:]:
+            second.insert(h)
+        second.compact()
+        first.close()
+        second.close()
+
+        reopened = PHashIndex(str(path))
+        assert reopened._segment_name == "segment-35"
+        assert [m["id"] for m in reopened.query(hashes[33], 0)] == [33]
+        reopened.close()
+
+    def test_query_with_more_matches_than_sql_variables(self, tmp_path):
+        """Test metadata of large match sets is looked up in bounded chunks."""
+        index = PHashIndex(str(tmp_path / "index"))
+        for i in range(1200):
+            index.insert(0xABCDEF, claim_id=f"claim-{i}")
+
+        matches = index.query(0xABCDEF, 0)
+
+        assert len(matches) == 1200
+        assert matches[-1]["claim_id"] == "claim-1199"
+        index.close()
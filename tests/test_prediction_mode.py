@@ -0,0 +1,96 @@
+"""Tests for prediction mode."""
+
+import io
+import json
+import numpy as np
+from PIL import Image
+from forgery_detection.modes.prediction_mode import PredictionMode
+
+
+class TestPredictionMode:
+    """Test cases for PredictionMode."""
+
+    def setup_method(self):
+        """Setup test fixtures."""
+        self.mode = PredictionMode()
+
+    def _create_test_image(self, seed=0):
+        """Helper to create a noisy JPEG."""
+        rng = np.random.default_rng(seed)
+        img = Image.fromarray(rng.integers(0, 256, (64, 64, 3), dtype=np.uint8))
+        buffer = io.BytesIO()
+        img.save(buffer, format="JPEG")
+        return buffer.getvalue()
+
+    def _make_context(self, tmp_path, inputs):
+        """Helper to build a prediction context."""
+        return {
+            "predict": inputs,
+            "output": str(tmp_path / "out" / "predictions.jsonl"),
+            "criteria": "all",
+            "config_file": "config.yml (default)",
+        }
+
+    def test_run_prediction_writes_one_record_per_image(self, tmp_path):
+        """Test every input image gets a JSONL record, skipped files included."""
+        images_dir = tmp_path / "claims"
+        images_dir.mkdir()
+        (images_dir / "a.jpg").write_bytes(self._create_test_image(1))
+        (images_dir / "b.jpg").write_bytes(self._create_test_image(2))
+        (images_dir / "broken.png").write_bytes(b"not an image")
+        context = self._make_context(tmp_path, [str(images_dir)])
+
+        counts = self.mode.run_prediction(context)
+
+        with open(context["output"]) as f:
+            records = [json.loads(line) for line in f]
+        assert counts["scored"] == 2 and counts["skipped"] == 1
+        assert sorted(r["path"].split("/")[-1] for r in records) == ["a.jpg", "b.jpg", "broken.png"]
+
+        scored = [r for r in records if "error" not in r]
+        for record in scored:
+            assert record["format"] == "jpeg"
+            assert 0.0 <= record["final_score"] <= 1.0
+            assert "ela" in record["detector_scores"]
+            assert set(record["predictions"]) == {"strict", "balanced", "aggressive"}
+
+    def test_records_are_flushed_incrementally(self, tmp_path):
+        """Test each record is on disk before the next image is scored."""
+        output_path = tmp_path / "predictions.jsonl"
+        seen_lines = []
+
+        def scored_images():
+            for i in range(3):
+                seen_lines.append(output_path.read_text().count("\n"))
+                yield f"img{i}.jpg", {
+                    "filename": f"img{i}.jpg",
+                    "format": "jpeg",
+                    "final_score": 0.9,
+                    "detector_scores": {"ela": 0.9},
+                }
+
+        with open(output_path, "w") as output:
+            self.mode._write_predictions(output, ["balanced"], scored_images())
+
+        assert seen_lines == [0, 1, 2]
+        assert output_path.read_text().count('"balanced": "forged"') == 3
+
+    def test_duplicate_clusters_written_next_to_output(self, tmp_path):
+        """Test the same photo submitted twice is reported as a near-duplicate cluster."""
+        images_dir = tmp_path / "claims"
+        images_dir.mkdir()
+        (images_dir / "a.jpg").write_bytes(self._create_test_image(1))
+        (images_dir / "copy.jpg").write_bytes(self._create_test_image(1))
+        (images_dir / "b.jpg").write_bytes(self._create_test_image(2))
+        context = self._make_context(tmp_path, [str(images_dir)])
+
+        counts = self.mode.run_prediction(context)
+
+        with open(tmp_path / "out" / "predictions.duplicates.json") as f:
+            clusters = json.load(f)
+        assert counts["duplicate_clusters"] == 1
+        assert sorted(m["filename"].split("/")[-1] for m in clusters[0]["members"]) == [
+            "a.jpg",
+            "copy.jpg",
+        ]
+        assert clusters[0]["max_distance"] == 0
@@ -0,0 +1,64 @@
+"""Tests for RegionalStats utility."""
+
+import numpy as np
+import pytest
+from forgery_detection.utils.regional_stats import RegionalStats, grid_edges
+
+
+class TestRegionalStats:
+    """Test cases for RegionalStats."""
+
+    def _brute_force_grid(self, values, rows, cols):
+        """Helper to compute grid statistics by slicing every cell."""
+        y_edges, x_edges = grid_edges(values.shape[0], rows), grid_edges(values.shape[1], cols)
+        means = np.empty((rows, cols))
+        stds = np.empty((rows, cols))
+        for i in range(rows):
+            for j in range(cols):
+                cell = values[y_edges[i] : y_edges[i + 1], x_edges[j] : x_edges[j + 1]].astype(
+                    np.float64
+                )
+                means[i, j], stds[i, j] = cell.mean(), cell.std()
+        return means, stds
+
+    def test_grid_edges_cover_remainder(self):
+        """Test cells cover every pixel with sizes differing by at most one."""
+        edges = grid_edges(103, 4)
+        sizes = np.diff(edges)
+
+        assert edges[0] == 0 and edges[-1] == 103
+        assert sizes.max() - sizes.min() <= 1
+
+    @pytest.mark.parametrize("dtype", [np.uint8, np.float32])
+    def test_grid_matches_brute_force(self, dtype):
+        """Test grid means/stds equal per-cell numpy statistics, channels pooled."""
+        values = np.random.default_rng(0).integers(0, 256, (103, 77, 3)).astype(dtype)
+        stats = RegionalStats(values)
+
+        for rows, cols in [(4, 4), (3, 5), (32, 32)]:
+            means, stds = stats.grid(rows, cols)
+            expected_means, expected_stds = self._brute_force_grid(values, rows, cols)
+            assert np.allclose(means, expected_means)
+            assert np.allclose(stds, expected_stds)
+
+    def test_sliding_windows_match_brute_force(self):
+        """Test every sliding window's statistics on a 2-D image."""
+        values = np.random.default_rng(1).normal(100.0, 20.0, (40, 50))
+        means, stds = RegionalStats(values).windows(size=8, step=3)
+
+        assert means.shape == ((40 - 8) // 3 + 1, (50 - 8) // 3 + 1)
+        for i in range(means.shape[0]):
+            for j in range(means.shape[1]):
+                window = values[i * 3 : i * 3 + 8, j * 3 : j * 3 + 8]
+                assert np.isclose(means[i, j], window.mean())
+                assert np.isclose(stds[i, j], window.std())
+
+    def test_without_squares(self):
+        """Test mean-only statistics skip the squared integral."""
+        stats = RegionalStats(np.ones((10, 10), dtype=np.uint8), squares=False)
+        means, stds = stats.grid(2)
+
+        assert np.array_equal(means, np.ones((2, 2)))
+        assert stds is None
+        with pytest.raises(ValueError):
+            stats.stds(0, 0, 5, 5)
@@ -0,0 +1,65 @@
+"""Tests for ReverseSearchDetector service."""
+
+import io
+import numpy as np
+from PIL import Image
+from forgery_detection.services.detectors.reverse_search_detector import ReverseSearchDetector
+from forgery_detection.services.image_context import ImageContext
+
+
+class TestReverseSearchDetector:
+    """Test cases for ReverseSearchDetector."""
+
+    def setup_method(self):
+        """Setup test fixtures."""
+        self.detector = ReverseSearchDetector()
+
+    def _create_test_image(self, seed=0, quality=95):
+        """Helper to create a textured JPEG image."""
+        rng = np.random.default_rng(seed)
+        img = Image.fromarray(rng.integers(0, 256, (16, 16, 3), dtype=np.uint8)).resize((128, 128))
+        buffer = io.BytesIO()
+        img.save(buffer, format="JPEG", quality=quality)
+        return buffer.getvalue()
+
+    def _enable_index(self, tmp_path):
+        """Helper to point the detector at a fresh index."""
+        self.detector.index_enabled = True
+        self.detector.index_path = str(tmp_path / "index")
+        self.detector.cacheable = False
+
+    def test_index_disabled_returns_zero(self):
+        """Test the detector only fingerprints without an index."""
+        assert self.detector.index_enabled is False
+        assert self.detector.cacheable is True
+        assert self.detector.analyze(self._create_test_image()) == 0.0
+
+    def test_duplicate_from_other_claim_is_flagged(self, tmp_path):
+        """Test a recompressed copy submitted under another claim scores high."""
+        self._enable_index(tmp_path)
+        original = self._create_test_image(quality=95)
+        copy = self._create_test_image(quality=70)
+
+        first = self.detector.analyze(original, ImageContext(original, path="claim1/a.jpg"))
+        second = self.detector.analyze(copy, ImageContext(copy, path="claim2/b.jpg"))
+        unrelated = self._create_test_image(seed=5)
+        third = self.detector.analyze(unrelated, ImageContext(unrelated, path="claim3/c.jpg"))
+
+        assert first == 0.0
+        assert second > 0.5
+        assert third == 0.0
+
+    def test_same_claim_is_not_flagged(self, tmp_path):
+        """Test re-analyzing an image (or another photo of its claim) is not a duplicate claim."""
+        self._enable_index(tmp_path)
+        self.detector.claim_id_source = "parent_dir"
+        image_bytes = self._create_test_image()
+
+        self.detector.analyze(image_bytes, ImageContext(image_bytes, path="claim1/a.jpg"))
+        again = self.detector.analyze(image_bytes, ImageContext(image_bytes, path="claim1/a.jpg"))
+        sibling = self.detector.analyze(image_bytes, ImageContext(image_bytes, path="claim1/b.jpg"))
+
+        assert again == 0.0
+        assert sibling == 0.0
+        # The same bytes under the same claim are indexed once
+        assert len(self.detector._get_index()) == 1
@@ -0,0 +1,101 @@
+"""Tests for ScoreCache service."""
+
+import io
+import numpy as np
+from PIL import Image
+from forgery_detection.modes.image_scorer import ImageScorer
+from forgery_detection.services.image_context import ImageContext
+from forgery_detection.services.score_cache import ScoreCache, config_fingerprint
+
+
+class TestScoreCache:
+    """Test cases for ScoreCache."""
+
+    def test_put_and_get_scores(self, tmp_path):
+        """Test stored scores are returned for matching fingerprints."""
+        cache = ScoreCache(str(tmp_path / "cache.db"))
+        fingerprints = {"ela": "a1", "metadata": "b2"}
+        cache.put_scores("sha", {"ela": 0.25, "metadata": 0.4}, fingerprints)
+
+        assert cache.get_scores("sha", fingerprints) == {"ela": 0.25, "metadata": 0.4}
+        assert cache.get_scores("other-sha", fingerprints) == {}
+
+    def test_changed_fingerprint_invalidates_only_that_detector(self, tmp_path):
+        """Test a config change for one detector misses only its entry."""
+        cache = ScoreCache(str(tmp_path / "cache.db"))
+        cache.put_scores("sha", {"ela": 0.25, "metadata": 0.4}, {"ela": "a1", "metadata": "b2"})
+
+        assert cache.get_scores("sha", {"ela": "a2", "metadata": "b2"}) == {"metadata": 0.4}
+
+    def test_cache_persists_across_connections(self, tmp_path):
+        """Test scores survive reopening the database."""
+        path = str(tmp_path / "cache.db")
+        cache = ScoreCache(path)
+        cache.put_scores("sha", {"ela": 0.5}, {"ela": "a1"})
+        cache.close()
+
+        assert ScoreCache(path).get_scores("sha", {"ela": "a1"}) == {"ela": 0.5}
+
+    def test_config_fingerprint_is_per_section(self):
+        """Test fingerprints are stable and differ between sections."""
+        assert config_fingerprint("ela_detector") == config_fingerprint("ela_detector")
+        assert config_fingerprint("ela_detector") != config_fingerprint("metadata_detector")
+
+    def test_scorer_reuses_cached_scores(self, tmp_path, monkeypatch):
+        """Test a re-score only runs detectors whose fingerprint changed."""
+        img = Image.fromarray(
+            np.random.default_rng(0).integers(0, 256, (64, 64, 3), dtype=np.uint8)
+        )
+        buffer = io.BytesIO()
+        img.save(buffer, format="JPEG")
+        image_bytes = buffer.getvalue()
+
+        path = str(tmp_path / "cache.db")
+        first = ImageScorer(cache_path=path).score("a.jpg", image_bytes)
+
+        scorer = ImageScorer(cache_path=path)
+        scorer.fingerprints["ela"] = "changed"
+        calls = []
+        for name, detector in scorer.recipes.detectors.items():
+            original = detector.analyze
+            monkeypatch.setattr(
+                detector, "analyze", lambda *a, n=name, f=original: calls.append(n) or f(*a)
+            )
+
+        second = scorer.score("a.jpg", image_bytes)
+
+        assert calls == ["ela"]
+        assert second == first
+        assert list(second["detector_scores"]) == list(first["detector_scores"])
+
+    def test_put_and_get_phash(self, tmp_path):
+        """Test pHashes are cached per image and reverse-search fingerprint."""
+        cache = ScoreCache(str(tmp_path / "cache.db"))
+        cache.put_phash("abc", "ffd8a0c0e0f0f8fc", "fp1")
+
+        assert cache.get_phash("abc", "fp1") == "ffd8a0c0e0f0f8fc"
+        assert cache.get_phash("abc", "fp2") is None
+        assert cache.get_phash("other", "fp1") is None
+
+    def test_warm_cache_scores_without_decoding(self, tmp_path, monkeypatch):
+        """Test a fully cached image is re-scored, pHash included, without decoding pixels."""
+        img = Image.fromarray(
+            np.random.default_rng(1).integers(0, 256, (64, 64, 3), dtype=np.uint8)
+        )
+        buffer = io.BytesIO()
+        img.save(buffer, format="PNG")
+        image_bytes = buffer.getvalue()
+
+        path = str(tmp_path / "cache.db")
+        first = ImageScorer(cache_path=path).score("a.png", image_bytes)
+
+        decodes = []
+        monkeypatch.setattr(ImageContext, "_decode_rgb", lambda ctx: decodes.append(ctx) or None)
+        monkeypatch.setattr(
+            ImageContext, "_decode_reduced", lambda ctx, side: decodes.append(ctx) or None
+        )
+        second = ImageScorer(cache_path=path).score("a.png", image_bytes)
+
+        assert decodes == []
+        assert second == first
+        assert second["phash"] is not None
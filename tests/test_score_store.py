@@ -0,0 +1,45 @@
+"""Tests for ScoreStore service."""
+
+from forgery_detection.services.score_store import ScoreStore
+
+
+class TestScoreStore:
+    """Test cases for ScoreStore."""
+
+    def test_write_read_roundtrip(self, tmp_path):
+        """Test records survive a write/read cycle, keeping only stored fields."""
+        path = str(tmp_path / "scores.jsonl")
+        details = [
+            {
+                "filename": "a.jpg",
+                "ground_truth": "forged",
+                "format": "jpeg",
+                "final_score": 0.7,
+                "detector_scores": {"metadata": 0.6, "ela": 0.2},
+                "predictions": {"balanced": "forged"},
+                "exif_analysis": {"tags_count": 3},
+                "phash": "ffd8a0c0e0f0f8fc",
+            }
+        ]
+        store = ScoreStore()
+        store.write(path, details)
+
+        assert store.read(path) == [
+            {
+                "filename": "a.jpg",
+                "ground_truth": "forged",
+                "format": "jpeg",
+                "detector_scores": {"metadata": 0.6, "ela": 0.2},
+                "exif_analysis": {"tags_count": 3},
+                "phash": "ffd8a0c0e0f0f8fc",
+            }
+        ]
+
+    def test_read_preserves_order(self, tmp_path):
+        """Test records are returned in file order."""
+        path = str(tmp_path / "scores.jsonl")
+        details = [{"filename": f"{i}.png", "detector_scores": {}} for i in range(5)]
+        store = ScoreStore()
+        store.write(path, details)
+
+        assert [r["filename"] for r in store.read(path)] == [f"{i}.png" for i in range(5)]
@@ -0,0 +1,141 @@
+"""Tests for the HTTP scoring service."""
+
+import http.client
+import io
+import json
+import threading
+import urllib.error
+import urllib.request
+import numpy as np
+from PIL import Image
+from forgery_detection.modes.serving_mode import ServiceMetrics, ServingMode
+
+
+class TestServiceMetrics:
+    """Test cases for ServiceMetrics."""
+
+    def test_snapshot_counts_and_latency(self):
+        """Test counters, queue depth and latency percentiles."""
+        metrics = ServiceMetrics(latency_window=2)
+        metrics.request_started()
+        metrics.request_started()
+        assert metrics.snapshot()["queue_depth"] == 2
+
+        metrics.request_finished(0.010)
+        metrics.request_finished(0.030, error=True)
+        metrics.request_started()
+        metrics.request_finished(0.050)
+        snapshot = metrics.snapshot()
+
+        assert snapshot["queue_depth"] == 0
+        assert snapshot["requests_total"] == 3
+        assert snapshot["errors_total"] == 1
+        # Only the last 2 latencies are kept
+        assert snapshot["latency_ms"]["window"] == 2
+        assert snapshot["latency_ms"]["max"] == 50.0
+
+
+class TestServingMode:
+    """Test cases for ServingMode over real HTTP."""
+
+    def setup_method(self):
+        """Start the service on a free port."""
+        self.mode = ServingMode(workers=1)
+        self.server = self.mode.start("127.0.0.1", 0)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def teardown_method(self):
+        """Stop the service."""
+        self.server.shutdown()
+        self.mode.close()
+
+    def _create_test_image(self):
+        """Helper to create a noisy JPEG."""
+        rng = np.random.default_rng(0)
+        img = Image.fromarray(rng.integers(0, 256, (64, 64, 3), dtype=np.uint8))
+        buffer = io.BytesIO()
+        img.save(buffer, format="JPEG")
+        return buffer.getvalue()
+
+    def _request(self, path, data=None):
+        """Helper returning (status, json body)."""
+        request = urllib.request.Request(self.base_url + path, data=data)
+        try:
+            with urllib.request.urlopen(request, timeout=30) as response:
+                return response.status, json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            return e.code, json.loads(e.read())
+
+    def test_score_returns_detector_breakdown(self):
+        """Test POST /score returns scores and per-criteria decisions."""
+        status, body = self._request("/score?filename=claim.jpg", self._create_test_image())
+
+        assert status == 200
+        assert body["filename"] == "claim.jpg"
+        assert body["format"] == "jpeg"
+        assert "ela" in body["detector_scores"]
+        assert set(body["predictions"]) == {"strict", "balanced", "aggressive"}
+
+    def test_unsupported_format_and_unknown_endpoint(self):
+        """Test error statuses."""
+        assert self._request("/score", b"not an image")[0] == 415
+        assert self._request("/nope")[0] == 404
+
+    def test_health_and_metrics(self):
+        """Test GET /health and GET /metrics."""
+        self._request("/score?criteria=balanced", self._create_test_image())
+        assert self._request("/health") == (200, {"status": "ok"})
+
+        status, metrics = self._request("/metrics")
+        assert status == 200
+        assert metrics["requests_total"] == 1
+        assert metrics["queue_depth"] == 0
+        assert metrics["latency_ms"]["window"] == 1
+
+    def test_concurrent_requests_are_batched(self):
+        """Test simultaneous uploads each get their own record back."""
+        image_bytes = self._create_test_image()
+        results = {}
+
+        def post(i):
+            results[i] = self._request(f"/score?filename=claim{i}.jpg", image_bytes)
+
+        threads = [threading.Thread(target=post, args=(i,)) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert sorted(results) == [0, 1, 2, 3]
+        for i, (status, body) in results.items():
+            assert status == 200
+            assert body["filename"] == f"claim{i}.jpg"
+
+    def test_malformed_content_length_returns_400(self):
+        """Test a non-numeric Content-Length gets a 400 response."""
+        connection = http.client.HTTPConnection(
+            "127.0.0.1", self.server.server_address[1], timeout=30
+        )
+        connection.putrequest("POST", "/score")
+        connection.putheader("Content-Length", "abc")
+        connection.endheaders()
+        response = connection.getresponse()
+
+        assert response.status == 400
+        assert "Content-Length" in json.loads(response.read())["error"]
+        connection.close()
+
+
+class TestServingModeWorkers:
+    """Test cases for the worker pool start-up."""
+
+    def test_start_spawns_every_worker(self):
+        """Test start() returns only once every worker process is running."""
+        mode = ServingMode(workers=2)
+        try:
+            mode.start("127.0.0.1", 0)
+            assert len(mode.worker_pids) == 2
+        finally:
+            mode.close()
@@ -4,6 +4,7 @@ import io
 import numpy as np
 from PIL import Image
 from forgery_detection.services.detectors.statistical_detector import StatisticalDetector
+from forgery_detection.services.image_context import ImageContext
 
 
 class TestStatisticalDetector:
@@ -145,3 +146,64 @@ class TestStatisticalDetector:
             img_bytes = self._create_test_image()
             score = self.detector.analyze(img_bytes)
             assert 0.0 <= score <= 1.0
+
+    def test_analyze_batch_matches_analyze(self):
+        """Test batch scoring equals per-image scoring."""
+        images = [
+            self._create_test_image(pattern="gradient"),
+            self._create_test_image(pattern="noise"),
+            self._create_test_image(width=60, height=80, pattern="gaps"),
+            b"invalid image data",
+            self._create_test_image(pattern="solid"),
+        ]
+        contexts = [ImageContext(image_bytes) for image_bytes in images]
+
+        batch_scores = self.detector.analyze_batch(contexts)
+        single_scores = [self.detector.analyze(image_bytes) for image_bytes in images]
+
+        assert np.allclose(batch_scores, single_scores, atol=1e-6)
+        assert batch_scores[3] == self.detector.error_default_score
+
+    def test_channel_histograms_match_numpy(self):
+        """Test calcHist histograms equal np.histogram per channel."""
+        img_array = np.random.randint(0, 256, (50, 70, 3), dtype=np.uint8)
+        hists = self.detector._channel_histograms(self.detector._as_channels(img_array))
+
+        for c in range(3):
+            expected, _ = np.histogram(img_array[:, :, c], bins=256, range=(0, 256))
+            assert np.array_equal(hists[c], expected)
+
+    def test_channel_correlations_match_corrcoef(self):
+        """Test moment-based correlations equal np.corrcoef."""
+        base = np.random.randint(0, 200, (60, 80)).astype(np.float64)
+        img_array = np.stack(
+            [
+                base,
+                base * 0.5 + np.random.randint(0, 50, base.shape),
+                np.random.randint(0, 256, base.shape),
+            ],
+            axis=2,
+        ).astype(np.uint8)
+        corr = self.detector._channel_correlations(self.detector._as_channels(img_array))
+
+        expected = np.corrcoef(img_array.reshape(-1, 3).T.astype(np.float64))
+        assert np.allclose(corr, expected, atol=1e-9)
+
+    def test_edge_density_matches_float_gradients(self):
+        """Test uint8 gradients reproduce the float channel-mean forward differences."""
+        img_array = np.random.randint(0, 256, (90, 120, 3), dtype=np.uint8)
+        img_array[:45] //= 4  # Uneven edge density across regions
+
+        gray = np.mean(img_array.astype(np.float64), axis=2)
+        grad_x = np.pad(np.diff(gray, axis=1), ((0, 0), (0, 1)), mode="edge")
+        grad_y = np.pad(np.diff(gray, axis=0), ((0, 1), (0, 0)), mode="edge")
+        magnitude = np.sqrt(grad_x**2 + grad_y**2)
+        grid = self.detector.edge_grid_size
+        cells = [
+            np.mean(rows_block)
+            for band in np.array_split(magnitude, grid, axis=0)
+            for rows_block in np.array_split(band, grid, axis=1)
+        ]
+        expected = min(np.std(cells) / self.detector.edge_std_divisor, 1.0)
+
+        assert abs(self.detector._check_edge_density(img_array) - expected) < 1e-6
@@ -0,0 +1,91 @@
+"""Tests for WeightTuner."""
+
+import numpy as np
+import pytest
+from forgery_detection.services.score_aggregator import ScoreAggregator
+from forgery_detection.services.weight_tuner import WeightTuner
+
+
+class TestWeightTuner:
+    """Test cases for WeightTuner."""
+
+    def setup_method(self):
+        """Setup test fixtures."""
+        self.tuner = WeightTuner(n_samples=500, seed=0)
+        self.aggregator = ScoreAggregator()
+        self.detectors = list(self.aggregator.weights.keys())
+
+    def _create_records(self, n=40, seed=0):
+        """Helper to create score records; only 'ela' separates the classes."""
+        rng = np.random.default_rng(seed)
+        records = []
+        for i in range(n):
+            forged = i % 2 == 0
+            scores = {name: float(rng.uniform(0.0, 1.0)) for name in self.detectors}
+            scores["ela"] = float(rng.uniform(0.6, 1.0) if forged else rng.uniform(0.0, 0.4))
+            if i % 5 == 0:
+                scores["reverse_search"] = 0.0
+            records.append(
+                {
+                    "filename": f"img{i}.jpg",
+                    "ground_truth": "forged" if forged else "authentic",
+                    "format": "png" if i % 7 == 0 else "jpeg",
+                    "detector_scores": scores,
+                    "exif_analysis": {},
+                }
+            )
+        return records
+
+    def test_final_scores_match_aggregator(self):
+        """Test vectorized aggregation reproduces ScoreAggregator.aggregate."""
+        records = self._create_records()
+        scores, mask, _ = self.tuner.build_matrix(records, self.detectors)
+        weights = np.array([[self.aggregator.weights[name] for name in self.detectors]])
+
+        final = self.tuner.final_scores(scores, mask, weights)[:, 0]
+        expected = [self.aggregator.aggregate(r["detector_scores"], r["format"]) for r in records]
+
+        assert np.allclose(final, expected)
+
+    def test_confusion_counts_match_brute_force(self):
+        """Test searchsorted/cumsum counts equal direct thresholding (score >= t)."""
+        rng = np.random.default_rng(1)
+        final = np.round(rng.uniform(0.0, 1.0, (30, 4)), 2)
+        labels = rng.uniform(size=30) < 0.5
+        thresholds = np.round(np.arange(0.05, 1.0, 0.05), 6)
+
+        tp, fp = self.tuner.confusion_counts(final, labels, thresholds)
+
+        for k in range(final.shape[1]):
+            for j, t in enumerate(thresholds):
+                flagged = final[:, k] >= t
+                assert tp[k, j] == np.sum(flagged & labels)
+                assert fp[k, j] == np.sum(flagged & ~labels)
+
+    def test_tune_finds_separating_weights(self):
+        """Test the tuner shifts weight onto the discriminative detector."""
+        records = self._create_records()
+        result = self.tuner.tune(records, self.aggregator.weights)
+
+        assert set(result["thresholds"]) == {"strict", "balanced", "aggressive"}
+        assert abs(sum(result["weights"].values()) - 1.0) < 1e-9
+        assert result["metrics"]["balanced"]["feasible"]
+        assert result["metrics"]["balanced"]["f1"] >= 0.9
+        assert result["weights"]["ela"] == max(result["weights"].values())
+
+    def test_pareto_front_is_monotonic(self):
+        """Test Pareto points trade precision for recall."""
+        result = self.tuner.tune(self._create_records(seed=3), self.aggregator.weights)
+        front = result["pareto"]
+
+        assert 0 < len(front) <= self.tuner.pareto_size
+        recalls = [p["recall"] for p in front]
+        precisions = [p["precision"] for p in front]
+        assert recalls == sorted(recalls)
+        assert precisions == sorted(precisions, reverse=True)
+
+    def test_tune_requires_both_classes(self):
+        """Test tuning fails clearly on single-class data."""
+        records = [r for r in self._create_records() if r["ground_truth"] == "forged"]
+        with pytest.raises(ValueError, match="both forged and authentic"):
+            self.tuner.tune(records, self.aggregator.weights)